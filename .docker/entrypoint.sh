@@ -1,9 +1,12 @@
 #!/bin/bash
 
+# The API reads the number of its processes, background jobs of the local queue need a single one
+export OPENAPI2PM_API_WORKERS="${OPENAPI2PM_API_WORKERS:-4}"
+
 if [[ -z "${ENV}" ]]; then
-  export GUNICORN_CMD_ARGS="-w 4 -k uvicorn.workers.UvicornWorker"
+  export GUNICORN_CMD_ARGS="-w ${OPENAPI2PM_API_WORKERS} -k uvicorn.workers.UvicornWorker"
 else
-  export GUNICORN_CMD_ARGS="--bind=0.0.0.0 -w 4 -k uvicorn.workers.UvicornWorker"
+  export GUNICORN_CMD_ARGS="--bind=0.0.0.0 -w ${OPENAPI2PM_API_WORKERS} -k uvicorn.workers.UvicornWorker"
 fi
 
-gunicorn app.main:app
\ No newline at end of file
+gunicorn app.main:app
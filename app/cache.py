@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+
+from collections import OrderedDict
+
+from cli import serialization
+
+
+class CollectionCache:
+    """
+    LRU cache of serialized collections, addressed by the hash of the spec and generation options.
+
+    Entries expire after ttl seconds and the least recently used are evicted when the cache holds more
+    than max_entries collections or max_bytes bytes.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def create_key(openapi, options, documents=None):
+        """
+        Create the cache key of a generation
+
+        Params:
+          - openapi: OpenApi JSON
+          - options: Dict with the generation options that change the collection
+          - documents: List of [path, mtime] pairs of the files referenced by the spec, so editing one of them
+            changes the key
+
+        Returns: String with the SHA-256 of the canonical JSON of all of them
+        """
+
+        canonical = serialization.dumps([openapi, options, documents or []], sort_keys=True)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, content):
+        if len(content) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (content, time.monotonic() + self.ttl)
+            self.size += len(content)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        content, _ = self._entries.pop(key)
+        self.size -= len(content)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size': self.size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
@@ -0,0 +1,300 @@
+import asyncio
+import struct
+import zlib
+
+
+# Gzip header without name nor modification time, and the zlib header of the default compression level
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+_ZLIB_HEADER = b'\x78\x9c'
+
+
+def select_encoding(accept_encoding):
+    """
+    Choose the encoding of a response from the Accept-Encoding header
+
+    Params:
+      - accept_encoding: Value of the header, may be empty
+
+    Returns: "gzip", "deflate" or "identity"
+    """
+
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().lower().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip()] = quality
+
+    for encoding in ('gzip', 'deflate'):
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return 'identity'
+
+
+class ContentCompressor:
+    """
+    Compress text produced in chunks as a raw DEFLATE stream, computing the size and the gzip and zlib checksums
+    of the plain content, so the compressed parts can be sent before the text ends.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, level=6):
+        self.size = 0
+        self.crc32 = 0
+        self.adler32 = 1
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    @property
+    def checksums(self):
+        return self.size, self.crc32, self.adler32
+
+    def iter_compress(self, chunks):
+        """
+        Compress text produced in chunks, without joining it
+
+        Params:
+          - chunks: Iterable of strings, encoded as UTF-8
+
+        Returns: Generator of the non-empty parts of the DEFLATE stream
+        """
+
+        buffer = []
+        buffered = 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered < ContentCompressor.chunk_size:
+                continue
+
+            part = self._compress(''.join(buffer))
+            if part:
+                yield part
+            buffer = []
+            buffered = 0
+
+        part = self._compress(''.join(buffer)) + self._compressor.flush()
+        if part:
+            yield part
+
+    def _compress(self, text):
+        data = text.encode('utf-8')
+        self.size += len(data)
+        self.crc32 = zlib.crc32(data, self.crc32)
+        self.adler32 = zlib.adler32(data, self.adler32)
+        return self._compressor.compress(data)
+
+
+class DeflateEncoder:
+    """
+    Send a raw DEFLATE stream as gzip, deflate or plain content while its parts arrive.
+    The plain content is decompressed in chunks of at most chunk_size bytes.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if encoding == 'identity' else None
+        self._is_started = False
+
+    def encode(self, data):
+        """
+        Encode the next part of the DEFLATE stream
+
+        Params:
+          - data: Part of the DEFLATE stream
+
+        Returns: Generator of bytes
+        """
+
+        if not self._is_started:
+            self._is_started = True
+            if self.encoding == 'gzip':
+                yield _GZIP_HEADER
+            elif self.encoding == 'deflate':
+                yield _ZLIB_HEADER
+
+        if self._decompressor is None:
+            if data:
+                yield data
+            return
+
+        while data:
+            chunk = self._decompressor.decompress(data, DeflateEncoder.chunk_size)
+            data = self._decompressor.unconsumed_tail
+            if chunk:
+                yield chunk
+
+    def finish(self, size, crc32, adler32):
+        """
+        End the content, after the last part of the DEFLATE stream was encoded
+
+        Params:
+          - size: Size of the plain content
+          - crc32: CRC-32 of the plain content
+          - adler32: Adler-32 of the plain content
+
+        Returns: Generator of bytes
+        """
+
+        yield from self.encode(b'')
+        if self.encoding == 'gzip':
+            yield struct.pack('<II', crc32, size & 0xffffffff)
+        elif self.encoding == 'deflate':
+            yield struct.pack('>I', adler32)
+        else:
+            chunk = self._decompressor.flush()
+            if chunk:
+                yield chunk
+
+
+class CompressedContent:
+    """
+    Content compressed once as a raw DEFLATE stream, sent as gzip, deflate or plain without compressing it again.
+    The checksums of the gzip and zlib formats are computed while compressing.
+
+    len() is the size of the compressed data, which is what the content holds in memory.
+    """
+
+    __slots__ = ('data', 'size', 'crc32', 'adler32')
+
+    def __init__(self, data, size, crc32, adler32):
+        self.data = data
+        self.size = size
+        self.crc32 = crc32
+        self.adler32 = adler32
+
+    @staticmethod
+    def compress(chunks, level=6):
+        """
+        Compress text produced in chunks, without joining it
+
+        Params:
+          - chunks: Iterable of strings, encoded as UTF-8
+          - level: Compression level
+
+        Returns: CompressedContent
+        """
+
+        compressor = ContentCompressor(level)
+        data = b''.join(compressor.iter_compress(chunks))
+        return CompressedContent(data, *compressor.checksums)
+
+    def get_length(self, encoding):
+        if encoding == 'gzip':
+            return len(_GZIP_HEADER) + len(self.data) + 8
+        if encoding == 'deflate':
+            return len(_ZLIB_HEADER) + len(self.data) + 4
+        return self.size
+
+    def iter_encoded(self, encoding):
+        """
+        Get the content in the given encoding, in chunks
+
+        Params:
+          - encoding: "gzip", "deflate" or "identity"
+
+        Returns: Generator of bytes, only one chunk of the plain content is kept in memory at a time
+        """
+
+        encoder = DeflateEncoder(encoding)
+        if encoding == 'identity':
+            # Decompressed from small parts, as the unconsumed tail of a large part is copied on each chunk
+            for start in range(0, len(self.data), 16 * 1024):
+                yield from encoder.encode(self.data[start:start + 16 * 1024])
+        else:
+            yield from encoder.encode(self.data)
+        yield from encoder.finish(self.size, self.crc32, self.adler32)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class StreamedContent:
+    """
+    Content received as the parts of a raw DEFLATE stream while it is compressed elsewhere,
+    sent in the negotiated encoding as the parts arrive. Its length is only known at the end.
+
+    Parts are kept as they are added, whatever the pace of the response reading them, as the CompressedContent
+    built at the end holds them all anyway. When the stream fails after the response started, the response
+    is aborted, as its status was already sent.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.content = None
+        self.error = None
+        self._arrived = asyncio.Event()
+
+    @property
+    def is_finished(self):
+        return self.content is not None or self.error is not None
+
+    def add(self, part):
+        self.parts.append(part)
+        self._arrived.set()
+
+    def finish(self, size, crc32, adler32):
+        """
+        End the stream, after its last part was added
+
+        Params:
+          - size: Size of the plain content
+          - crc32: CRC-32 of the plain content
+          - adler32: Adler-32 of the plain content
+
+        Returns: CompressedContent of the whole stream
+        """
+
+        self.content = CompressedContent(b''.join(self.parts), size, crc32, adler32)
+        self._arrived.set()
+        return self.content
+
+    def fail(self, error):
+        self.error = error
+        self._arrived.set()
+
+    async def wait(self):
+        """
+        Wait until the first part arrives or the stream ends
+        """
+
+        while not self.parts and not self.is_finished:
+            self._arrived.clear()
+            await self._arrived.wait()
+
+    async def iter_encoded(self, encoding):
+        """
+        Get the content in the given encoding, in chunks, as its parts arrive
+
+        Params:
+          - encoding: "gzip", "deflate" or "identity"
+
+        Returns: Async generator of bytes, raising the error of the stream when it fails
+        """
+
+        encoder = DeflateEncoder(encoding)
+        sent = 0
+        while True:
+            while sent < len(self.parts):
+                for chunk in encoder.encode(self.parts[sent]):
+                    yield chunk
+                sent += 1
+
+            if self.error is not None:
+                raise self.error
+            if self.content is not None:
+                break
+            self._arrived.clear()
+            await self._arrived.wait()
+
+        for chunk in encoder.finish(self.content.size, self.content.crc32, self.content.adler32):
+            yield chunk
@@ -0,0 +1,332 @@
+import abc
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .workers import init_job_worker, generate_job_collection
+from cli.exceptions import CustomException, JobQueueFullError, JobRunnerShutdownError
+
+
+class Job:
+    """
+    A collection generated in background. The spec is dropped once the job ends, keeping only its result.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    __slots__ = ('id', 'key', 'openapi', 'cmd_args', 'status', 'operations', 'total_operations', 'requests',
+                 'error', 'content', 'submitted_at', 'started_at', 'finished_at')
+
+    def __init__(self, key, openapi, cmd_args):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.openapi = openapi
+        self.cmd_args = cmd_args
+        self.status = Job.QUEUED
+        self.operations = 0
+        self.total_operations = None
+        self.requests = None
+        self.error = None
+        self.content = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def is_finished(self):
+        return self.status in (Job.DONE, Job.FAILED)
+
+    def finish(self, content=None, error=None):
+        self.status = Job.FAILED if error is not None else Job.DONE
+        self.content = content
+        self.error = error
+        self.openapi = None
+        self.finished_at = time.time()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': {
+                'operations': self.operations,
+                'total_operations': self.total_operations
+            },
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobQueue(abc.ABC):
+    """
+    Base of the queue backends, which keep the jobs waiting to run and the state of all jobs.
+
+    Backends are registered by name in JobQueue.backends, the one used is chosen by the settings.
+    Backends whose jobs are only seen by the process that keeps them leave is_shared false,
+    and can't serve jobs when the API runs in more than one process.
+    """
+
+    backends = {}
+    is_shared = False
+
+    @staticmethod
+    def create(name, **options):
+        """
+        Create the queue of a registered backend
+
+        Params:
+          - name: Name of the backend
+          - options: Options of the backend
+
+        Returns: JobQueue
+        """
+
+        if name not in JobQueue.backends:
+            raise ValueError(f'Job queue backend "{name}" is not registered')
+        return JobQueue.backends[name](**options)
+
+    @staticmethod
+    def is_available(name, processes):
+        """
+        Tell whether a registered backend can serve the jobs of the API
+
+        Params:
+          - name: Name of the backend
+          - processes: Number of API processes using the queue
+
+        Returns: False for a backend kept per process when the API runs in more than one process
+        """
+
+        return processes <= 1 or JobQueue.backends[name].is_shared
+
+    @abc.abstractmethod
+    def put(self, job):
+        """
+        Keep a job, queueing it to run when it isn't finished
+
+        Params:
+          - job: Job
+        """
+
+    @abc.abstractmethod
+    def take(self, timeout):
+        """
+        Take the next job to run
+
+        Params:
+          - timeout: Seconds to wait for a job
+
+        Returns: Job, None when no job arrived in time
+        """
+
+    @abc.abstractmethod
+    def get(self, job_id):
+        """
+        Get a job by its id
+
+        Params:
+          - job_id: Id of the job
+
+        Returns: Job, None when it doesn't exist or expired
+        """
+
+    @abc.abstractmethod
+    def save(self, job):
+        """
+        Keep the changes of a job
+
+        Params:
+          - job: Job
+        """
+
+    @abc.abstractmethod
+    def count_by_status(self):
+        """
+        Count the jobs kept, by status
+
+        Returns: Dict of status to the number of jobs
+        """
+
+
+class LocalJobQueue(JobQueue):
+    """
+    Queue kept in the memory of the API process, so it only serves jobs when the API runs in a single process.
+
+    At most max_queued jobs wait to run, further jobs are rejected. Finished jobs are kept for ttl seconds.
+    """
+
+    def __init__(self, max_queued=100, ttl=3600.0):
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        with self._lock:
+            self._expire()
+            if not job.is_finished and self._queue.qsize() >= self.max_queued:
+                raise JobQueueFullError()
+            self._jobs[job.id] = job
+
+        if not job.is_finished:
+            self._queue.put(job.id)
+
+    def take(self, timeout):
+        try:
+            job_id = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def save(self, job):
+        # Jobs are shared with the runner, changes are already seen
+        pass
+
+    def count_by_status(self):
+        with self._lock:
+            self._expire()
+            counts = dict.fromkeys((Job.QUEUED, Job.RUNNING, Job.DONE, Job.FAILED), 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _expire(self):
+        expired_at = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.is_finished and job.finished_at < expired_at:
+                del self._jobs[job_id]
+
+
+JobQueue.backends['local'] = LocalJobQueue
+
+
+class JobRunner:
+    """
+    Run the jobs of a queue in background, each one in a worker process.
+
+    A thread per worker takes the jobs, so at most max_workers jobs run at the same time and the others wait
+    in the queue. Workers report the operations generated, which become the progress of their jobs.
+    The runner starts with its first job.
+
+    Params:
+      - job_queue: JobQueue
+      - max_workers: Number of jobs run at the same time
+      - log_level: Tracing level of the workers
+      - trace_spans: Whether the workers record span timings
+      - refs_directory: Directory where the files of external refs are looked for, None to reject them
+      - on_finish: Function called with each job finished and the span timings of its generation
+    """
+
+    def __init__(self, job_queue, max_workers, log_level='warning', trace_spans=False, refs_directory=None,
+                 on_finish=None):
+        self.job_queue = job_queue
+        self.max_workers = max_workers
+        self.log_level = log_level
+        self.trace_spans = trace_spans
+        self.refs_directory = refs_directory
+        self.on_finish = on_finish
+        self._executor = None
+        self._progress = None
+        self._threads = []
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._executor is not None:
+                return
+
+            self._stopped.clear()
+            self._progress = multiprocessing.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=init_job_worker,
+                initargs=(self.log_level, self.trace_spans, self._progress)
+            )
+            self._threads = [threading.Thread(target=self._report_progress, args=(self._progress,), daemon=True)]
+            self._threads += [threading.Thread(target=self._run_jobs, daemon=True) for _ in range(self.max_workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def submit(self, job):
+        """
+        Queue a job, starting the runner if needed
+
+        Params:
+          - job: Job
+        """
+
+        self.job_queue.put(job)
+        if not job.is_finished:
+            self.start()
+
+    def _run_jobs(self):
+        while not self._stopped.is_set():
+            job = self.job_queue.take(timeout=0.2)
+            if job is not None:
+                self.run(job)
+
+    def run(self, job):
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        self.job_queue.save(job)
+
+        spans = {}
+        try:
+            with self._lock:
+                # The runner may have been shut down after the job was taken
+                if self._executor is None:
+                    raise JobRunnerShutdownError()
+                future = self._executor.submit(generate_job_collection, job.id, job.openapi, job.cmd_args,
+                                               self.refs_directory)
+            content, spans, counts = future.result()
+            job.operations = job.total_operations = counts['operations']
+            job.requests = counts['requests']
+            job.finish(content=content)
+        except CustomException as err:
+            job.finish(error=str(err))
+        except Exception as err:
+            job.finish(error=f'Unexpected error {err!r}')
+
+        self.job_queue.save(job)
+        if self.on_finish is not None:
+            self.on_finish(job, spans)
+
+    def _report_progress(self, progress):
+        while True:
+            message = progress.get()
+            if message is None:
+                return
+
+            job_id, operations, total_operations = message
+            job = self.job_queue.get(job_id)
+            if job is not None and not job.is_finished:
+                job.operations = operations
+                job.total_operations = total_operations
+                self.job_queue.save(job)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is None:
+                return
+
+            self._stopped.set()
+            # Each thread waits for the job it submitted, so no job is pending in the executor
+            self._executor.shutdown(wait=False)
+            self._progress.put(None)
+            self._executor = None
@@ -1,32 +1,439 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-
-from starlette.responses import RedirectResponse
-
-from .schemas.openapi import OpenApiSpecification
-from .schemas.health import GetHealthResponse
-
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=['*'],
-    allow_credentials=True,
-    allow_methods=['*'],
-    allow_headers=['*'],
-)
-
-
-@app.get('/')
-def home():
-    return RedirectResponse(url='/docs')
-
-
-@app.get('/api/v1/health', response_model=GetHealthResponse)
-def health_check():
-    return {'ok': True, 'message': 'OpenAPI2Postman is up and running!'}
-
-
-@app.post('/api/v1/postman/collection', status_code=201)
-def generate_postman_collection(openapi: OpenApiSpecification):
-    return {'title': openapi.info.title}
+import argparse
+import asyncio
+import os
+import time
+
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import conint
+
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+
+from .schemas.openapi import OpenApiSpecification
+from .schemas.health import GetHealthResponse
+from .cache import CollectionCache
+from .compression import CompressedContent, StreamedContent, select_encoding
+from .jobs import Job, JobQueue, JobRunner
+from .metrics import CollectedMetric, Counter, Histogram, MetricsRegistry
+from .settings import settings
+from .workers import GenerationPool, stream_collection
+from cli.exceptions import (CustomException, GenerationBusyError, GenerationTimeoutError, JobQueueFullError,
+                            JobsUnavailableError)
+from cli.tracer import Tracer
+from openapi.openapi import OpenApi
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['*'],
+    allow_credentials=True,
+    allow_methods=['*'],
+    allow_headers=['*'],
+)
+
+Tracer.configure(level=settings.log_level, spans=settings.trace_spans)
+
+generation_pool = GenerationPool(
+    settings.generation_workers,
+    settings.generation_timeout,
+    settings.log_level,
+    settings.trace_spans
+)
+collection_cache = CollectionCache(settings.cache_max_entries, settings.cache_max_bytes, settings.cache_ttl)
+in_flight_generations = {}
+receiving_collections = set()
+
+
+metrics = MetricsRegistry()
+if settings.api_workers > 1:
+    tracer = Tracer('app.main')
+    tracer.trace('Metrics are kept per process, so with %d API processes /metrics only shows the ones of the process '
+                 'that answers it.', settings.api_workers, level=Tracer.WARNING)
+    tracer.log()
+generation_seconds = metrics.register(Histogram(
+    'openapi2pm_generation_seconds',
+    'Seconds spent generating a collection.',
+    (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+))
+generation_failures = metrics.register(Counter(
+    'openapi2pm_generation_failures_total',
+    'Generations that failed.'
+))
+spec_bytes = metrics.register(Histogram(
+    'openapi2pm_spec_bytes',
+    'Size of the OpenAPI specs received, in bytes.',
+    (16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024)
+))
+generated_operations = metrics.register(Counter(
+    'openapi2pm_generated_operations_total',
+    'Operations of the collections generated.'
+))
+generated_requests = metrics.register(Counter(
+    'openapi2pm_generated_requests_total',
+    'Requests of the collections generated.'
+))
+metrics.register(CollectedMetric(
+    'openapi2pm_cache_requests_total', 'counter',
+    'Lookups of the collection cache, by result.',
+    lambda: [({'result': 'hit'}, collection_cache.hits), ({'result': 'miss'}, collection_cache.misses)]
+))
+metrics.register(CollectedMetric(
+    'openapi2pm_cache_bytes', 'gauge',
+    'Size of the collections kept in the cache, in bytes.',
+    lambda: [({}, collection_cache.size)]
+))
+metrics.register(CollectedMetric(
+    'openapi2pm_in_flight_generations', 'gauge',
+    'Collections being generated for requests waiting on them.',
+    lambda: [({}, len(in_flight_generations))]
+))
+metrics.register(CollectedMetric(
+    'openapi2pm_jobs', 'gauge',
+    'Background jobs kept, by status.',
+    lambda: [({'status': status}, count) for status, count in job_queue.count_by_status().items()]
+))
+metrics.register(CollectedMetric(
+    'openapi2pm_phase_seconds_total', 'counter',
+    'Seconds spent on each phase of the generation, as in the tracing summary.',
+    lambda: [({'phase': path}, values[1]) for path, values in Tracer.spans.snapshot().items()]
+))
+
+
+def observe_generation(kind, seconds, counts):
+    generation_seconds.observe(seconds, kind=kind)
+    generated_operations.inc(counts['operations'], kind=kind)
+    generated_requests.inc(counts['requests'], kind=kind)
+
+
+def observe_spec_size(request):
+    size = request.headers.get('content-length')
+    if size is not None and size.isdigit():
+        spec_bytes.observe(int(size))
+
+
+def finish_job(job, spans):
+    Tracer.spans.merge(spans)
+    if job.status == Job.DONE:
+        collection_cache.set(job.key, job.content)
+        observe_generation('job', job.finished_at - job.started_at,
+                           {'operations': job.operations, 'requests': job.requests})
+    else:
+        generation_failures.inc(kind='job')
+
+
+job_queue = JobQueue.create(settings.job_queue, max_queued=settings.job_max_queued, ttl=settings.job_ttl)
+# Jobs kept per process would be looked up in a process other than the one running them
+jobs_available = JobQueue.is_available(settings.job_queue, settings.api_workers)
+if not jobs_available:
+    tracer = Tracer('app.main')
+    tracer.trace('Background jobs are disabled: the "%s" job queue is kept per process and the API runs %d processes.',
+                 settings.job_queue, settings.api_workers, level=Tracer.WARNING)
+    tracer.log()
+job_runner = JobRunner(
+    job_queue,
+    settings.job_workers,
+    settings.log_level,
+    settings.trace_spans,
+    settings.refs_directory,
+    on_finish=finish_job
+)
+
+
+@app.on_event('shutdown')
+def shutdown_generation_pool():
+    generation_pool.shutdown()
+    job_runner.shutdown()
+
+
+@app.get('/')
+def home():
+    return RedirectResponse(url='/docs')
+
+
+@app.get('/api/v1/health', response_model=GetHealthResponse)
+def health_check():
+    return {'ok': True, 'message': 'OpenAPI2Postman is up and running!'}
+
+
+def create_cmd_args(options):
+    """
+    Create the arguments of a generation, with the same attributes of the command line arguments
+
+    Params:
+      - options: Dict with the generation options informed on the request
+
+    Returns: argparse.Namespace
+    """
+
+    return argparse.Namespace(
+        file_success_body=None,
+        generate_body_on_requests=True,
+        gzip=False,
+        jobs=settings.generation_jobs,
+        dedup_requests=settings.dedup_requests,
+        **options
+    )
+
+
+def generation_options(
+        environment: Optional[str] = None,
+        host_url: Optional[str] = None,
+        authorization_type: str = Query('none', regex='^(none|oauth)$'),
+        generate_bad_requests: bool = False,
+        hoist_schemas: bool = False,
+        compact: bool = False,
+        mutation_strategy: str = Query('exhaustive', regex='^(exhaustive|depth|sample|equivalence|pairwise)$'),
+        mutation_depth_caps: Optional[List[conint(ge=0)]] = Query(None),
+        mutation_seed: int = 0,
+        bad_request_budget: Optional[int] = Query(None, ge=0)):
+    return {
+        'environment': environment,
+        'host_url': host_url,
+        'authorization_type': authorization_type,
+        'generate_bad_requests': generate_bad_requests,
+        'hoist_schemas': hoist_schemas,
+        'compact': compact,
+        'mutation_strategy': mutation_strategy,
+        'mutation_depth_caps': mutation_depth_caps,
+        'mutation_seed': mutation_seed,
+        'bad_request_budget': bad_request_budget
+    }
+
+
+def get_external_documents(openapi):
+    """
+    Get the files referenced by a spec, directly or through other files, with the time they were last changed
+
+    Params:
+      - openapi: OpenApi JSON
+
+    Returns: List of [path, mtime] pairs, empty when references to other files are rejected
+    """
+
+    if settings.refs_directory is None:
+        return []
+
+    OpenApi.set_location(openapi, os.path.join(settings.refs_directory, 'openapi.json'), settings.refs_directory)
+    try:
+        paths = OpenApi.load_external_documents(openapi)
+    finally:
+        OpenApi.clear_cache(openapi)
+    return [[path, os.stat(path).st_mtime_ns] for path in paths]
+
+
+def create_collection_key(openapi, options):
+    """
+    Create the cache key of a collection, from the spec, the options and the files the spec references.
+    Hashing a large spec and loading its files take a while, so async handlers run it in a thread.
+
+    Params:
+      - openapi: OpenApi JSON
+      - options: Dict with the generation options informed on the request
+
+    Returns: String with the cache key
+    """
+
+    return CollectionCache.create_key(openapi, options, get_external_documents(openapi))
+
+
+async def generate_cached_collection(openapi, options):
+    """
+    Get the serialized collection from the cache or start its generation.
+    Concurrent requests for the same key share a single generation: the request that started it streams the
+    collection while it is generated, the others wait for the whole collection.
+    Waits for the first part of a new collection, so errors at the start of its generation fail the request.
+
+    Params:
+      - openapi: OpenApi JSON
+      - options: Dict with the generation options informed on the request
+
+    Returns: Tuple with the CompressedContent of the collection JSON, or its StreamedContent when it's generated
+    for this request, and whether it came from the cache
+    """
+
+    key = await asyncio.get_event_loop().run_in_executor(None, create_collection_key, openapi, options)
+    content = collection_cache.get(key)
+    if content is not None:
+        return content, True
+
+    generation = in_flight_generations.get(key)
+    if generation is not None:
+        return await asyncio.shield(generation), False
+
+    stream = generation_pool.stream(stream_collection, openapi, create_cmd_args(options), settings.refs_directory)
+    generation = asyncio.get_event_loop().create_future()
+    in_flight_generations[key] = generation
+    generation.add_done_callback(lambda _: in_flight_generations.pop(key, None))
+
+    streamed = StreamedContent()
+    receiving = asyncio.ensure_future(receive_collection(key, stream, streamed, generation))
+    receiving_collections.add(receiving)
+    receiving.add_done_callback(receiving_collections.discard)
+
+    # Errors at the start of the generation still fail the request, as no response was sent yet
+    await streamed.wait()
+    if streamed.error is not None and not streamed.parts:
+        raise streamed.error
+    return streamed, False
+
+
+async def receive_collection(key, stream, streamed, generation):
+    """
+    Receive the parts of a collection as fast as the worker generating it produces them, whatever the pace of the
+    response sending them, so the timeout and the metrics only count the generation. The collection is cached
+    once all parts arrived, even when its response was closed before.
+
+    Params:
+      - key: Cache key of the collection
+      - stream: GenerationStream of stream_collection
+      - streamed: StreamedContent the parts are added to
+      - generation: Future set with the CompressedContent of the collection, or the error of its generation
+    """
+
+    start = time.perf_counter()
+    try:
+        async for part in stream:
+            streamed.add(part)
+
+        checksums, spans, counts = stream.result
+        content = streamed.finish(*checksums)
+        observe_generation('sync', time.perf_counter() - start, counts)
+        Tracer.spans.merge(spans)
+        collection_cache.set(key, content)
+        generation.set_result(content)
+    except Exception as err:
+        generation_failures.inc(kind='sync')
+        streamed.fail(err)
+        generation.set_exception(err)
+        # Raised to the request streaming it, there may be no other request waiting for it
+        generation.exception()
+    finally:
+        # Kills the worker when the API shuts down in the middle of the generation
+        stream.close()
+        if not generation.done():
+            generation.cancel()
+
+
+def create_collection_response(request, content, status_code, headers=None):
+    """
+    Stream a collection in the encoding negotiated by the Accept-Encoding header.
+    Collections still being generated are sent with chunked transfer encoding, as their length isn't known yet.
+
+    Params:
+      - request: Request answered
+      - content: CompressedContent or StreamedContent of the collection JSON
+      - status_code: HTTP status code of the response
+      - headers: Other headers of the response
+
+    Returns: StreamingResponse
+    """
+
+    encoding = select_encoding(request.headers.get('accept-encoding', ''))
+    headers = {**(headers or {}), 'Vary': 'Accept-Encoding'}
+    if isinstance(content, CompressedContent):
+        headers['Content-Length'] = str(content.get_length(encoding))
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+
+    return StreamingResponse(
+        content.iter_encoded(encoding),
+        status_code=status_code,
+        media_type='application/json',
+        headers=headers
+    )
+
+
+@app.post('/api/v1/postman/collection', status_code=201)
+async def generate_postman_collection(request: Request, openapi: OpenApiSpecification,
+                                      options: dict = Depends(generation_options)):
+    """
+    Generate the Postman collection of a spec. Collections that aren't cached are streamed while they are generated:
+    a generation failing after the 201 status was sent aborts the connection before the end of the chunked body.
+    """
+
+    observe_spec_size(request)
+    try:
+        content, is_cached = await generate_cached_collection(openapi.dict(), options)
+    except GenerationBusyError as err:
+        raise HTTPException(status_code=503, detail=str(err), headers={'Retry-After': '1'})
+    except GenerationTimeoutError as err:
+        raise HTTPException(status_code=504, detail=str(err))
+    except CustomException as err:
+        raise HTTPException(status_code=422, detail=str(err))
+
+    return create_collection_response(request, content, 201, {'X-Cache': 'HIT' if is_cached else 'MISS'})
+
+
+@app.post('/api/v1/postman/collection/jobs', status_code=202)
+def submit_collection_job(request: Request, openapi: OpenApiSpecification,
+                          options: dict = Depends(generation_options)):
+    check_jobs_available()
+    observe_spec_size(request)
+    data = openapi.dict()
+    try:
+        key = create_collection_key(data, options)
+    except CustomException as err:
+        raise HTTPException(status_code=422, detail=str(err))
+    job = Job(key, data, create_cmd_args(options))
+
+    content = collection_cache.get(key)
+    if content is not None:
+        job.finish(content=content)
+
+    try:
+        job_runner.submit(job)
+    except JobQueueFullError as err:
+        raise HTTPException(status_code=503, detail=str(err), headers={'Retry-After': '1'})
+
+    return JSONResponse(
+        content=job.to_dict(),
+        status_code=202,
+        headers={'Location': f'/api/v1/postman/collection/jobs/{job.id}'}
+    )
+
+
+def check_jobs_available():
+    if not jobs_available:
+        raise HTTPException(status_code=501, detail=str(JobsUnavailableError()))
+
+
+def get_job(job_id):
+    check_jobs_available()
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Job {job_id} was not found.')
+    return job
+
+
+@app.get('/api/v1/postman/collection/jobs/{job_id}')
+def collection_job_status(job_id: str):
+    return get_job(job_id).to_dict()
+
+
+@app.get('/api/v1/postman/collection/jobs/{job_id}/result')
+def collection_job_result(request: Request, job_id: str):
+    job = get_job(job_id)
+    if job.status == Job.FAILED:
+        raise HTTPException(status_code=422, detail=job.error)
+    if job.status != Job.DONE:
+        raise HTTPException(status_code=409, detail=f'Job {job_id} is {job.status}.')
+
+    return create_collection_response(request, job.content, 200)
+
+
+@app.get('/api/v1/postman/collection/cache')
+def collection_cache_stats():
+    return collection_cache.stats()
+
+
+@app.get('/api/v1/tracing/summary')
+def tracing_summary():
+    return Tracer.spans.get_summary()
+
+
+@app.get('/metrics')
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=MetricsRegistry.content_type)
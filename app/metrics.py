@@ -0,0 +1,145 @@
+import bisect
+import math
+import threading
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    A metric in the Prometheus text format, whose samples are kept by label values.
+
+    Params:
+      - name: Name of the metric
+      - kind: Prometheus type (counter, gauge, histogram)
+      - description: Help text of the metric
+    """
+
+    def __init__(self, name, kind, description):
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def iter_samples(self):
+        """
+        Get the samples of the metric
+
+        Returns: Generator of tuples with the sample name, its labels and its value
+        """
+
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, labels, value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+        for name, labels, value in self.iter_samples():
+            lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+
+    def __init__(self, name, description):
+        super().__init__(name, 'counter', description)
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Histogram(Metric):
+    """
+    Histogram whose buckets count the observations up to each upper bound, as Prometheus expects
+
+    Params:
+      - name: Name of the metric
+      - description: Help text of the metric
+      - buckets: Upper bounds of the buckets, in ascending order
+    """
+
+    def __init__(self, name, description, buckets):
+        super().__init__(name, 'histogram', description)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def iter_samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labels + (('le', format_value(float(bound))),), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class CollectedMetric(Metric):
+    """
+    Metric whose samples are read from elsewhere each time it is rendered
+
+    Params:
+      - name: Name of the metric
+      - kind: Prometheus type (counter, gauge)
+      - description: Help text of the metric
+      - collect: Function returning a list of (labels dict, value) tuples
+    """
+
+    def __init__(self, name, kind, description, collect):
+        super().__init__(name, kind, description)
+        self.collect = collect
+
+    def iter_samples(self):
+        for labels, value in self.collect():
+            yield self.name, tuple(sorted(labels.items())), value
+
+
+class MetricsRegistry:
+    """
+    The metrics exposed by the API, rendered in the Prometheus text exposition format.
+
+    Metrics are kept in the memory of the API process, they aren't aggregated across processes,
+    so the API must run in a single process for them to count every request.
+    """
+
+    # The charset is added by the text responses
+    content_type = 'text/plain; version=0.0.4'
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
@@ -0,0 +1,27 @@
+from typing import Optional
+
+from pydantic import BaseSettings
+
+
+class Settings(BaseSettings):
+    api_workers: int = 1
+    generation_jobs: int = 1
+    dedup_requests: bool = False
+    generation_workers: int = 2
+    generation_timeout: float = 30.0
+    cache_max_entries: int = 128
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_ttl: float = 3600.0
+    log_level: str = 'warning'
+    trace_spans: bool = True
+    refs_directory: Optional[str] = None
+    job_queue: str = 'local'
+    job_workers: int = 1
+    job_max_queued: int = 100
+    job_ttl: float = 3600.0
+
+    class Config:
+        env_prefix = 'OPENAPI2PM_'
+
+
+settings = Settings()
@@ -0,0 +1,390 @@
+import asyncio
+import contextlib
+import inspect
+import multiprocessing
+import multiprocessing.util
+import os
+import signal
+import threading
+import time
+import traceback
+
+from .compression import CompressedContent, ContentCompressor
+from cli.exceptions import CustomException, GenerationBusyError, GenerationError, GenerationTimeoutError
+from cli.tracer import SpanRecorder, Tracer
+from openapi.openapi import OpenApi
+from postman.pm import Postman
+from postman.writer import iter_encode
+
+
+def init_worker(log_level, trace_spans):
+    Tracer.spans = SpanRecorder()
+    Tracer.configure(level=log_level, spans=trace_spans)
+
+
+@contextlib.contextmanager
+def report_generation_errors():
+    """
+    Turn the unexpected errors of a generation into GenerationError, as the KeyError of a spec the generator
+    doesn't support, logging their traceback in the worker where it is still known
+    """
+
+    try:
+        yield
+    except CustomException:
+        raise
+    except Exception as err:
+        tracer = Tracer('app.workers')
+        tracer.error('Generation failed:\n%s', traceback.format_exc())
+        tracer.log()
+        raise GenerationError(f'The collection could not be generated from the OpenAPI file: {err!r}')
+
+
+def stream_collection(openapi, cmd_args, refs_directory=None):
+    """
+    Generate the collection inside the worker, yielding its JSON compressed as a raw DEFLATE stream
+    while it is generated, so the API sends the collection before its generation ends,
+    and neither the whole collection nor its JSON is kept in memory
+
+    Params:
+      - openapi: OpenApi JSON
+      - cmd_args: Generation options, with the same attributes of the command line arguments
+      - refs_directory: Directory where the files of external refs are looked for, None to reject them
+
+    Returns: Generator of the parts of the DEFLATE stream, returning a tuple with the size and checksums of the
+    collection JSON, the span timings of the generation and the number of operations and requests generated
+    """
+
+    if refs_directory is not None:
+        OpenApi.set_location(openapi, os.path.join(refs_directory, 'openapi.json'), refs_directory)
+
+    compressor = ContentCompressor()
+    try:
+        with report_generation_errors(), Tracer.span('generate'):
+            pm = Postman.stream(openapi, cmd_args)
+            yield from compressor.iter_compress(iter_encode(pm['collection'], None))
+    finally:
+        # Each request unpickles another spec, its resolved components are never used again
+        OpenApi.clear_cache(openapi)
+    return compressor.checksums, Tracer.spans.snapshot(reset=True), get_counts(pm)
+
+
+def get_counts(pm):
+    return {'operations': pm['counters']['operations'], 'requests': pm['counters']['requests']}
+
+
+_job_worker = {}
+
+
+def init_job_worker(log_level, trace_spans, progress_queue):
+    init_worker(log_level, trace_spans)
+    _job_worker['progress'] = progress_queue
+
+
+def generate_job_collection(job_id, openapi, cmd_args, refs_directory=None):
+    """
+    Generate the collection of a job inside the worker, reporting each operation generated
+
+    Params:
+      - job_id: Id of the job, sent with the progress
+      - openapi: OpenApi JSON
+      - cmd_args: Generation options, with the same attributes of the command line arguments
+      - refs_directory: Directory where the files of external refs are looked for, None to reject them
+
+    Returns: Tuple with the CompressedContent of the collection JSON, the span timings of the generation
+    and the number of operations and requests generated
+    """
+
+    if refs_directory is not None:
+        OpenApi.set_location(openapi, os.path.join(refs_directory, 'openapi.json'), refs_directory)
+
+    def report(done, total):
+        _job_worker['progress'].put((job_id, done, total))
+
+    try:
+        with report_generation_errors(), Tracer.span('generate'):
+            pm = Postman.stream(openapi, cmd_args, progress=report)
+            content = CompressedContent.compress(iter_encode(pm['collection'], None))
+    finally:
+        OpenApi.clear_cache(openapi)
+    return content, Tracer.spans.snapshot(reset=True), get_counts(pm)
+
+
+def run_task(connection, fn, args):
+    """
+    Run a function, sending each item yielded when it is a generator function
+
+    Params:
+      - connection: Connection to the API process
+      - fn: Function to run
+      - args: Arguments of the function
+
+    Returns: The result of the function, or the value returned by the generator
+    """
+
+    result = fn(*args)
+    if not inspect.isgenerator(result):
+        return result
+
+    while True:
+        try:
+            chunk = next(result)
+        except StopIteration as stop:
+            return stop.value
+        connection.send(('chunk', chunk))
+
+
+def serve(connection, initializer, initargs):
+    """
+    Run the functions received through a connection, one at a time, until the connection is closed.
+    Each function sends back the items it yields, when it's a generator function, and then its result or error.
+
+    Params:
+      - connection: Connection to the API process
+      - initializer: Function called once when the worker starts
+      - initargs: Arguments of the initializer
+    """
+
+    # Processes started by a generation, as the ones of --jobs, are killed with their worker
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    initializer(*initargs)
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+
+        fn, args = task
+        try:
+            message = ('result', run_task(connection, fn, args))
+        except Exception as err:
+            message = ('error', err)
+
+        try:
+            connection.send(message)
+        except OSError:
+            return
+        except Exception as err:
+            # Results and errors that can't be pickled
+            connection.send(('error', RuntimeError(repr(err))))
+
+
+class WorkerProcess:
+    """
+    A process running one function at a time, received through a pipe, so it can be killed in the middle of one.
+    """
+
+    def __init__(self, initializer, initargs):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve, args=(child_connection, initializer, initargs))
+        self.process.start()
+        child_connection.close()
+
+    def send(self, fn, args):
+        """
+        Start a function in the process
+
+        Params:
+          - fn: Module level function to run
+          - args: Arguments of the function, which must be picklable
+        """
+
+        self.connection.send((fn, args))
+
+    def receive(self):
+        """
+        Wait for the next message of the function running, blocking until it arrives
+
+        Returns: Tuple with the kind of the message, "chunk", "result" or "error", and its value
+        """
+
+        return self.connection.recv()
+
+    def kill(self):
+        if self.process.is_alive():
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (AttributeError, OSError):
+                self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+
+def kill_workers(workers):
+    for worker in list(workers):
+        worker.kill()
+
+
+class GenerationPool:
+    """
+    Run the generation of collections in worker processes, so it doesn't block the event loop.
+
+    At most max_workers generations run at the same time, further requests fail instead of queueing.
+    A generation that exceeds the timeout fails the request and its worker is killed, freeing its slot at once,
+    so specs that never finish can't take every worker. Another worker is started when one is needed again.
+    Workers are kept between generations and started with the tracing configuration given here.
+    """
+
+    def __init__(self, max_workers, timeout, log_level='warning', trace_spans=False):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.log_level = log_level
+        self.trace_spans = trace_spans
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._idle = []
+        self._workers = set()
+        self._is_shut_down = False
+        self._lock = threading.Lock()
+        # Workers aren't daemons, so they can start the processes of --jobs, and are killed before the exit waits
+        # for them
+        multiprocessing.util.Finalize(self, kill_workers, args=(self._workers,), exitpriority=10)
+
+    def acquire(self):
+        """
+        Take a slot and an idle worker, starting a worker when none is idle
+
+        Returns: WorkerProcess
+        """
+
+        if not self._slots.acquire(blocking=False):
+            raise GenerationBusyError()
+
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        try:
+            worker = WorkerProcess(init_worker, (self.log_level, self.trace_spans))
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def release(self, worker, is_idle):
+        """
+        Give back the slot of a worker, killing the worker when it may still be running
+
+        Params:
+          - worker: WorkerProcess
+          - is_idle: Whether the worker finished its function and can run another one
+        """
+
+        with self._lock:
+            if is_idle and not self._is_shut_down:
+                self._idle.append(worker)
+                worker = None
+            else:
+                self._workers.discard(worker)
+
+        if worker is not None:
+            worker.kill()
+        self._slots.release()
+
+    def stream(self, fn, *args):
+        """
+        Start a function in a worker process, receiving what it yields as it is produced
+
+        Params:
+          - fn: Module level function to run, usually a generator function
+          - args: Arguments of the function, which must be picklable
+
+        Returns: GenerationStream
+        """
+
+        return GenerationStream(self, self.acquire(), fn, args)
+
+    async def run(self, fn, *args):
+        """
+        Run a function in a worker process
+
+        Params:
+          - fn: Module level function to run
+          - args: Arguments of the function, which must be picklable
+
+        Returns: The result of the function
+        """
+
+        stream = self.stream(fn, *args)
+        async for _ in stream:
+            pass
+        return stream.result
+
+    def shutdown(self):
+        with self._lock:
+            self._is_shut_down = True
+            idle, self._idle = self._idle, []
+            self._workers.difference_update(idle)
+        for worker in idle:
+            worker.close()
+
+
+class GenerationStream:
+    """
+    The items yielded by a function running in a worker of a GenerationPool, iterated with async for
+    as they arrive. Once the iteration ends, result holds the value the function returned.
+
+    The function must end within the timeout of the pool, else GenerationTimeoutError is raised and the worker
+    is killed. Closing the stream before it ends kills the worker too.
+    """
+
+    def __init__(self, pool, worker, fn, args):
+        self.pool = pool
+        self.result = None
+        self._worker = worker
+        self._task = (fn, args)
+        self._deadline = time.monotonic() + pool.timeout
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._worker is None:
+            raise StopAsyncIteration
+
+        if self._task is not None:
+            task, self._task = self._task, None
+            await self._wait(self._worker.send, *task)
+
+        kind, value = await self._wait(self._worker.receive)
+        if kind == 'chunk':
+            return value
+
+        self.pool.release(self._worker, is_idle=True)
+        self._worker = None
+        if kind == 'error':
+            raise value
+        self.result = value
+        raise StopAsyncIteration
+
+    async def _wait(self, fn, *args):
+        call = asyncio.get_event_loop().run_in_executor(None, fn, *args)
+        try:
+            return await asyncio.wait_for(call, max(self._deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self.close()
+            raise GenerationTimeoutError()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Kill the worker when the function is still running, which ends a call still waiting for it
+        """
+
+        if self._worker is not None:
+            self.pool.release(self._worker, is_idle=False)
+            self._worker = None
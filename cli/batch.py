@@ -0,0 +1,218 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from . import serialization
+from .exceptions import OpenApiVersionError, OpenApiFormatError, CustomException
+from .tracer import SpanRecorder, Tracer
+from openapi.openapi import OpenApi
+from postman.pm import Postman
+from postman.parallel import resolve_jobs
+from postman.writer import write_collection_file
+from postman.incremental import Manifest
+from postman.sharding import ShardPlanner
+
+
+def expand_spec_filenames(patterns, directory_name):
+    """
+    Get the OpenAPI files informed, expanding glob patterns
+
+    Params:
+      - patterns: Paths or glob patterns, relative to the directory
+      - directory_name: Directory the relative paths start from
+
+    Returns: List of paths without repetitions, in the order informed.
+    A pattern without matches is kept, so it is reported as not found.
+    """
+
+    filenames = []
+    for pattern in patterns:
+        path = os.path.join(directory_name, pattern)
+        matches = sorted(glob.glob(path, recursive=True)) if glob.has_magic(pattern) else []
+        for filename in matches or [path]:
+            if filename not in filenames:
+                filenames.append(filename)
+    return filenames
+
+
+def load_spec(openapi_filename):
+    """
+    Load an OpenAPI file, checking its version, and the files referenced by it
+
+    Params:
+      - openapi_filename: Path of the OpenAPI file
+
+    Returns: OpenApi JSON
+    """
+
+    with open(openapi_filename) as file:
+        data = serialization.load(file)
+
+    version = data.get('openapi', None)
+    if not version:
+        raise OpenApiFormatError()
+    elif version != '3.0.0':
+        raise OpenApiVersionError()
+
+    OpenApi.set_location(data, openapi_filename)
+    OpenApi.load_external_documents(data)
+    return data
+
+
+def is_fan_out(args):
+    return args.environments is not None or args.authorization_types is not None
+
+
+def generate_collection_file(openapi_filename, args, tracer):
+    """
+    Generate the collection files of an OpenAPI file, and its manifest when asked.
+    With many environments or authorization types, a collection file is saved for each combination.
+    With shards, a collection file is saved for each shard.
+
+    Params:
+      - openapi_filename: Path of the OpenAPI file
+      - args: Arguments passed in command line
+      - tracer: Tracer of the messages about the files created
+
+    Returns: List with the names of the collection files created
+    """
+
+    with Tracer.span('load'):
+        data = load_spec(openapi_filename)
+
+        previous_manifest = None
+        if args.previous_manifest is not None:
+            previous_manifest = Manifest.load(args.previous_manifest)
+
+        shard_weights = None
+        if args.shard_weights is not None:
+            shard_weights = ShardPlanner.load_weights(args.shard_weights)
+
+    indent = None if args.compact else 4
+    pm_collection_filenames = []
+    try:
+        if is_fan_out(args):
+            environments = args.environments or [args.environment]
+            authorization_types = args.authorization_types or [args.authorization_type]
+            with Tracer.span('write'):
+                for pm in Postman.fan_out(data, args, environments, authorization_types):
+                    write_collection_file(pm['filename'], pm['collection'], indent)
+                    tracer.trace('Postman Collection file - %s.', pm['filename'])
+                    pm_collection_filenames.append(pm['filename'])
+            return pm_collection_filenames
+
+        if args.shards is not None:
+            with Tracer.span('write'):
+                for pm in Postman.shard(data, args, args.shards, shard_weights):
+                    write_collection_file(pm['filename'], pm['collection'], indent)
+                    tracer.trace('Postman Collection file - %s, %d requests, estimated cost %.1f.', pm['filename'],
+                                 pm['requests'], pm['cost'])
+                    pm_collection_filenames.append(pm['filename'])
+            return pm_collection_filenames
+
+        with Tracer.span('write'):
+            pm = Postman.stream(data, args, previous_manifest, create_manifest=args.manifest)
+            pm_collection_filename = pm['filename']
+            write_collection_file(pm_collection_filename, pm['collection'], indent)
+        tracer.trace('Postman Collection file - %s.', pm_collection_filename)
+        pm_collection_filenames.append(pm_collection_filename)
+
+        if pm['manifest'] is not None:
+            manifest_filename = Manifest.get_filename(pm_collection_filename)
+            pm['manifest'].save(manifest_filename)
+            tracer.trace('Manifest file - %s.', manifest_filename)
+    finally:
+        OpenApi.clear_cache(data)
+
+    return pm_collection_filenames
+
+
+def describe_error(err, openapi_filename):
+    """
+    Describe an error raised while generating the collection of an OpenAPI file
+
+    Params:
+      - err: Exception raised
+      - openapi_filename: Path of the OpenAPI file
+
+    Returns: String with the error message
+    """
+
+    if isinstance(err, FileNotFoundError):
+        return f'Error - File {err.filename} was not found.'
+    if isinstance(err, json.decoder.JSONDecodeError):
+        return f'Error - The file {openapi_filename} is not a JSON file.'
+    if isinstance(err, CustomException):
+        return f'Error - {err}'
+    return f'Error - Unexpected error {err!r}'
+
+
+def init_worker(trace_level, trace_spans):
+    Tracer.level = trace_level
+    Tracer.spans = SpanRecorder()
+    Tracer.spans.enabled = trace_spans
+
+
+def run_spec(openapi_filename, args):
+    """
+    Generate the collection of an OpenAPI file of a batch, without raising its errors
+
+    Params:
+      - openapi_filename: Path of the OpenAPI file
+      - args: Arguments passed in command line
+
+    Returns: Dict with the OpenAPI file, the collection files created, the error message, the seconds spent
+    and the span timings
+    """
+
+    tracer = Tracer(os.path.basename(openapi_filename))
+    result = {'openapi': openapi_filename, 'collections': [], 'error': None}
+    start = time.perf_counter()
+    try:
+        result['collections'] = generate_collection_file(openapi_filename, args, tracer)
+    except Exception as err:
+        result['error'] = describe_error(err, openapi_filename)
+    result['seconds'] = time.perf_counter() - start
+    tracer.log()
+    result['spans'] = Tracer.spans.snapshot(reset=True) if Tracer.spans.enabled else {}
+    return result
+
+
+def run_batch(openapi_filenames, args):
+    """
+    Generate the collections of many OpenAPI files across worker processes.
+    Each worker keeps its process warm between files, and each file is generated serially inside its worker.
+
+    Params:
+      - openapi_filenames: Paths of the OpenAPI files
+      - args: Arguments passed in command line, whose jobs are the number of worker processes
+
+    Returns: Generator of the results of run_spec, in the order of the files
+    """
+
+    jobs = min(resolve_jobs(args.jobs), len(openapi_filenames))
+    spec_args = argparse.Namespace(**{**vars(args), 'jobs': 1})
+    if jobs <= 1:
+        for openapi_filename in openapi_filenames:
+            yield run_spec(openapi_filename, spec_args)
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(Tracer.level, Tracer.spans.enabled)
+    )
+    futures = []
+    try:
+        futures.extend(executor.submit(run_spec, openapi_filename, spec_args) for openapi_filename in openapi_filenames)
+        for future in futures:
+            yield future.result()
+    finally:
+        # Files not started yet are dropped when the batch stops early
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -1,72 +1,359 @@
-import argparse
-
-
-class CommandLineConfig:
-
-    creator = 'Matheus Mello de Lima (@mellomaths)'
-    description = 'Generate a Postman collection with tests scripts bases on a OpenAPI 3.0 JSON file.'
-
-    def __init__(self, cli_filename):
-        self.usage = f'python3 {cli_filename} path/to/openapi.json -e Sandbox -u http://localhost:8080 -gen-badreq'
-        self.parser = self.config_argument_parser()
-
-    def config_argument_parser(self):
-        parser = argparse.ArgumentParser(
-            description=f'description: {self.description}',
-            usage=self.usage,
-            epilog=f'by: {self.creator}'
-        )
-
-        # Required
-        parser.add_argument(
-            'openapi',
-            metavar='openapi',
-            type=str,
-            nargs=1,
-            help='Relative path to OpenAPI file.'
-        )
-
-        # Optionals
-        parser.add_argument(
-            '-e',
-            '--env',
-            dest='environment',
-            help='Environment defined on OpenAPI file to send all requests (default: urls will be empty).'
-        )
-
-        parser.add_argument(
-            '-gen-badreq',
-            '--generate-bad-requests',
-            dest='generate_bad_requests',
-            type=CommandLineConfig.str2bool,
-            help='Will generate bad requests for POST and PUT operations based on schema defined in the OpenAPI file.',
-            nargs='?',
-            const=True,
-            default=False
-        )
-
-        return parser
-
-    def get_arguments(self):
-        args = self.parser.parse_args()
-        return args
-
-    @staticmethod
-    def str2bool(v):
-        """
-        Convert String to Boolean
-        """
-
-        if isinstance(v, bool):
-            return v
-        if v.lower() in ('yes', 'true', 't', 'y', '1'):
-            return True
-        elif v.lower() in ('no', 'false', 'f', 'n', '0'):
-            return False
-        else:
-            raise argparse.ArgumentTypeError('Boolean value expected.')
-
-    @staticmethod
-    def log(message):
-        print(f'\n=== {message}')
-
+import argparse
+
+
+class CommandLineConfig:
+
+    creator = 'Matheus Mello de Lima (@mellomaths)'
+    description = 'Generate a Postman collection with tests scripts bases on a OpenAPI 3.0 JSON file.'
+
+    def __init__(self, cli_filename):
+        self.usage = f'python3 {cli_filename} path/to/openapi.json -e Sandbox -u http://localhost:8080 -gen-badreq'
+        self.parser = self.config_argument_parser()
+
+    def config_argument_parser(self):
+        parser = argparse.ArgumentParser(
+            description=f'description: {self.description}',
+            usage=self.usage,
+            epilog=f'by: {self.creator}'
+        )
+
+        # Required
+        parser.add_argument(
+            'openapi',
+            metavar='openapi',
+            type=str,
+            nargs='+',
+            help='Relative paths or glob patterns of OpenAPI files, many files are handled as a batch.'
+        )
+
+        # Optionals
+        parser.add_argument(
+            '-e',
+            '--env',
+            dest='environment',
+            help='Environment defined on OpenAPI file to send all requests (default: urls will be empty).'
+        )
+
+        parser.add_argument(
+            '-u',
+            '--url',
+            dest='host_url',
+            help='Host URL used on all requests, it takes precedence over the environment.'
+        )
+
+        parser.add_argument(
+            '-auth',
+            '--authorization-type',
+            dest='authorization_type',
+            choices=('none', 'oauth'),
+            help='Authorization type used on request headers (default: none).',
+            default='none'
+        )
+
+        parser.add_argument(
+            '-envs',
+            '--environments',
+            dest='environments',
+            nargs='+',
+            help='Environments defined on OpenAPI file, "all" for every one of them. One collection is saved '
+                 'for each environment and authorization type, generating the requests once.'
+        )
+
+        parser.add_argument(
+            '-auths',
+            '--authorization-types',
+            dest='authorization_types',
+            nargs='+',
+            choices=('none', 'oauth'),
+            help='Authorization types, one collection is saved for each environment and authorization type.'
+        )
+
+        parser.add_argument(
+            '-shards',
+            '--shards',
+            dest='shards',
+            type=int,
+            help='Number of collections the requests are split into, balanced by their estimated cost, '
+                 'to be run at the same time.'
+        )
+
+        parser.add_argument(
+            '-shard-weights',
+            '--shard-weights',
+            dest='shard_weights',
+            help='Path to a JSON file with the weight of the cost of operations, as {"GET /orders": 2.5} '
+                 '(default: 1).'
+        )
+
+        parser.add_argument(
+            '-success-body',
+            '--file-success-body',
+            dest='file_success_body',
+            help='Relative path to a JSON file used as body on success requests instead of fake data.'
+        )
+
+        parser.add_argument(
+            '-gen-body',
+            '--generate-body-on-requests',
+            dest='generate_body_on_requests',
+            type=CommandLineConfig.str2bool,
+            help='Will generate fake bodies for POST, PUT and PATCH operations (default: true).',
+            nargs='?',
+            const=True,
+            default=True
+        )
+
+        parser.add_argument(
+            '-j',
+            '--jobs',
+            dest='jobs',
+            type=int,
+            help='Number of processes used to generate the requests, or the files of a batch, '
+                 '0 uses one per CPU (default: 1).',
+            default=1
+        )
+
+        parser.add_argument(
+            '-hoist',
+            '--hoist-schemas',
+            dest='hoist_schemas',
+            type=CommandLineConfig.str2bool,
+            help='Will keep each response JSON Schema once as a collection variable, referenced by the test scripts.',
+            nargs='?',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '-manifest',
+            '--manifest',
+            dest='manifest',
+            type=CommandLineConfig.str2bool,
+            help='Will save a manifest next to the collection, used to regenerate it incrementally.',
+            nargs='?',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '-prev',
+            '--previous-manifest',
+            dest='previous_manifest',
+            help='Path to the manifest of a previous run. Only changed operations are generated again.'
+        )
+
+        parser.add_argument(
+            '-gen-badreq',
+            '--generate-bad-requests',
+            dest='generate_bad_requests',
+            type=CommandLineConfig.str2bool,
+            help='Will generate bad requests for POST and PUT operations based on schema defined in the OpenAPI file.',
+            nargs='?',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '-mutations',
+            '--mutation-strategy',
+            dest='mutation_strategy',
+            choices=('exhaustive', 'depth', 'sample', 'equivalence', 'pairwise'),
+            help='Bad requests kept: all of them, at most --mutation-depth-caps at each depth of $ref fields, '
+                 'a sample chosen by --mutation-seed, or one for each equivalence class of mutation kind and '
+                 'field type, also accepted as pairwise, its former name (default: exhaustive).',
+            default='exhaustive'
+        )
+
+        parser.add_argument(
+            '-mutation-depth-caps',
+            '--mutation-depth-caps',
+            dest='mutation_depth_caps',
+            type=CommandLineConfig.str2nonnegative,
+            nargs='+',
+            help='Bad requests kept at each depth of $ref fields by the depth strategy, '
+                 'deeper fields are not followed (default: 10 5 2).'
+        )
+
+        parser.add_argument(
+            '-mutation-seed',
+            '--mutation-seed',
+            dest='mutation_seed',
+            type=int,
+            help='Seed of the sample strategy, the same seed keeps the same bad requests (default: 0).',
+            default=0
+        )
+
+        parser.add_argument(
+            '-badreq-budget',
+            '--bad-request-budget',
+            dest='bad_request_budget',
+            type=CommandLineConfig.str2nonnegative,
+            help='Bad requests of an operation at most, also the size of the sample strategy (default: no limit).'
+        )
+
+        parser.add_argument(
+            '-compact',
+            '--compact',
+            dest='compact',
+            type=CommandLineConfig.str2bool,
+            help='Will minify the collection file, the request bodies and the test scripts.',
+            nargs='?',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '-dedup',
+            '--dedup-requests',
+            dest='dedup_requests',
+            type=CommandLineConfig.str2bool,
+            help='Will share the bodies and test scripts of identical requests and encode each bad request body once, '
+                 'using less memory on large collections. The collection is the same.',
+            nargs='?',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '-gz',
+            '--gzip',
+            dest='gzip',
+            type=CommandLineConfig.str2bool,
+            help='Will compress the collection file with gzip, saved as .postman_collection.json.gz.',
+            nargs='?',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '-log',
+            '--log-level',
+            dest='log_level',
+            choices=('debug', 'info', 'warning', 'error'),
+            help='Minimum level of the messages logged (default: info).',
+            default='info'
+        )
+
+        parser.add_argument(
+            '-timings',
+            '--trace-summary',
+            dest='trace_summary',
+            type=CommandLineConfig.str2bool,
+            help='Will print the time spent on each phase of the generation.',
+            nargs='?',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '-profile',
+            '--profile',
+            dest='profile',
+            help='Path where the cProfile stats of the run are saved, with a report of the slowest functions '
+                 'and the peak memory saved next to it. Worker processes of --jobs are not profiled.'
+        )
+
+        return parser
+
+    def get_arguments(self):
+        args = self.parser.parse_args()
+        return args
+
+    @staticmethod
+    def str2bool(v):
+        """
+        Convert String to Boolean
+        """
+
+        if isinstance(v, bool):
+            return v
+        if v.lower() in ('yes', 'true', 't', 'y', '1'):
+            return True
+        elif v.lower() in ('no', 'false', 'f', 'n', '0'):
+            return False
+        else:
+            raise argparse.ArgumentTypeError('Boolean value expected.')
+
+    @staticmethod
+    def str2nonnegative(v):
+        """
+        Convert String to a non-negative Integer
+        """
+
+        try:
+            value = int(v)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Integer expected, got "{v}".')
+        if value < 0:
+            raise argparse.ArgumentTypeError(f'Non-negative integer expected, got {value}.')
+        return value
+
+    @staticmethod
+    def log(message):
+        print(f'\n=== {message}')
+
+
+class MockServerConfig:
+
+    description = 'Start a mock API from a OpenAPI 3.0 JSON file, answering the requests of its generated collection.'
+
+    def __init__(self, cli_filename):
+        self.usage = f'python3 {cli_filename} path/to/openapi.json -p 8000 -auth oauth'
+        self.parser = self.config_argument_parser()
+
+    def config_argument_parser(self):
+        parser = argparse.ArgumentParser(
+            description=f'description: {self.description}',
+            usage=self.usage,
+            epilog=f'by: {CommandLineConfig.creator}'
+        )
+
+        # Required
+        parser.add_argument(
+            'openapi',
+            metavar='openapi',
+            type=str,
+            help='Relative path of the OpenAPI file.'
+        )
+
+        # Optionals
+        parser.add_argument(
+            '-host',
+            '--host',
+            dest='host',
+            help='Address the mock API listens on (default: 127.0.0.1).',
+            default='127.0.0.1'
+        )
+
+        parser.add_argument(
+            '-p',
+            '--port',
+            dest='port',
+            type=int,
+            help='Port the mock API listens on, 0 picks a free one (default: 8000).',
+            default=8000
+        )
+
+        parser.add_argument(
+            '-auth',
+            '--authorization-type',
+            dest='authorization_type',
+            choices=('none', 'oauth'),
+            help='Authorization type whose headers are required, as used on the collection (default: none).',
+            default='none'
+        )
+
+        parser.add_argument(
+            '-log',
+            '--log-level',
+            dest='log_level',
+            choices=('debug', 'info', 'warning', 'error'),
+            help='Level of the messages printed, debug prints every request (default: info).',
+            default='info'
+        )
+
+        return parser
+
+    def get_arguments(self):
+        args = self.parser.parse_args()
+        return args
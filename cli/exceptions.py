@@ -1,22 +1,71 @@
-class CustomException(Exception):
-
-    def __init__(self, message):
-        super(CustomException, self).__init__(message)
-
-
-class OpenApiVersionError(CustomException):
-
-    def __init__(self, message="OpenAPI version is not supported. Please inform OpenAPI 3.0.0."):
-        super(OpenApiVersionError, self).__init__(message)
-
-
-class OpenApiFormatError(CustomException):
-
-    def __init__(self, message="The reported file does not follow the OpenAPI formatting standard."):
-        super(OpenApiFormatError, self).__init__(message)
-
-
-class InvalidEnvironmentValueError(CustomException):
-
-    def __init__(self, message="Environment value is not defined in the OpenAPI file."):
-        super(InvalidEnvironmentValueError, self).__init__(message)
+class CustomException(Exception):
+
+    def __init__(self, message):
+        super(CustomException, self).__init__(message)
+
+
+class OpenApiVersionError(CustomException):
+
+    def __init__(self, message="OpenAPI version is not supported. Please inform OpenAPI 3.0.0."):
+        super(OpenApiVersionError, self).__init__(message)
+
+
+class OpenApiFormatError(CustomException):
+
+    def __init__(self, message="The reported file does not follow the OpenAPI formatting standard."):
+        super(OpenApiFormatError, self).__init__(message)
+
+
+class InvalidEnvironmentValueError(CustomException):
+
+    def __init__(self, message="Environment value is not defined in the OpenAPI file."):
+        super(InvalidEnvironmentValueError, self).__init__(message)
+
+
+class InvalidRefError(CustomException):
+
+    def __init__(self, message="A $ref of the OpenAPI file could not be resolved."):
+        super(InvalidRefError, self).__init__(message)
+
+
+class GenerationBusyError(CustomException):
+
+    def __init__(self, message="All workers are busy generating collections. Please try again later."):
+        super(GenerationBusyError, self).__init__(message)
+
+
+class GenerationTimeoutError(CustomException):
+
+    def __init__(self, message="The collection could not be generated within the time limit."):
+        super(GenerationTimeoutError, self).__init__(message)
+
+
+class GenerationError(CustomException):
+
+    def __init__(self, message="The collection could not be generated from the OpenAPI file."):
+        super(GenerationError, self).__init__(message)
+
+
+class JobQueueFullError(CustomException):
+
+    def __init__(self, message="Too many collections are waiting to be generated. Please try again later."):
+        super(JobQueueFullError, self).__init__(message)
+
+
+class JobsUnavailableError(CustomException):
+
+    def __init__(self, message="Background jobs need a job queue shared by the API processes. "
+                               "Run a single API process or configure a shared job queue."):
+        super(JobsUnavailableError, self).__init__(message)
+
+
+class JobRunnerShutdownError(CustomException):
+
+    def __init__(self, message="The server is shutting down. Please submit the job again later."):
+        super(JobRunnerShutdownError, self).__init__(message)
+
+
+class InvalidShardWeightsError(CustomException):
+
+    def __init__(self, message="Shard weights must be a JSON object of operation keys to non-negative numbers."):
+        super(InvalidShardWeightsError, self).__init__(message)
@@ -1,53 +1,86 @@
-import os
-import sys
-import json
-
-from .config import CommandLineConfig
-from .exceptions import OpenApiVersionError, OpenApiFormatError, CustomException
-from .tracer import Tracer
-from postman.pm import Postman
-
-
-if __name__ == '__main__':
-    this_filename = __file__
-    tracer = Tracer('cli.py')
-    tracer.trace('start.')
-    tracer.trace('OpenAPI 2 Postman CLI.')
-    cmd_config = CommandLineConfig(this_filename)
-    args = cmd_config.get_arguments()
-    directory_name = os.path.dirname(this_filename)
-
-    openapi_filename = os.path.join(directory_name, args.openapi[0])
-
-    tracer.trace(f'Handle the file {openapi_filename}.')
-    has_success = False
-    try:
-        with open(openapi_filename) as file:
-            data = json.load(file)
-
-            version = data.get('openapi', None)
-            if not version:
-                raise OpenApiFormatError()
-            elif version != '3.0.0':
-                raise OpenApiVersionError()
-
-            pm = Postman.generate(data, args)
-            pm_collection_filename = pm['filename']
-            with open(pm_collection_filename, 'w', encoding='utf-8') as file_result:
-                json.dump(pm['collection'], file_result, ensure_ascii=False, indent=4)
-                tracer.trace(f'Postman Collection file - {pm_collection_filename}.')
-                has_success = True
-    except FileNotFoundError as err:
-        tracer.trace(f'Error - File {openapi_filename} was not found.')
-    except json.decoder.JSONDecodeError as err:
-        tracer.trace(f'Error - The file {openapi_filename} is not a JSON file.')
-    except CustomException as err:
-        tracer.trace(f'Error - {err}')
-    finally:
-        tracer.trace(f'Error - Unexpected error {sys.exc_info()[0]}')
-
-    if has_success:
-        tracer.trace(f'Execution ended successfully.')
-        tracer.trace(f'Please check if the JSON file was saved and import the collection into Postman.')
-
-    tracer.trace('end.')
+import contextlib
+import os
+import sys
+import time
+
+from .batch import describe_error, expand_spec_filenames, generate_collection_file, is_fan_out, run_batch
+from .config import CommandLineConfig
+from .profiler import Profiler
+from .tracer import Tracer
+
+
+if __name__ == '__main__':
+    this_filename = __file__
+    cmd_config = CommandLineConfig(this_filename)
+    args = cmd_config.get_arguments()
+    Tracer.configure(level=args.log_level, spans=args.trace_summary)
+
+    tracer = Tracer('cli.py')
+    tracer.trace('start.')
+    tracer.trace('OpenAPI 2 Postman CLI.')
+    directory_name = os.path.dirname(this_filename)
+
+    if is_fan_out(args) and (args.manifest or args.previous_manifest is not None):
+        cmd_config.parser.error('--manifest and --previous-manifest can not be used with --environments '
+                                'or --authorization-types')
+
+    if args.shards is not None:
+        if args.shards < 1:
+            cmd_config.parser.error('--shards must be at least 1')
+        if is_fan_out(args) or args.manifest or args.previous_manifest is not None:
+            cmd_config.parser.error('--shards can not be used with --environments, --authorization-types, '
+                                    '--manifest or --previous-manifest')
+
+    profiler = Profiler(args.profile) if args.profile is not None else contextlib.nullcontext()
+    with profiler:
+        openapi_filenames = expand_spec_filenames(args.openapi, directory_name)
+        failures = 0
+
+        if len(openapi_filenames) == 1:
+            openapi_filename = openapi_filenames[0]
+            tracer.trace('Handle the file %s.', openapi_filename)
+            try:
+                generate_collection_file(openapi_filename, args, tracer)
+                tracer.trace('Execution ended successfully.')
+                tracer.trace('Please check if the JSON file was saved and import the collection into Postman.')
+            except Exception as err:
+                tracer.error(describe_error(err, openapi_filename))
+        else:
+            if args.previous_manifest is not None:
+                cmd_config.parser.error('--previous-manifest can only be used with a single OpenAPI file')
+
+            tracer.trace('Handle %d files.', len(openapi_filenames))
+            tracer.log()
+            start = time.perf_counter()
+            collection_filenames = set()
+            for result in run_batch(openapi_filenames, args):
+                Tracer.spans.merge(result['spans'])
+                if result['error'] is not None:
+                    failures += 1
+                    tracer.error('FAILED %8.3fs  %s: %s', result['seconds'], result['openapi'], result['error'])
+                else:
+                    tracer.trace('OK     %8.3fs  %s -> %s', result['seconds'], result['openapi'],
+                                 ', '.join(result['collections']))
+                    for collection_filename in result['collections']:
+                        if collection_filename in collection_filenames:
+                            tracer.trace('Warning - %s was overwritten by %s, both have the same title.',
+                                         collection_filename, result['openapi'], level=Tracer.WARNING)
+                        collection_filenames.add(collection_filename)
+                tracer.log()
+
+            tracer.trace('%d files handled in %.3fs, %d failed.', len(openapi_filenames), time.perf_counter() - start,
+                         failures)
+
+    if args.profile is not None:
+        tracer.trace('Profile saved in %s, report in %s, peak memory %.1f MB.', profiler.filename,
+                     profiler.report_filename, profiler.peak / 1024 / 1024)
+
+    tracer.trace('end.')
+    tracer.log()
+
+    if args.trace_summary:
+        print()
+        print(Tracer.spans.format_summary())
+
+    if failures:
+        sys.exit(1)
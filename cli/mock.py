@@ -0,0 +1,118 @@
+import os
+import signal
+import threading
+import time
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .batch import describe_error, load_spec
+from .config import MockServerConfig
+from .tracer import Tracer
+from openapi.mock import MockApi
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answer each request with the MockApi of the server, keeping the connection open between requests.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written apart, Nagle's algorithm would delay every response of a kept connection
+    disable_nagle_algorithm = True
+
+    def handle_request(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        # Generated URLs may start with "//", which urlsplit would take as a host
+        path = self.path.partition('?')[0]
+
+        response = self.server.api.handle(self.command, path, self.headers, body)
+        self.server.count(response.status_code)
+
+        self.send_response(response.status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+        if Tracer.level <= Tracer.DEBUG:
+            tracer = Tracer('cli.mock')
+            tracer.debug('%s %s -> %d', self.command, self.path, response.status_code)
+            tracer.log()
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+    def log_message(self, format, *args):
+        # Requests are traced by handle_request
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+    HTTP server of a MockApi, answering each connection in its own thread and counting the responses sent
+
+    Params:
+      - address: Tuple with the host and the port, port 0 picks a free one
+      - api: MockApi
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, api):
+        super().__init__(address, MockRequestHandler)
+        self.api = api
+        self.status_codes = Counter()
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def count(self, status_code):
+        with self._lock:
+            self.status_codes[status_code] += 1
+
+    def summarize(self, tracer):
+        """
+        Trace the number of responses sent and the throughput since the server started
+
+        Params:
+          - tracer: Tracer of the messages
+        """
+
+        seconds = time.perf_counter() - self.started_at
+        requests = sum(self.status_codes.values())
+        tracer.trace('%d requests answered in %.3fs, %.1f requests/s.', requests, seconds,
+                     requests / seconds if seconds else 0.0)
+        for status_code, count in sorted(self.status_codes.items()):
+            tracer.trace('%d: %d', status_code, count)
+
+
+if __name__ == '__main__':
+    this_filename = __file__
+    mock_config = MockServerConfig(this_filename)
+    args = mock_config.get_arguments()
+    Tracer.configure(level=args.log_level)
+
+    tracer = Tracer('cli.mock')
+    openapi_filename = os.path.join(os.path.dirname(this_filename), args.openapi)
+    try:
+        data = load_spec(openapi_filename)
+        server = MockServer((args.host, args.port), MockApi(data, args.authorization_type))
+    except Exception as err:
+        tracer.error(describe_error(err, openapi_filename))
+        tracer.log()
+        raise SystemExit(1)
+
+    # Killing the mock API, as CI jobs do with background processes, stops it as Ctrl+C does
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    host, port = server.server_address[:2]
+    tracer.trace('Mock API of %s listening on http://%s:%d, press Ctrl+C to stop.', openapi_filename, host, port)
+    tracer.log()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    server.summarize(tracer)
+    tracer.log()
@@ -0,0 +1,64 @@
+import cProfile
+import io
+import pstats
+import tracemalloc
+
+
+class Profiler:
+    """
+    Profile a run with cProfile and trace its memory with tracemalloc, used as a context manager.
+
+    On exit the cProfile stats are saved to the file given, to be read with pstats or snakeviz,
+    and a text report is saved next to it with the peak memory, the functions that took the most time
+    and the lines holding the most memory at the end. Only the current process is profiled, not its workers.
+
+    Params:
+      - filename: Path of the cProfile stats, the report is saved with ".txt" appended
+      - top: Number of functions and lines in the report
+    """
+
+    def __init__(self, filename, top=30):
+        self.filename = filename
+        self.report_filename = f'{filename}.txt'
+        self.top = top
+        self.peak = 0
+        self._profile = None
+
+    def __enter__(self):
+        tracemalloc.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profile.disable()
+        _, self.peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        self._profile.dump_stats(self.filename)
+        with open(self.report_filename, 'w') as file:
+            file.write(self.create_report(snapshot))
+        return False
+
+    def create_report(self, snapshot):
+        """
+        Create the text report of the run
+
+        Params:
+          - snapshot: tracemalloc snapshot taken at the end of the run
+
+        Returns: String with the report
+        """
+
+        stream = io.StringIO()
+        stream.write(f'Peak memory: {self.peak / 1024 / 1024:.1f} MB\n\n')
+
+        stream.write(f'Top {self.top} functions by cumulative time:\n')
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        stream.write(f'Top {self.top} lines by memory still allocated at the end:\n')
+        for statistic in snapshot.statistics('lineno')[:self.top]:
+            stream.write(f'  {statistic}\n')
+        return stream.getvalue()
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+# Floats written by orjson with an exponent ("1e16", "1e-7") differ from the stdlib ("1e+16", "1e-07")
+_EXPONENT = re.compile(rb'\de[-\d]')
+# Integers beyond 64 bits are parsed as floats by orjson, they are found as runs of 20 digits
+_DIGITS = bytes.maketrans(b'123456789', b'000000000')
+_LONG_DIGITS = b'0' * 20
+# With ensure_ascii the stdlib escapes every character outside [ -~], orjson already escapes the control characters
+# alike, so DEL and the non-ASCII characters are left, and the line breaks of the indentation must be kept
+_NON_ASCII = re.compile('[^\x00-\x7e]')
+
+
+def get_available_backends():
+    backends = ['json']
+    if ujson is not None:
+        backends.insert(0, 'ujson')
+    if orjson is not None:
+        backends.insert(0, 'orjson')
+    return backends
+
+
+backend = get_available_backends()[0]
+
+
+def set_backend(name):
+    """
+    Choose the library used to parse and encode JSON
+
+    Params:
+      - name: orjson, ujson or json, which must be installed
+    """
+
+    global backend
+    if name not in get_available_backends():
+        raise ValueError(f'JSON backend "{name}" is not installed')
+    backend = name
+
+
+set_backend(os.environ.get('OPENAPI2PM_JSON_BACKEND') or backend)
+
+
+def loads(data):
+    """
+    Parse a JSON document, with the same result of json.loads
+
+    Params:
+      - data: String or bytes with the JSON
+
+    Returns: The parsed object
+    """
+
+    if backend != 'json':
+        binary = data.encode('utf-8') if isinstance(data, str) else data
+        if _LONG_DIGITS not in binary.translate(_DIGITS):
+            try:
+                return orjson.loads(data) if backend == 'orjson' else ujson.loads(data)
+            except (ValueError, TypeError):
+                # Documents the fast libraries reject, as NaN, get the stdlib result or error
+                pass
+    return json.loads(data)
+
+
+def load(file):
+    return loads(file.read())
+
+
+def has_non_finite_float(obj):
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(has_non_finite_float(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(has_non_finite_float(value) for value in obj)
+    return False
+
+
+def escape_non_ascii_char(match):
+    code = ord(match.group())
+    if code > 0xffff:
+        code -= 0x10000
+        return '\\u{:04x}\\u{:04x}'.format(0xd800 | (code >> 10), 0xdc00 | (code & 0x3ff))
+    return '\\u{:04x}'.format(code)
+
+
+def has_exponent(data):
+    """
+    Check if JSON encoded by orjson has a float with an exponent.
+    Matches inside strings, as in "\\u00e1", are told apart by what comes before the number.
+
+    Params:
+      - data: Bytes with the JSON
+
+    Returns: True when there may be such a float
+    """
+
+    for match in _EXPONENT.finditer(data):
+        start = match.start()
+        while start > 0 and data[start - 1] in b'0123456789.-':
+            start -= 1
+        if start == 0 or data[start - 1] in b'[:, \n':
+            return True
+    return False
+
+
+def reindent(data, indent):
+    """
+    Change the indentation of JSON encoded by orjson from 2 spaces to any other.
+    Strings never contain raw line breaks, so every line starts with its indentation.
+
+    Params:
+      - data: Bytes with the JSON
+      - indent: Number of spaces of each nesting level
+
+    Returns: Bytes with the reindented JSON
+    """
+
+    if indent == 2:
+        return data
+
+    lines = []
+    for line in data.split(b'\n'):
+        stripped = line.lstrip(b' ')
+        lines.append(b' ' * ((len(line) - len(stripped)) // 2 * indent) + stripped)
+    return b'\n'.join(lines)
+
+
+def dumps_fast(obj, indent, sort_keys):
+    """
+    Encode an object with indentation using orjson, only when the result is equal to json.dumps
+
+    Returns: Bytes with the JSON, None when the stdlib must encode the object
+    """
+
+    option = orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+
+    try:
+        data = orjson.dumps(obj, option=option)
+    except TypeError:
+        # Integers beyond 64 bits and keys that aren't strings
+        return None
+
+    if has_exponent(data) or (b'null' in data and has_non_finite_float(obj)):
+        return None
+    return reindent(data, indent)
+
+
+def dumps_stdlib(obj, indent, ensure_ascii, sort_keys):
+    separators = (',', ': ') if indent is not None else (',', ':')
+    return json.dumps(obj, ensure_ascii=ensure_ascii, indent=indent, separators=separators, sort_keys=sort_keys)
+
+
+def dumps(obj, indent=None, ensure_ascii=False, sort_keys=False):
+    """
+    Encode an object as JSON, with the same result of json.dumps.
+
+    orjson only encodes indented JSON, which the stdlib encodes in pure Python, and only when its output
+    is known to be equal. Minified JSON is left to the C encoder of the stdlib, as checking the floats written
+    by orjson costs about as much as encoding. ujson is only used to parse, its output differs on escaping and floats.
+
+    Params:
+      - obj: Object to encode
+      - indent: Number of spaces of each nesting level, None to minify
+      - ensure_ascii: Whether to escape non-ASCII characters
+      - sort_keys: Whether to sort the keys of objects
+
+    Returns: String with the JSON
+    """
+
+    if backend == 'orjson' and indent is not None:
+        data = dumps_fast(obj, indent, sort_keys)
+        if data is not None:
+            text = data.decode('utf-8')
+            if ensure_ascii and (not data.isascii() or b'\x7f' in data):
+                # Non-ASCII characters and DEL only appear inside strings, escaped as the stdlib does
+                text = _NON_ASCII.sub(escape_non_ascii_char, text)
+            return text
+    return dumps_stdlib(obj, indent, ensure_ascii, sort_keys)
+
@@ -1,16 +1,213 @@
-class Tracer:
-    """
-    Responsible to handle logging inside functions on script
-    """
-
-    def __init__(self, namespace):
-        self.namespace = namespace
-        self.messages = []
-
-    def trace(self, msg):
-        message = f'>>> {self.namespace}:: {msg}'
-        self.messages.append(message)
-
-    def log(self):
-        for msg in self.messages:
-            print(msg)
+import contextlib
+import threading
+import time
+
+
+class Span:
+    """
+    Timing of a phase, measured while used as a context manager and recorded on exit
+    """
+
+    __slots__ = ('recorder', 'path', 'start', 'children_seconds')
+
+    def __init__(self, recorder, path):
+        self.recorder = recorder
+        self.path = path
+        self.start = 0.0
+        self.children_seconds = 0.0
+
+    def __enter__(self):
+        self.recorder.get_stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        stack = self.recorder.get_stack()
+        stack.pop()
+        if stack:
+            stack[-1].children_seconds += seconds
+        self.recorder.add(self.path, 1, seconds, seconds - self.children_seconds)
+        return False
+
+
+class SpanRecorder:
+    """
+    Aggregate the timing of nested phases by their path, e.g. "write/bad_requests/ref_resolution".
+
+    A phase entered again inside itself, as in recursive functions, is counted in the outer one.
+    When disabled, spans cost a single attribute lookup.
+    """
+
+    null_span = contextlib.nullcontext()
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def get_current_path(self):
+        stack = self.get_stack()
+        return stack[-1].path if stack else ''
+
+    def span(self, name):
+        """
+        Create the span of a phase inside the current one
+
+        Params:
+          - name: Name of the phase
+
+        Returns: Context manager measuring the phase
+        """
+
+        if not self.enabled:
+            return SpanRecorder.null_span
+
+        stack = self.get_stack()
+        if not stack:
+            return Span(self, name)
+        if stack[-1].path.rsplit('/', 1)[-1] == name:
+            return SpanRecorder.null_span
+        return Span(self, f'{stack[-1].path}/{name}')
+
+    def add(self, path, calls, seconds, self_seconds):
+        with self._lock:
+            stats = self.stats.get(path)
+            if stats is None:
+                self.stats[path] = [calls, seconds, self_seconds]
+            else:
+                stats[0] += calls
+                stats[1] += seconds
+                stats[2] += self_seconds
+
+    def snapshot(self, reset=False):
+        """
+        Get the aggregated timings
+
+        Params:
+          - reset: Whether to clear the timings after taking them
+
+        Returns: Dict of path to [calls, seconds, self seconds]
+        """
+
+        with self._lock:
+            stats = {path: list(values) for path, values in self.stats.items()}
+            if reset:
+                self.stats = {}
+        return stats
+
+    def merge(self, stats):
+        """
+        Add timings recorded elsewhere, e.g. in a worker process, inside the current phase
+
+        Params:
+          - stats: Dict of path to [calls, seconds, self seconds]
+        """
+
+        prefix = self.get_current_path()
+        for path, (calls, seconds, self_seconds) in stats.items():
+            self.add(f'{prefix}/{path}' if prefix else path, calls, seconds, self_seconds)
+
+    def get_summary(self):
+        """
+        Get the timings of all phases, each one followed by its inner phases
+
+        Returns: List of dicts with the phase path, depth, calls, seconds and self seconds
+        """
+
+        stats = self.snapshot()
+        return [
+            {
+                'phase': path,
+                'depth': path.count('/'),
+                'calls': stats[path][0],
+                'seconds': stats[path][1],
+                'self_seconds': stats[path][2]
+            }
+            for path in sorted(stats, key=lambda path: path.split('/'))
+        ]
+
+    def format_summary(self):
+        """
+        Format the timings of all phases as a table
+
+        Returns: String with one line for each phase
+        """
+
+        lines = [f'{"phase":<40} {"calls":>9} {"total":>10} {"self":>10}']
+        for row in self.get_summary():
+            name = '  ' * row['depth'] + row['phase'].rsplit('/', 1)[-1]
+            lines.append(f'{name:<40} {row["calls"]:>9} {row["seconds"]:>9.3f}s {row["self_seconds"]:>9.3f}s')
+        return '\n'.join(lines)
+
+
+class Tracer:
+    """
+    Responsible to handle logging inside functions on script.
+
+    Messages below the current level are discarded, and the others are only formatted when logged,
+    using the printf-style arguments given to trace.
+    """
+
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+
+    levels = {
+        'debug': DEBUG,
+        'info': INFO,
+        'warning': WARNING,
+        'error': ERROR
+    }
+
+    level = INFO
+    spans = SpanRecorder()
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.messages = []
+
+    @staticmethod
+    def configure(level=None, spans=None):
+        """
+        Configure tracing for the whole process
+
+        Params:
+          - level: Name of the minimum level of the messages logged
+          - spans: Whether to record the timing of phases
+        """
+
+        if level is not None:
+            Tracer.level = Tracer.levels[level]
+        if spans is not None:
+            Tracer.spans.enabled = spans
+
+    @staticmethod
+    def span(name):
+        return Tracer.spans.span(name)
+
+    def trace(self, msg, *args, level=INFO):
+        if level >= Tracer.level:
+            self.messages.append((msg, args))
+
+    def debug(self, msg, *args):
+        self.trace(msg, *args, level=Tracer.DEBUG)
+
+    def error(self, msg, *args):
+        self.trace(msg, *args, level=Tracer.ERROR)
+
+    def format(self, msg, args):
+        return f'>>> {self.namespace}:: {msg % args if args else msg}'
+
+    def log(self):
+        for msg, args in self.messages:
+            print(self.format(msg, args))
+        self.messages = []
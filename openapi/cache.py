@@ -0,0 +1,204 @@
+import math
+import threading
+
+from collections import OrderedDict
+
+
+def count_values(obj):
+    """
+    Count the JSON values of an object, nested ones included, as an estimate of its size
+
+    Params:
+      - obj: JSON object
+
+    Returns: Number of values
+    """
+
+    count = 0
+    pending = [obj]
+    while pending:
+        value = pending.pop()
+        count += 1
+        if isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return count
+
+
+class ResolutionCache:
+    """
+    Memoize everything derived from the $ref's of a single OpenApi spec.
+
+    Resolved values are shared between all callers, so they must be treated as read-only.
+    The location of the spec file, when known, is kept here too, as the base of its external refs.
+
+    A value that stopped at a ref resolved around it depends on where it was resolved from, so it isn't memoized.
+    A value whose placeholders were all reached inside its own resolution, as a circular component resolved
+    from the top, is memoized apart and only used from the top again, as its refs would stop at the circular refs
+    resolved around it. This keeps every cached value independent from the order in which the refs were resolved.
+    Circular components are only expanded max_circular_depth levels inside each other, as the ways through
+    densely connected components grow factorially with their number.
+    """
+
+    max_circular_depth = 3
+
+    def __init__(self, openapi):
+        self.openapi = openapi
+        self.location = None
+        self.root_directory = None
+        self.hits = 0
+        self.misses = 0
+        self._spec_size = None
+        self._values = {}
+        self._circular_values = {}
+        self._local = threading.local()
+
+    def _state(self):
+        state = self._local
+        if not hasattr(state, 'stack'):
+            state.stack = []
+            # Positions in the stack of the circular refs being resolved
+            state.circular = []
+            # Lowest position in the stack a placeholder depended on, since the current ref started
+            state.lowest = math.inf
+        return state
+
+    def resolve(self, kind, ref, build, placeholder, is_circular=None):
+        """
+        Get the value of a ref from the cache or build it
+
+        Params:
+          - kind: Namespace of the value (e.g. "schema", "body")
+          - ref: Reference in the format: "#/components/schemas/Object"
+          - build: Function without arguments that builds the value
+          - placeholder: Function receiving the ref that returns the value used when the ref is circular
+          - is_circular: Function receiving the ref that tells if it references itself, None when the value
+            doesn't expand other refs of its kind
+
+        Returns: The value of the ref
+        """
+
+        key = (kind, ref)
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]
+
+        state = self._state()
+        if not state.circular and key in self._circular_values:
+            self.hits += 1
+            return self._circular_values[key]
+
+        if key in state.stack:
+            state.lowest = min(state.lowest, state.stack.index(key))
+            return placeholder(ref)
+
+        circular = is_circular is not None and is_circular(ref)
+        if circular and len(state.circular) >= self.max_circular_depth:
+            # The depth depends on every circular ref around, down to the first one
+            state.lowest = min(state.lowest, state.circular[0])
+            return placeholder(ref)
+
+        self.misses += 1
+        position = len(state.stack)
+        lowest = state.lowest
+        state.lowest = math.inf
+        state.stack.append(key)
+        if circular:
+            state.circular.append(position)
+        try:
+            value = build()
+        finally:
+            state.stack.pop()
+            if circular:
+                state.circular.pop()
+            inner_lowest = state.lowest
+            state.lowest = min(lowest, inner_lowest)
+
+        if inner_lowest == math.inf:
+            self._values[key] = value
+        elif inner_lowest >= position and not state.circular:
+            self._circular_values[key] = value
+
+        return value
+
+    @property
+    def size(self):
+        """
+        Estimate the memory held, as the values of the spec, counted once, and the values cached
+        """
+
+        if self._spec_size is None:
+            self._spec_size = count_values(self.openapi)
+        return self._spec_size + len(self)
+
+    def __len__(self):
+        return len(self._values) + len(self._circular_values)
+
+
+class SpecCacheRegistry:
+    """
+    Keeps one ResolutionCache per OpenApi spec, evicting the least recently used when full.
+
+    The registry is full when it has max_specs caches, or when their estimated sizes add up to more than max_size
+    values. Sizes are only checked as another spec is added, and the cache just added is never evicted.
+    A single spec, as the CLI and the API workers keep, is never walked to estimate its size.
+    Specs are tracked by identity, so a spec must not be changed after its first resolution.
+    """
+
+    max_specs = 16
+    max_size = 1000000
+
+    _caches = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def for_spec(cls, openapi):
+        """
+        Get the cache of the given spec, creating it if needed
+
+        Params:
+          - openapi: OpenApi JSON
+
+        Returns: ResolutionCache of the spec
+        """
+
+        key = id(openapi)
+        with cls._lock:
+            cache = cls._caches.get(key)
+            # The cache keeps a reference to its spec, so the id can only be reused after eviction
+            if cache is not None and cache.openapi is openapi:
+                cls._caches.move_to_end(key)
+                return cache
+
+            cache = ResolutionCache(openapi)
+            cls._caches[key] = cache
+            while len(cls._caches) > cls.max_specs:
+                cls._caches.popitem(last=False)
+
+            if len(cls._caches) > 1:
+                size = sum(other.size for other in cls._caches.values())
+                while len(cls._caches) > 1 and size > cls.max_size:
+                    _, evicted = cls._caches.popitem(last=False)
+                    size -= evicted.size
+
+            return cache
+
+    @classmethod
+    def evict(cls, openapi):
+        """
+        Drop the cache of the given spec
+
+        Params:
+          - openapi: OpenApi JSON
+        """
+
+        with cls._lock:
+            cache = cls._caches.get(id(openapi))
+            if cache is not None and cache.openapi is openapi:
+                del cls._caches[id(openapi)]
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._caches.clear()
@@ -0,0 +1,144 @@
+import os
+import threading
+
+from urllib.parse import unquote
+
+from cli import serialization
+from cli.exceptions import InvalidRefError
+
+
+def split_ref(ref):
+    """
+    Split a $ref into the file it points to and its JSON pointer
+
+    Params:
+      - ref: Reference in the format: "common.json#/components/schemas/Object"
+
+    Returns: Tuple with the file, empty for local refs, and the JSON pointer
+    """
+
+    filename, _, pointer = ref.partition('#')
+    return filename, unquote(pointer)
+
+
+def resolve_pointer(document, pointer, ref):
+    """
+    Get the value of a JSON pointer (RFC 6901) inside a document
+
+    Params:
+      - document: JSON document
+      - pointer: JSON pointer, empty for the whole document
+      - ref: Reference being resolved, used on errors
+
+    Returns: The value found
+    """
+
+    value = document
+    if not pointer:
+        return value
+
+    for token in pointer.split('/')[1:]:
+        token = token.replace('~1', '/').replace('~0', '~')
+        try:
+            value = value[int(token)] if isinstance(value, list) else value[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise InvalidRefError(f'Reference "{ref}" was not found.')
+    return value
+
+
+class DocumentCache:
+    """
+    Keeps the documents reached by external $ref's, each one loaded and parsed once per process.
+
+    The $ref's inside a loaded document are rewritten with the absolute path of the file they point to,
+    so they mean the same from any other document. The files each document references are kept as the edges
+    of the dependency graph, which is walked without parsing the documents again.
+    A document is only loaded again when its file changes.
+    """
+
+    _documents = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def rewrite_refs(document, path):
+        """
+        Make the $ref's of a document absolute
+
+        Params:
+          - document: JSON document, changed in place
+          - path: Absolute path of the document
+
+        Returns: Set with the absolute paths of the files referenced
+        """
+
+        dependencies = set()
+        directory = os.path.dirname(path)
+        pending = [document]
+        while pending:
+            obj = pending.pop()
+            if isinstance(obj, dict):
+                ref = obj.get('$ref')
+                if isinstance(ref, str):
+                    filename, _, pointer = ref.partition('#')
+                    target = os.path.normpath(os.path.join(directory, filename)) if filename else path
+                    if target != path:
+                        dependencies.add(target)
+                    obj['$ref'] = f'{target}#{pointer}'
+                pending.extend(obj.values())
+            elif isinstance(obj, list):
+                pending.extend(obj)
+
+        return dependencies
+
+    @classmethod
+    def load(cls, path):
+        """
+        Get a document from the cache, loading it when it isn't there or its file changed
+
+        Params:
+          - path: Absolute path of the document
+
+        Returns: Tuple with the document, which must not be changed, and the set of files it references
+        """
+
+        mtime = os.stat(path).st_mtime_ns
+        with cls._lock:
+            entry = cls._documents.get(path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1], entry[2]
+
+        with open(path) as file:
+            document = serialization.load(file)
+        dependencies = DocumentCache.rewrite_refs(document, path)
+
+        with cls._lock:
+            cls._documents[path] = (mtime, document, dependencies)
+        return document, dependencies
+
+    @classmethod
+    def load_all(cls, paths):
+        """
+        Load the documents of the given files and of every file they reference, directly or not
+
+        Params:
+          - paths: Absolute paths of the documents
+
+        Returns: List with the absolute paths of all documents, in the order they were reached
+        """
+
+        loaded = []
+        pending = list(paths)
+        while pending:
+            path = pending.pop(0)
+            if path in loaded:
+                continue
+            loaded.append(path)
+            _, dependencies = cls.load(path)
+            pending.extend(sorted(dependencies))
+
+        return loaded
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._documents.clear()
@@ -0,0 +1,234 @@
+import re
+
+from .openapi import OpenApi
+from cli import serialization
+
+
+class MockResponse:
+    """
+    A response of the mock API, encoded once and sent to every request answered with it.
+    """
+
+    __slots__ = ('status_code', 'body')
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+
+class MockOperation:
+    """
+    An operation of the spec with its responses already encoded, and the component its request body must follow.
+
+    Params:
+      - openapi: OpenApi JSON
+      - method: Request HTTP method (GET, POST, PUT, PATCH, DELETE)
+      - specs: Operation object of the spec
+    """
+
+    __slots__ = ('method', 'responses', 'success_status_code', 'bad_request_status_code', 'component_name',
+                 'requires_authorization')
+
+    def __init__(self, openapi, method, specs):
+        self.method = method
+        self.responses = {
+            status_code: MockResponse(int(status_code), MockOperation.create_response_body(openapi, response))
+            for status_code, response in specs['responses'].items() if status_code.isdigit()
+        }
+
+        success_status_codes = [status_code for status_code in self.responses if status_code.startswith('2')]
+        self.success_status_code = success_status_codes[0] if success_status_codes else None
+        self.bad_request_status_code = next((code for code in ('400', '422') if code in self.responses), None)
+        self.requires_authorization = '401' in self.responses
+
+        self.component_name = None
+        if method in ('POST', 'PATCH', 'PUT') and 'requestBody' in specs:
+            schema = specs['requestBody'].get('content', {}).get('application/json', {}).get('schema', {})
+            self.component_name = schema.get('$ref')
+
+    @staticmethod
+    def create_response_body(openapi, response):
+        """
+        Create the body of a response, with the same fake data used on the requests
+
+        Params:
+          - openapi: OpenApi JSON
+          - response: Response object of the spec
+
+        Returns: Bytes with the JSON body, empty when the response has no content
+        """
+
+        if 'content' not in response:
+            return b''
+
+        schema = response['content'].get('application/json', {}).get('schema', {})
+        if '$ref' in schema:
+            body = OpenApi.get_json_body_from_component(openapi, schema['$ref'])
+        elif schema.get('type') == 'array' and '$ref' in schema.get('items', {}):
+            body = [OpenApi.get_json_body_from_component(openapi, schema['items']['$ref'])]
+        elif schema.get('type') == 'array':
+            body = []
+        elif 'properties' in schema:
+            body = OpenApi.create_json_body_from_properties(openapi, schema['properties'])
+        else:
+            body = {}
+        return serialization.dumps(body).encode('utf-8')
+
+    def get_response(self, status_code):
+        response = self.responses.get(status_code)
+        if response is None:
+            response = MockResponse(int(status_code), b'')
+        return response
+
+
+class MockApi:
+    """
+    Answer the requests of a generated collection from the spec, without a real backend.
+
+    Each operation answers with its first 2xx status code, unless the request is one of the generated bad requests:
+      - 401 when the operation has a 401 response and a header of the authorization type is missing
+      - 400, or 422, when the operation has one of them and a required field of the body is missing,
+        empty or in the wrong type, following the required fields that are $ref
+      - 501 when no path and method of the spec match the request
+    Fields are checked as the fake bodies and the bad requests assume them, so a body as the generated ones is
+    accepted: types other than boolean, number, array and object hold strings, and a field isn't empty when
+    its fake value is already empty.
+
+    Params:
+      - openapi: OpenApi JSON
+      - authorization_type: Authorization type whose headers are required (none, oauth)
+    """
+
+    authorization_headers = {
+        'none': (),
+        'oauth': ('client_id', 'access_token')
+    }
+
+    not_implemented = MockResponse(501, serialization.dumps({'message': 'Not implemented'}).encode('utf-8'))
+
+    def __init__(self, openapi, authorization_type='none'):
+        self.openapi = openapi
+        self.required_headers = MockApi.authorization_headers[authorization_type]
+        self.routes = []
+        # Literal segments are matched before path parameters, so "/orders/latest" wins over "/orders/{id}"
+        for endpoint in sorted(openapi['paths'], key=MockApi.get_templated_segments):
+            pattern = re.compile('^' + re.sub(r'\\{[^/]*\\}', '[^/]+', re.escape(endpoint.strip('/'))) + '$')
+            methods = {
+                operation.upper(): MockOperation(openapi, operation.upper(), specs)
+                for operation, specs in openapi['paths'][endpoint].items()
+            }
+            self.routes.append((pattern, methods))
+
+    @staticmethod
+    def get_templated_segments(endpoint):
+        """
+        Tell which segments of an endpoint are path parameters
+
+        Params:
+          - endpoint: Path of the spec, e.g. "/orders/{id}"
+
+        Returns: List with whether each segment is a path parameter
+        """
+
+        return ['{' in segment for segment in endpoint.strip('/').split('/')]
+
+    def find_operation(self, method, path):
+        """
+        Find the operation of a request, path parameters match any value
+
+        Params:
+          - method: Request HTTP method
+          - path: Path of the request, without the query string
+
+        Returns: MockOperation, None when the spec doesn't have it
+        """
+
+        path = '/'.join(segment for segment in path.split('/') if segment)
+        for pattern, methods in self.routes:
+            # Another route may match the same path with the method, as "/orders/{id}" after "/orders/latest"
+            if pattern.match(path) and method in methods:
+                return methods[method]
+        return None
+
+    def handle(self, method, path, headers, body):
+        """
+        Answer a request
+
+        Params:
+          - method: Request HTTP method
+          - path: Path of the request, without the query string
+          - headers: Dict-like of the request headers, with case-insensitive keys
+          - body: Bytes of the request body
+
+        Returns: MockResponse
+        """
+
+        operation = self.find_operation(method, path)
+        if operation is None:
+            return MockApi.not_implemented
+
+        if operation.requires_authorization and any(headers.get(key) is None for key in self.required_headers):
+            return operation.get_response('401')
+
+        if operation.component_name is not None and operation.bad_request_status_code is not None:
+            try:
+                data = serialization.loads(body or b'null')
+            except ValueError:
+                data = None
+            if not self.is_valid_body(operation.component_name, data):
+                return operation.get_response(operation.bad_request_status_code)
+
+        if operation.success_status_code is None:
+            return MockResponse(200, b'')
+        return operation.get_response(operation.success_status_code)
+
+    @staticmethod
+    def is_of_type(value, field_type):
+        if field_type == 'boolean':
+            return isinstance(value, bool)
+        if field_type == 'number':
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+        if field_type == 'array':
+            return isinstance(value, list)
+        if field_type == 'object':
+            return isinstance(value, dict)
+        return isinstance(value, str)
+
+    def is_valid_body(self, component_name, body, visited=frozenset()):
+        """
+        Check the required fields of a body, and of the components of the required fields that are $ref
+
+        Params:
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+          - body: JSON body of the request
+          - visited: Components already checked from the request body down, not checked again
+
+        Returns: Whether the body would be accepted
+        """
+
+        if not isinstance(body, dict):
+            return False
+
+        specs = OpenApi.resolve_ref(self.openapi, component_name)
+        fake_body = OpenApi.get_json_body_from_component(self.openapi, component_name) or {}
+        visited = visited | {component_name}
+        for required_field in specs.get('required', []):
+            if required_field not in body:
+                return False
+
+            prop = specs['properties'][required_field]
+            prop_type = prop.get('type', 'object') if '$ref' in prop else prop['type']
+            value = body[required_field]
+            if not MockApi.is_of_type(value, prop_type):
+                return False
+            if value in ('', [], {}) and fake_body.get(required_field) not in ('', [], {}):
+                return False
+
+            if '$ref' in prop:
+                if prop['$ref'] not in visited and not self.is_valid_body(prop['$ref'], value, visited):
+                    return False
+            elif prop_type == 'array' and '$ref' in prop['items'] and prop['items']['$ref'] not in visited:
+                if not all(self.is_valid_body(prop['items']['$ref'], item, visited) for item in value):
+                    return False
+
+        return True
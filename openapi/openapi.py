@@ -1,141 +1,395 @@
-import copy
-
-
-class OpenApi:
-
-    @staticmethod
-    def get_inside_object_properties(openapi, specs):
-        """
-        Get all properties for all objects inside the given object recursively
-
-        Params:
-          - openapi: OpenApi JSON
-          - specs: JSON Schema of the object
-
-        Returns: JSON Schema of the object
-        """
-
-        json_schema = copy.deepcopy(specs)
-        if '$ref' in specs:
-            json_schema = OpenApi.get_json_schema_from_component(openapi, specs['$ref'])
-        elif 'type' in specs:
-            if specs['type'] == 'object':
-                properties = specs['properties']
-
-                for prop in properties:
-                    if '$ref' in properties[prop]:
-                        sub_prop_component_name = properties[prop]['$ref']
-                        json_schema['properties'][prop] = OpenApi.get_json_schema_from_component(openapi,
-                                                                                                 sub_prop_component_name)
-                    elif properties[prop]['type'] == 'object' and 'properties' in properties[prop]:
-                        json_schema['properties'][prop] = OpenApi.get_inside_object_properties(openapi,
-                                                                                               specs['properties'][
-                                                                                                   prop])
-
-            if specs['type'] == 'array':
-                items = specs['items']
-
-                if '$ref' in specs['items']:
-                    json_schema['items'] = OpenApi.get_json_schema_from_component(openapi, specs['items']['$ref'])
-                else:
-                    json_schema['items'] = OpenApi.get_inside_object_properties(openapi, specs['items'])
-
-        return json_schema
-
-    @staticmethod
-    def get_json_schema_from_component(openapi, component_name):
-        """
-        Get the JSON Schema defined on Swagger of a given component by it's name
-
-        Params:
-          - openapi: OpenApi JSON
-          - component_name: Name of the component in the format: "#/components/schemas/Object"
-
-        Returns: JSON Schema of the object
-        """
-
-        schema_name = component_name.split('/')[-1]
-        specs = openapi['components']['schemas'][schema_name]
-        return OpenApi.get_inside_object_properties(openapi, specs)
-
-    @staticmethod
-    def get_server_host_url(openapi, environment):
-        """
-        Get the host URL defined on Swagger by it's description
-
-        Params:
-          - openapi: OpenApi JSON
-          - environment: Description of the environment defined on swagger
-
-        Returns: String of the environment URL if found
-        """
-
-        for server in openapi['servers']:
-            if server['description'] == environment:
-                return server['url']
-
-        return None
-
-    @staticmethod
-    def create_json_body_from_properties(openapi, properties):
-        """
-        Creates a fake json body from a given object properties defined on json schema of a swagger
-
-        Params:
-          - openapi: OpenApi JSON
-          - properties: Object properties of the field on JSON Schema
-
-        Returns: JSON body object with fake data
-        """
-
-        body = {}
-        for prop in properties.keys():
-
-            if '$ref' in properties[prop]:
-                body[prop] = OpenApi.get_json_body_from_component(openapi, properties[prop]['$ref'])
-                continue
-
-            prop_type = properties[prop]['type']
-            if prop_type == 'boolean':
-                body[prop] = False
-            elif prop_type == 'number':
-                body[prop] = 0
-            elif prop_type == 'array':
-                body[prop] = []
-                if '$ref' in properties[prop]['items']:
-                    subcomponent_name = properties[prop]['items']['$ref']
-                    item = OpenApi.get_json_body_from_component(openapi, subcomponent_name)
-                    body[prop].append(item)
-            elif prop_type == 'object':
-                subproperties = properties[prop]['properties']
-                body[prop] = OpenApi.create_json_body_from_properties(openapi, subproperties)
-            elif not prop_type and '$ref' in properties[prop]:
-                subcomponent_name = properties[prop]['$ref']
-                body[prop] = OpenApi.get_json_body_from_component(openapi, subcomponent_name)
-            else:
-                body[prop] = 'string'
-
-        return body
-
-    @staticmethod
-    def get_json_body_from_component(openapi, component_name):
-        """
-        Calls create_json_body_from_properties to create fake json body of a given component
-
-        Params:
-          - openapi: OpenApi JSON
-          - component_name: Name of the component in the format: "#/components/schemas/Object"
-
-        Returns: JSON body object with fake data
-        """
-
-        schema = component_name.split('/')[-1]
-        specs = openapi['components']['schemas'][schema]
-        body = None
-
-        if 'properties' in specs:
-            body = OpenApi.create_json_body_from_properties(openapi, specs['properties'])
-        elif 'items' in specs:
-            body = OpenApi.get_inside_object_properties(openapi, specs['items'])
-        return body
-
+import copy
+import os
+
+from .cache import SpecCacheRegistry
+from .documents import DocumentCache, resolve_pointer, split_ref
+from cli.exceptions import InvalidRefError
+from cli.tracer import Tracer
+
+
+class OpenApi:
+
+    @staticmethod
+    def set_location(openapi, filename, root_directory=None):
+        """
+        Inform the file of a spec, which its relative external refs start from
+
+        Params:
+          - openapi: OpenApi JSON
+          - filename: Path of the OpenApi file
+          - root_directory: Directory the external refs must be inside of, None to allow any file
+        """
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        cache.location = os.path.abspath(filename)
+        cache.root_directory = os.path.abspath(root_directory) if root_directory is not None else None
+
+    @staticmethod
+    def get_location(openapi):
+        """
+        Get the file of a spec, as informed to set_location
+
+        Params:
+          - openapi: OpenApi JSON
+
+        Returns: Tuple with the path of the OpenApi file and the directory the external refs must be inside of,
+        both None when they weren't informed
+        """
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        return cache.location, cache.root_directory
+
+    @staticmethod
+    def get_ref_path(openapi, filename, ref):
+        """
+        Get the absolute path of the file of an external ref
+
+        Params:
+          - openapi: OpenApi JSON
+          - filename: File part of the ref
+          - ref: Reference being resolved, used on errors
+
+        Returns: String with the absolute path
+        """
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        if cache.location is None:
+            raise InvalidRefError(f'Reference "{ref}" points to another file, but the location of the spec is unknown.')
+
+        path = os.path.normpath(os.path.join(os.path.dirname(cache.location), filename))
+        root_directory = cache.root_directory
+        if root_directory is not None and os.path.commonpath([root_directory, path]) != root_directory:
+            raise InvalidRefError(f'Reference "{ref}" points outside of the allowed directory.')
+        return path
+
+    @staticmethod
+    def resolve_ref(openapi, ref):
+        """
+        Get the object a $ref points to, in the spec or in another file.
+        Local refs ("#/components/schemas/Object") and relative or absolute files, with or without
+        a JSON pointer ("common.json#/components/schemas/Object"), are supported.
+        Other files are loaded once per process by DocumentCache.
+        Objects that are only a $ref to another one, as components kept in other files, are followed.
+
+        Params:
+          - openapi: OpenApi JSON
+          - ref: Reference in the format: "#/components/schemas/Object"
+
+        Returns: The object found, which must not be changed
+        """
+
+        seen = set()
+        while True:
+            seen.add(ref)
+            filename, pointer = split_ref(ref)
+            document = openapi
+            if filename:
+                try:
+                    document, _ = DocumentCache.load(OpenApi.get_ref_path(openapi, filename, ref))
+                except FileNotFoundError:
+                    raise InvalidRefError(f'Reference "{ref}" points to a file that was not found.')
+            specs = resolve_pointer(document, pointer, ref)
+
+            if not (isinstance(specs, dict) and len(specs) == 1 and isinstance(specs.get('$ref'), str)):
+                return specs
+            if specs['$ref'] in seen:
+                raise InvalidRefError(f'Reference "{ref}" only points to itself.')
+            ref = specs['$ref']
+
+    @staticmethod
+    def load_external_documents(openapi):
+        """
+        Load every file referenced by the spec, directly or through other files, before the generation
+
+        Params:
+          - openapi: OpenApi JSON
+
+        Returns: List with the absolute paths of the files
+        """
+
+        paths = []
+        for ref in sorted(OpenApi.find_refs(openapi)):
+            filename, _ = split_ref(ref)
+            if filename:
+                path = OpenApi.get_ref_path(openapi, filename, ref)
+                if path not in paths:
+                    paths.append(path)
+
+        try:
+            return DocumentCache.load_all(paths)
+        except FileNotFoundError as err:
+            raise InvalidRefError(f'Referenced file {err.filename} was not found.')
+
+    @staticmethod
+    def get_inside_object_properties(openapi, specs):
+        """
+        Get all properties for all objects inside the given object recursively
+
+        Params:
+          - openapi: OpenApi JSON
+          - specs: JSON Schema of the object
+
+        Returns: JSON Schema of the object
+        """
+
+        json_schema = copy.deepcopy(specs)
+        if '$ref' in specs:
+            json_schema = OpenApi.get_json_schema_from_component(openapi, specs['$ref'])
+        elif 'type' in specs:
+            if specs['type'] == 'object':
+                properties = specs['properties']
+
+                for prop in properties:
+                    if '$ref' in properties[prop]:
+                        sub_prop_component_name = properties[prop]['$ref']
+                        json_schema['properties'][prop] = OpenApi.get_json_schema_from_component(openapi,
+                                                                                                 sub_prop_component_name)
+                    elif properties[prop]['type'] == 'object' and 'properties' in properties[prop]:
+                        json_schema['properties'][prop] = OpenApi.get_inside_object_properties(openapi,
+                                                                                               specs['properties'][
+                                                                                                   prop])
+
+            if specs['type'] == 'array':
+                items = specs['items']
+
+                if '$ref' in specs['items']:
+                    json_schema['items'] = OpenApi.get_json_schema_from_component(openapi, specs['items']['$ref'])
+                else:
+                    json_schema['items'] = OpenApi.get_inside_object_properties(openapi, specs['items'])
+
+        return json_schema
+
+    @staticmethod
+    def get_json_schema_from_component(openapi, component_name):
+        """
+        Get the JSON Schema defined on Swagger of a given component by it's name
+
+        Params:
+          - openapi: OpenApi JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: JSON Schema of the object, shared with other callers so it must not be changed
+        """
+
+        def build():
+            with Tracer.span('ref_resolution'):
+                specs = OpenApi.resolve_ref(openapi, component_name)
+                return OpenApi.get_inside_object_properties(openapi, specs)
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        return cache.resolve('schema', component_name, build, OpenApi.get_circular_schema_placeholder,
+                             lambda ref: OpenApi.is_circular_component(openapi, ref))
+
+    @staticmethod
+    def get_circular_schema_placeholder(component_name):
+        """
+        Get the JSON Schema used in place of a component that references itself
+
+        Params:
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: JSON Schema accepting any value
+        """
+
+        return {'description': f'Circular reference to {component_name}'}
+
+    @staticmethod
+    def get_server_host_url(openapi, environment):
+        """
+        Get the host URL defined on Swagger by it's description
+
+        Params:
+          - openapi: OpenApi JSON
+          - environment: Description of the environment defined on swagger
+
+        Returns: String of the environment URL if found
+        """
+
+        for server in openapi['servers']:
+            if server['description'] == environment:
+                return server['url']
+
+        return None
+
+    @staticmethod
+    def create_json_body_from_properties(openapi, properties):
+        """
+        Creates a fake json body from a given object properties defined on json schema of a swagger
+
+        Params:
+          - openapi: OpenApi JSON
+          - properties: Object properties of the field on JSON Schema
+
+        Returns: JSON body object with fake data
+        """
+
+        body = {}
+        for prop in properties.keys():
+
+            if '$ref' in properties[prop]:
+                body[prop] = OpenApi.get_json_body_from_component(openapi, properties[prop]['$ref'])
+                continue
+
+            prop_type = properties[prop]['type']
+            if prop_type == 'boolean':
+                body[prop] = False
+            elif prop_type == 'number':
+                body[prop] = 0
+            elif prop_type == 'array':
+                body[prop] = []
+                if '$ref' in properties[prop]['items']:
+                    subcomponent_name = properties[prop]['items']['$ref']
+                    item = OpenApi.get_json_body_from_component(openapi, subcomponent_name)
+                    body[prop].append(item)
+            elif prop_type == 'object':
+                subproperties = properties[prop]['properties']
+                body[prop] = OpenApi.create_json_body_from_properties(openapi, subproperties)
+            elif not prop_type and '$ref' in properties[prop]:
+                subcomponent_name = properties[prop]['$ref']
+                body[prop] = OpenApi.get_json_body_from_component(openapi, subcomponent_name)
+            else:
+                body[prop] = 'string'
+
+        return body
+
+    @staticmethod
+    def get_json_body_from_component(openapi, component_name):
+        """
+        Calls create_json_body_from_properties to create fake json body of a given component
+
+        Params:
+          - openapi: OpenApi JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: JSON body object with fake data, shared with other callers so it must not be changed
+        """
+
+        def build():
+            with Tracer.span('body_generation'):
+                specs = OpenApi.resolve_ref(openapi, component_name)
+                body = None
+
+                if 'properties' in specs:
+                    body = OpenApi.create_json_body_from_properties(openapi, specs['properties'])
+                elif 'items' in specs:
+                    body = OpenApi.get_inside_object_properties(openapi, specs['items'])
+                return body
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        return cache.resolve('body', component_name, build, lambda ref: {},
+                             lambda ref: OpenApi.is_circular_component(openapi, ref))
+
+    @staticmethod
+    def find_refs(specs):
+        """
+        Find all references inside a JSON Schema or any other part of the OpenApi file
+
+        Params:
+          - specs: Object to search
+
+        Returns: Set of all $ref values found
+        """
+
+        refs = set()
+        pending = [specs]
+        while pending:
+            obj = pending.pop()
+            if isinstance(obj, dict):
+                if isinstance(obj.get('$ref'), str):
+                    refs.add(obj['$ref'])
+                pending.extend(obj.values())
+            elif isinstance(obj, list):
+                pending.extend(obj)
+
+        return refs
+
+    @staticmethod
+    def get_component_refs(openapi, component_name):
+        """
+        Get the components referenced directly by a component
+
+        Params:
+          - openapi: OpenApi JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: Frozenset with the names of the components
+        """
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        return cache.resolve(
+            'refs',
+            component_name,
+            lambda: frozenset(OpenApi.find_refs(OpenApi.resolve_ref(openapi, component_name))),
+            lambda ref: frozenset()
+        )
+
+    @staticmethod
+    def get_component_dependencies(openapi, component_name):
+        """
+        Get all components referenced by a component, directly or through other components
+
+        Params:
+          - openapi: OpenApi JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: Frozenset with the names of the component and all its dependencies
+        """
+
+        def build():
+            dependencies = set()
+            pending = [component_name]
+            while pending:
+                ref = pending.pop()
+                if ref in dependencies:
+                    continue
+                dependencies.add(ref)
+                pending.extend(OpenApi.get_component_refs(openapi, ref))
+            return frozenset(dependencies)
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        return cache.resolve('dependencies', component_name, build, lambda ref: frozenset([ref]))
+
+    @staticmethod
+    def is_circular_component(openapi, component_name):
+        """
+        Check if a component references itself, directly or through other components.
+        Refs that can't be resolved are left for the generation to report.
+
+        Params:
+          - openapi: OpenApi JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: True when the component is part of a circular reference
+        """
+
+        def build():
+            seen = set()
+            pending = [component_name]
+            while pending:
+                try:
+                    refs = OpenApi.get_component_refs(openapi, pending.pop())
+                except InvalidRefError:
+                    continue
+                if component_name in refs:
+                    return True
+                pending.extend(refs - seen)
+                seen |= refs
+            return False
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        return cache.resolve('circular', component_name, build, lambda ref: True)
+
+    @staticmethod
+    def clear_cache(openapi=None):
+        """
+        Drop the resolved components of a spec, or of all specs when none is given
+
+        Params:
+          - openapi: OpenApi JSON
+        """
+
+        if openapi is None:
+            SpecCacheRegistry.clear()
+        else:
+            SpecCacheRegistry.evict(openapi)
+
@@ -0,0 +1,115 @@
+from .writer import StreamedList
+
+
+class CollectionBuilder:
+    """
+    Assemble the Postman collection, indexing resource and operation folders by name.
+
+    Folders keep the order in which they were first requested.
+    """
+
+    schema = 'https://schema.getpostman.com/json/collection/v2.1.0/collection.json'
+
+    def __init__(self, collection_name):
+        self.collection = {
+            'info': {
+                'name': collection_name,
+                'schema': CollectionBuilder.schema
+            },
+            'item': []
+        }
+        self._resources = {}
+        self._operations = {}
+
+    @staticmethod
+    def create_folder(name):
+        return {
+            "name": name,
+            "item": [],
+            "protocolProfileBehavior": {},
+            "_postman_isSubFolder": True
+        }
+
+    def get_resource_folder(self, resource_name):
+        """
+        Get the resource folder from postman collection.
+        If doesn't exist, will create the resource folder
+
+        Params:
+          - resource_name: Name of the resource
+
+        Returns: Resource folder
+        """
+
+        folder = self._resources.get(resource_name)
+        if folder is None:
+            folder = CollectionBuilder.create_folder(resource_name)
+            self._resources[resource_name] = folder
+            self.collection['item'].append(folder)
+
+        return folder
+
+    def get_operation_folder(self, resource_name, operation_name):
+        """
+        Get the operation folder from postman collection.
+        If doesn't exist, will create the operation folder inside its resource folder
+
+        Params:
+          - resource_name: Name of the resource
+          - operation_name: Name of the operation
+
+        Returns: Operation folder
+        """
+
+        key = (resource_name, operation_name)
+        folder = self._operations.get(key)
+        if folder is None:
+            folder = CollectionBuilder.create_folder(operation_name)
+            self._operations[key] = folder
+            self.get_resource_folder(resource_name)['item'].append(folder)
+
+        return folder
+
+
+class CompiledCollection:
+    """
+    Folders and requests of a collection compiled once, whose operation folders hold CompiledRequest lists.
+    The same compilation emits the collection of any host URL and authorization type.
+
+    Params:
+      - collection: Collection whose requests don't depend on the host URL or the authorization type
+      - variables: Collection variables with the hoisted JSON Schemas, None when they are embedded
+    """
+
+    def __init__(self, collection, variables=None):
+        self.collection = collection
+        self.variables = variables
+
+    def emit(self, host_url, auth_type, collection_name=None):
+        """
+        Create the collection of a host URL and authorization type
+
+        Params:
+          - host_url: The base url for all requests
+          - auth_type: Authorization type to use on headers
+          - collection_name: Name of the collection, None to keep the compiled one
+
+        Returns: Collection whose requests are only bound while it is written by postman.writer
+        """
+
+        info = dict(self.collection['info'])
+        if collection_name is not None:
+            info['name'] = collection_name
+
+        resource_folders = []
+        for resource_folder in self.collection['item']:
+            operation_folders = []
+            for operation_folder in resource_folder['item']:
+                requests = (request.bind(host_url, auth_type) for request in operation_folder['item'])
+                operation_folders.append({**operation_folder, 'item': StreamedList(requests)})
+            resource_folders.append({**resource_folder, 'item': StreamedList(operation_folders)})
+
+        collection = {**self.collection, 'info': info, 'item': StreamedList(resource_folders)}
+        if self.variables is not None:
+            collection['variable'] = self.variables
+        return collection
@@ -0,0 +1,196 @@
+import hashlib
+import os
+
+from .writer import open_collection_file
+from openapi.cache import SpecCacheRegistry
+from openapi.openapi import OpenApi
+from cli import serialization
+
+
+def create_fingerprint(obj):
+    """
+    Create a fingerprint of a JSON object that doesn't depend on the order of its keys
+
+    Params:
+      - obj: JSON object
+
+    Returns: String with the SHA-256 of the canonical JSON
+    """
+
+    canonical = serialization.dumps(obj, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def create_component_fingerprint(openapi, component_name):
+    cache = SpecCacheRegistry.for_spec(openapi)
+    return cache.resolve(
+        'fingerprint',
+        component_name,
+        lambda: create_fingerprint(OpenApi.resolve_ref(openapi, component_name)),
+        lambda ref: None
+    )
+
+
+def create_operation_fingerprint(openapi, endpoint, operation):
+    """
+    Create the fingerprint of an operation, which changes when the operation or any component it uses changes
+
+    Params:
+      - openapi: OpenApi JSON
+      - endpoint: Endpoint of the operation
+      - operation: Operation of the endpoint (get, post, put, patch, delete)
+
+    Returns: String with the fingerprint
+    """
+
+    specs = openapi['paths'][endpoint][operation]
+    dependencies = set()
+    for ref in OpenApi.find_refs(specs):
+        dependencies |= OpenApi.get_component_dependencies(openapi, ref)
+
+    components = {ref: create_component_fingerprint(openapi, ref) for ref in dependencies}
+    return create_fingerprint([endpoint, operation, specs, components])
+
+
+def create_operation_key(endpoint, operation):
+    return f'{operation.upper()} {endpoint}'
+
+
+class Manifest:
+    """
+    Fingerprints of the operations of a generated collection and where their requests were placed.
+
+    A manifest loaded with its collection gives back the requests of the operations that didn't change,
+    so only the changed ones need to be generated again.
+    """
+
+    version = 2
+
+    def __init__(self, collection_filename, options_fingerprint, operations=None, collection=None):
+        self.collection_filename = collection_filename
+        self.options_fingerprint = options_fingerprint
+        self.operations = operations if operations is not None else {}
+        self._folders = {}
+        self._variables = {}
+        if collection is not None:
+            for resource_folder in collection['item']:
+                for operation_folder in resource_folder['item']:
+                    self._folders[(resource_folder['name'], operation_folder['name'])] = operation_folder['item']
+            for variable in collection.get('variable', []):
+                self._variables[variable['key']] = variable['value']
+
+    @staticmethod
+    def create_options_fingerprint(host_url, success_body, cmd_args):
+        """
+        Create the fingerprint of the options that change the requests of all operations
+
+        Params:
+          - host_url: The base url for all requests
+          - success_body: JSON body used on success requests instead of the fake data
+          - cmd_args: Arguments passed in command line
+
+        Returns: String with the fingerprint
+        """
+
+        return create_fingerprint([
+            Manifest.version,
+            host_url,
+            success_body,
+            cmd_args.authorization_type,
+            cmd_args.generate_body_on_requests,
+            cmd_args.generate_bad_requests,
+            cmd_args.hoist_schemas,
+            cmd_args.compact,
+            cmd_args.mutation_strategy,
+            cmd_args.mutation_depth_caps,
+            cmd_args.mutation_seed,
+            cmd_args.bad_request_budget
+        ])
+
+    @staticmethod
+    def get_filename(collection_filename):
+        if collection_filename.endswith('.gz'):
+            collection_filename = collection_filename[:-3]
+        return collection_filename.replace('.postman_collection.json', '') + '.postman_manifest.json'
+
+    @staticmethod
+    def load(filename):
+        """
+        Load a manifest and the collection it describes, which is looked up next to the manifest
+
+        Params:
+          - filename: Path of the manifest file
+
+        Returns: Manifest with the requests of the previous collection
+        """
+
+        with open(filename, encoding='utf-8') as manifest_file:
+            data = serialization.load(manifest_file)
+
+        if data.get('version') != Manifest.version:
+            return Manifest(data.get('collection'), None)
+
+        collection_filename = os.path.join(os.path.dirname(filename), data['collection'])
+        with open_collection_file(collection_filename) as collection_file:
+            collection = serialization.load(collection_file)
+
+        return Manifest(data['collection'], data['options'], data['operations'], collection)
+
+    def get_requests(self, key, fingerprint, options_fingerprint):
+        """
+        Get the requests generated for an operation in the previous collection
+
+        Params:
+          - key: Key of the operation, created by create_operation_key
+          - fingerprint: Current fingerprint of the operation
+          - options_fingerprint: Current fingerprint of the generation options
+
+        Returns: List of requests, None when the operation or the options changed
+        """
+
+        entry = self.operations.get(key)
+        if entry is None or entry['fingerprint'] != fingerprint or self.options_fingerprint != options_fingerprint:
+            return None
+
+        items = self._folders.get((entry['resource'], entry['operation']))
+        if items is None or len(items) < entry['offset'] + entry['requests']:
+            return None
+        if any(key not in self._variables for key in entry['variables']):
+            return None
+
+        return items[entry['offset']:entry['offset'] + entry['requests']]
+
+    def get_variables(self, key):
+        """
+        Get the collection variables used by the requests of an operation in the previous collection
+
+        Params:
+          - key: Key of the operation, created by create_operation_key
+
+        Returns: Dict of variable key to value
+        """
+
+        return {variable: self._variables[variable] for variable in self.operations[key]['variables']}
+
+    def add_operation(self, key, fingerprint, resource_name, operation_name, offset, number_of_requests,
+                      variables):
+        self.operations[key] = {
+            'fingerprint': fingerprint,
+            'resource': resource_name,
+            'operation': operation_name,
+            'offset': offset,
+            'requests': number_of_requests,
+            'variables': variables
+        }
+
+    def to_dict(self):
+        return {
+            'version': Manifest.version,
+            'collection': self.collection_filename,
+            'options': self.options_fingerprint,
+            'operations': self.operations
+        }
+
+    def save(self, filename):
+        with open(filename, 'w', encoding='utf-8') as manifest_file:
+            manifest_file.write(serialization.dumps(self.to_dict(), indent=4))
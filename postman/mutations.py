@@ -0,0 +1,298 @@
+import random
+
+from openapi.cache import SpecCacheRegistry
+from openapi.openapi import OpenApi
+
+
+class Mutation:
+    """
+    A single change applied on top of a JSON body: removes a field or replaces its value.
+
+    The body given to apply is never changed, only the top level object is copied.
+    """
+
+    __slots__ = ('field', 'description', 'value', 'kind', 'field_type')
+
+    MISSING = object()
+
+    def __init__(self, field, description, value=MISSING, kind='missing', field_type=None):
+        self.field = field
+        self.description = description
+        self.value = value
+        self.kind = kind
+        self.field_type = field_type
+
+    def apply(self, body):
+        """
+        Materialize the mutation over a body
+
+        Params:
+          - body: JSON body used as base, which is kept untouched
+
+        Returns: New JSON body with the mutation applied
+        """
+
+        if self.value is Mutation.MISSING:
+            return {key: value for key, value in body.items() if key != self.field}
+
+        mutated = dict(body)
+        mutated[self.field] = self.value
+        return mutated
+
+
+class RequiredField:
+    """
+    Mutations of a required field and, when the field is a $ref, the component to mutate inside it.
+    """
+
+    __slots__ = ('name', 'mutations', 'component_name', 'is_array')
+
+    def __init__(self, name, mutations, component_name=None, is_array=False):
+        self.name = name
+        self.mutations = mutations
+        self.component_name = component_name
+        self.is_array = is_array
+
+
+class BadRequestVariant:
+    """
+    A mutation of a component reached through a path of required $ref fields, from the request body down.
+
+    The body is only materialized by build, so variants can be enumerated without creating any of them.
+    """
+
+    __slots__ = ('path', 'mutation')
+
+    def __init__(self, path, mutation):
+        self.path = path
+        self.mutation = mutation
+
+    @property
+    def description(self):
+        return self.mutation.description
+
+    def build(self, openapi, body):
+        """
+        Materialize the variant. Each field of the path holds the fake body of its component,
+        inside a list when the field is an array, with the mutation applied on the innermost one.
+
+        Params:
+          - openapi: OpenApi JSON
+          - body: JSON body of the request, which is kept untouched
+
+        Returns: New JSON body of the bad request
+        """
+
+        bodies = [body] + [OpenApi.get_json_body_from_component(openapi, field.component_name) for field in self.path]
+        value = self.mutation.apply(bodies[-1])
+        for field, parent_body in zip(reversed(self.path), reversed(bodies[:-1])):
+            parent = dict(parent_body)
+            parent[field.name] = [value] if field.is_array else value
+            value = parent
+        return value
+
+
+class BodyTemplate:
+    """
+    Bad request mutations of a component, computed once per spec and shared by all its operations.
+    """
+
+    __slots__ = ('component_name', 'fields')
+
+    def __init__(self, component_name, fields):
+        self.component_name = component_name
+        self.fields = fields
+
+    @staticmethod
+    def for_component(openapi, component_name):
+        """
+        Get the template of a component from the spec cache, building it when needed
+
+        Params:
+          - openapi: OpenApi JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: BodyTemplate of the component
+        """
+
+        cache = SpecCacheRegistry.for_spec(openapi)
+        return cache.resolve(
+            'template',
+            component_name,
+            lambda: BodyTemplate.build(openapi, component_name),
+            lambda ref: BodyTemplate(ref, [])
+        )
+
+    def iter_variants(self, openapi, path=(), max_depth=None):
+        """
+        Enumerate the bad request variants of the component, following the required fields that are $ref.
+        The mutations of each field come before the ones of its component.
+        A component already in the path isn't followed again, so circular references end.
+
+        Params:
+          - openapi: OpenApi JSON
+          - path: RequiredFields from the request body down to this component
+          - max_depth: Number of $ref fields followed at most, None to follow all of them
+
+        Returns: Generator of BadRequestVariant
+        """
+
+        visited = {self.component_name}.union(field.component_name for field in path)
+        follow = max_depth is None or len(path) < max_depth
+        for field in self.fields:
+            for mutation in field.mutations:
+                yield BadRequestVariant(path, mutation)
+
+            if follow and field.component_name is not None and field.component_name not in visited:
+                template = BodyTemplate.for_component(openapi, field.component_name)
+                yield from template.iter_variants(openapi, path + (field,), max_depth)
+
+    @staticmethod
+    def build(openapi, component_name):
+        """
+        Create the mutations for all required fields of a component.
+        For each field:
+          - Without the required field
+          - With field in wrong type
+          - With field empty, for strings, arrays and objects
+
+        Params:
+          - openapi: OpenApi JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+
+        Returns: BodyTemplate with one RequiredField for each required field
+        """
+
+        specs = OpenApi.resolve_ref(openapi, component_name)
+
+        fields = []
+        for required_field in specs.get('required', []):
+            prop = specs['properties'][required_field]
+            prop_type = prop.get('type', 'object') if '$ref' in prop else prop['type']
+
+            mutations = [Mutation(required_field, f'sem {required_field}', field_type=prop_type)]
+
+            wrong_value = 'tipo inválido' if prop_type in ('boolean', 'number', 'array', 'object') else 10
+            mutations.append(Mutation(required_field, f'{required_field} tipagem inválida', wrong_value, 'type',
+                                      prop_type))
+
+            empty_values = {'string': '', 'array': [], 'object': {}}
+            if prop_type in empty_values:
+                mutations.append(Mutation(required_field, f'{required_field} vazio', empty_values[prop_type], 'empty',
+                                          prop_type))
+
+            if '$ref' in prop:
+                fields.append(RequiredField(required_field, mutations, prop['$ref']))
+            elif prop_type == 'array' and '$ref' in prop['items']:
+                fields.append(RequiredField(required_field, mutations, prop['items']['$ref'], is_array=True))
+            else:
+                fields.append(RequiredField(required_field, mutations))
+
+        return BodyTemplate(component_name, fields)
+
+
+class MutationStrategy:
+    """
+    Choose which bad request variants of an operation become requests:
+      - exhaustive: all of them
+      - depth: at most depth_caps[n] variants at each depth n of $ref fields, deeper fields aren't followed
+      - sample: a random sample of sample_size variants, the same for the same seed
+      - equivalence: one variant for each equivalence class of the bad requests, the pair of its mutation kind
+        (missing, wrong type, empty) and field type. Fields aren't combined, so this isn't pairwise coverage,
+        "pairwise" is only kept as an alias of its former name
+
+    The variants kept keep their order. The budget limits the bad requests of an operation, whatever the strategy.
+
+    Params:
+      - name: Name of the strategy
+      - depth_caps: Variants kept at each depth, for the depth strategy
+      - seed: Seed of the sample strategy
+      - budget: Number of bad requests of an operation at most, None for no limit
+    """
+
+    names = ('exhaustive', 'depth', 'sample', 'equivalence')
+    aliases = {'pairwise': 'equivalence'}
+
+    default_depth_caps = (10, 5, 2)
+    default_sample_size = 10
+
+    def __init__(self, name='exhaustive', depth_caps=None, seed=0, budget=None):
+        name = MutationStrategy.aliases.get(name, name)
+        if name not in MutationStrategy.names:
+            raise ValueError(f'Mutation strategy "{name}" is not supported')
+        if (budget is not None and budget < 0) or (depth_caps and min(depth_caps) < 0):
+            raise ValueError('Mutation depth caps and bad request budget must not be negative')
+        self.name = name
+        self.depth_caps = tuple(depth_caps) if depth_caps else MutationStrategy.default_depth_caps
+        self.seed = seed
+        self.budget = budget
+
+    @staticmethod
+    def from_cmd_args(cmd_args):
+        return MutationStrategy(
+            cmd_args.mutation_strategy,
+            cmd_args.mutation_depth_caps,
+            cmd_args.mutation_seed,
+            cmd_args.bad_request_budget
+        )
+
+    @property
+    def max_depth(self):
+        """
+        Number of $ref fields followed at most, None when all of them are
+        """
+
+        if self.name != 'depth':
+            return None
+        return len(self.depth_caps) - 1
+
+    def select(self, variants, key):
+        """
+        Choose the variants of the bad requests of a response
+
+        Params:
+          - variants: Iterable of BadRequestVariant, in the order of the requests
+          - key: String identifying the response, which seeds the sample strategy
+
+        Returns: Iterable of the BadRequestVariant kept, consumed lazily by all strategies except sample
+        """
+
+        if self.name == 'depth':
+            return self._select_by_depth(variants)
+        if self.name == 'sample':
+            return self._select_sample(variants, key)
+        if self.name == 'equivalence':
+            return self._select_equivalence_classes(variants)
+        return variants
+
+    def _select_by_depth(self, variants):
+        counts = [0] * len(self.depth_caps)
+        for variant in variants:
+            depth = len(variant.path)
+            if counts[depth] < self.depth_caps[depth]:
+                counts[depth] += 1
+                yield variant
+
+    def _select_sample(self, variants, key):
+        # Reservoir sampling, so only the variants kept are held while the others are generated
+        size = self.budget if self.budget is not None else MutationStrategy.default_sample_size
+        rng = random.Random(f'{self.seed}:{key}')
+        reservoir = []
+        for index, variant in enumerate(variants):
+            if index < size:
+                reservoir.append((index, variant))
+                continue
+
+            replaced = rng.randrange(index + 1)
+            if replaced < size:
+                reservoir[replaced] = (index, variant)
+
+        return [variant for _, variant in sorted(reservoir, key=lambda item: item[0])]
+
+    def _select_equivalence_classes(self, variants):
+        classes = set()
+        for variant in variants:
+            equivalence_class = (variant.mutation.kind, variant.mutation.field_type)
+            if equivalence_class not in classes:
+                classes.add(equivalence_class)
+                yield variant
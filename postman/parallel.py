@@ -0,0 +1,99 @@
+import os
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .request import RequestPool
+from .schemas import SchemaRegistry
+from openapi.openapi import OpenApi
+from cli.tracer import SpanRecorder, Tracer
+
+
+_worker = {}
+
+
+def resolve_jobs(jobs):
+    """
+    Get the number of worker processes to use
+
+    Params:
+      - jobs: Number of jobs asked, 0 or less means one per CPU
+
+    Returns: Number of worker processes
+    """
+
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def init_worker(openapi, location, success_body, cmd_args, trace_level, trace_spans):
+    Tracer.level = trace_level
+    Tracer.spans = SpanRecorder()
+    Tracer.spans.enabled = trace_spans
+    if location[0] is not None:
+        OpenApi.set_location(openapi, *location)
+    _worker['openapi'] = openapi
+    _worker['success_body'] = success_body
+    _worker['cmd_args'] = cmd_args
+    # Bodies encoded once per worker, their strings are shared again by the pool of the main process
+    _worker['pool'] = RequestPool() if cmd_args.dedup_requests else None
+
+
+def compile_operation_requests(task):
+    from .pm import Postman
+
+    endpoint, operation = task
+    schemas = SchemaRegistry(_worker['cmd_args'].compact) if _worker['cmd_args'].hoist_schemas else None
+    requests = Postman.compile_operation_requests(
+        _worker['openapi'],
+        endpoint,
+        operation,
+        _worker['success_body'],
+        _worker['cmd_args'],
+        schemas,
+        _worker['pool']
+    )
+    requests = list(requests)
+    variables = schemas.variables if schemas is not None else {}
+    spans = Tracer.spans.snapshot(reset=True) if Tracer.spans.enabled else {}
+    return endpoint, operation, requests, variables, spans
+
+
+def iter_operation_requests(openapi, tasks, success_body, cmd_args, jobs):
+    """
+    Compile the requests of many operations across worker processes.
+    Results are yielded in the order of the tasks, so the output is the same as generating them serially.
+    Only a few operations per worker are kept in flight to bound the memory held by finished results.
+
+    Params:
+      - openapi: OpenApi JSON
+      - tasks: Iterable of (endpoint, operation) tuples
+      - success_body: JSON body used on success requests instead of the fake data
+      - cmd_args: Arguments passed in command line
+      - jobs: Number of worker processes
+
+    Returns: Generator of (endpoint, operation, list of CompiledRequest, dict of JSON Schema variables,
+    dict of span timings) tuples
+    """
+
+    max_pending = jobs * 4
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(openapi, OpenApi.get_location(openapi), success_body, cmd_args, Tracer.level, Tracer.spans.enabled)
+    )
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(executor.submit(compile_operation_requests, task))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Operations not started yet are dropped when the output stops early
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
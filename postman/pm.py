@@ -1,360 +1,655 @@
-import json
-import copy
-import os
-import sys
-
-from .templates import create_request, create_request_name, generate_test_script, create_collection_name
-from openapi.openapi import OpenApi
-from cli.exceptions import InvalidEnvironmentValueError
-from cli.tracer import Tracer
-
-
-class Postman:
-
-    @staticmethod
-    def generate_bad_requests(swagger, component_name, status_code, method, host_url, endpoint, body, test_script,
-                              auth_type):
-        """
-        Generate all bad requests (400) for all required fields, based on it's JSON Schema.
-        For each field, the function will generated a request:
-          - Without the required field
-          - With field empty
-          - With field in wrong type
-
-        Params:
-          - swagger: Swagger JSON
-          - component_name: Name of the component in the format: "#/components/schemas/Object"
-          - status_code: HTTP status code of the request
-          - method: Request HTTP method (GET, POST, PUT, PATCH, DELETE)
-          - host_url: The base url for all requests
-          - endpoint: Endpoint of the operation request
-          - body: JSON body the request
-          - test_script: String with JavaScript to execute test on Postman
-          - auth_type: Authorization type to use on headers
-
-        Returns: List of all bad requests generated for all required fields
-        """
-
-        schema = component_name.split('/')[-1]
-        specs = swagger['components']['schemas'][schema]
-        if 'required' not in specs:
-            return []
-
-        requests = []
-        for required_field in specs['required']:
-            prop_type = specs['properties'][required_field]['type']
-
-            # Create test without the field
-            bad_request_body = copy.deepcopy(body)
-            description = f'sem {required_field}'
-            del bad_request_body[required_field]
-            req = create_request(status_code, description, method, host_url, endpoint, bad_request_body, test_script,
-                                 auth_type)
-            requests.append(req)
-
-            # Create test with wrong type in field
-            bad_request_body = copy.deepcopy(body)
-            description = f'{required_field} tipagem inválida'
-
-            if prop_type in ('boolean', 'number', 'array', 'object'):
-                bad_request_body[required_field] = 'tipo inválido'
-            else:
-                bad_request_body[required_field] = 10
-
-            req = create_request(status_code, description, method, host_url, endpoint, bad_request_body, test_script,
-                                 auth_type)
-            requests.append(req)
-
-            if prop_type in ('string', 'array', 'object'):
-                # Create test with empty field
-                bad_request_body = copy.deepcopy(body)
-                description = f'{required_field} vazio'
-                if prop_type == 'string':
-                    bad_request_body[required_field] = ''
-                elif prop_type == 'array':
-                    bad_request_body[required_field] = []
-                elif prop_type == 'object':
-                    bad_request_body[required_field] = {}
-
-                req = create_request(status_code, description, method, host_url, endpoint, bad_request_body, test_script,
-                                     auth_type)
-                requests.append(req)
-
-            # Create bad requests for all sub fields of object or array
-            isObjectRef = '$ref' in specs['properties'][required_field]
-            isArrayRef = prop_type == 'array' and '$ref' in specs['properties'][required_field]['items']
-            if isArrayRef or isObjectRef:
-                sub_component_name = None
-                if isObjectRef:
-                    sub_component_name = specs['properties'][required_field]['$ref']
-                elif isArrayRef:
-                    sub_component_name = specs['properties'][required_field]['items']['$ref']
-
-                sub_component_json_schema = OpenApi.get_json_schema_from_component(swagger, sub_component_name)
-                sub_component_body = OpenApi.get_json_body_from_component(swagger, sub_component_name)
-                sub_component_bad_requests = Postman.generate_bad_requests(
-                    swagger,
-                    sub_component_name,
-                    status_code,
-                    method,
-                    host_url,
-                    endpoint,
-                    sub_component_body,
-                    test_script,
-                    auth_type
-                )
-
-                for sub_component_bad_req in sub_component_bad_requests:
-                    sub_component_json_body = json.loads(sub_component_bad_req['request']['body']['raw'])
-                    if isObjectRef:
-                        bad_request_body[required_field] = sub_component_json_body
-                    elif isArrayRef:
-                        bad_request_body[required_field] = [sub_component_json_body]
-                    sub_component_bad_req['request']['body']['raw'] = json.dumps(bad_request_body,
-                                                                                 separators=(',', ':'))
-
-                requests.extend(sub_component_bad_requests)
-
-        return requests
-
-    @staticmethod
-    def get_index_pm_resouce_folder(pm, resource_name):
-        """
-        Get the resource folder from postman collection.
-        If doesn't exist, will create the resource folder
-
-        Params:
-          - pm: Postman collection
-          - resource_name: Name of the resource
-
-        Returns: Index of the resource
-        """
-
-        for index, resource in enumerate(pm['item']):
-            if resource['name'] == resource_name:
-                return index
-
-        new_resource = {
-            "name": resource_name,
-            "item": [],
-            "protocolProfileBehavior": {},
-            "_postman_isSubFolder": True
-        }
-        pm['item'].append(new_resource)
-        return len(pm['item']) - 1
-
-    @staticmethod
-    def get_index_pm_operation_folder(pm, resource_name, operation_name):
-        """
-        Get the roperation folder from postman collection.
-        If doesn't exist, will create the operation folder
-
-        Params:
-          - pm: Postman collection
-          - resource_name: Name of the resource
-          - operation_name: Name of the operation
-
-        Returns: Index of the operation
-        """
-
-        r_index = Postman.get_index_pm_resouce_folder(pm, resource_name)
-        for o_index, operation in enumerate(pm['item'][r_index]['item']):
-            if operation['name'] == operation_name:
-                return o_index
-
-        new_operation = {
-            "name": operation_name,
-            "item": [],
-            "protocolProfileBehavior": {},
-            "_postman_isSubFolder": True
-        }
-
-        pm['item'][r_index]['item'].append(new_operation)
-        return len(pm['item'][r_index]['item']) - 1
-
-    @staticmethod
-    def find_header_by_key_and_delete(headers, key):
-        """
-        Find and delete a Postman request header by it's key
-
-        Params:
-          - headers: List of all headers
-          - key: Key of the headers (name)
-
-        Returns: Copy of headers without the key if found
-        """
-
-        copy_headers = list(headers)
-        index = -1
-        for i, head in enumerate(copy_headers):
-            if head['key'] == key:
-                index = i
-        if index != -1:
-            del copy_headers[index]
-        return copy_headers
-
-    @staticmethod
-    def generate(openapi, cmd_args):
-        """
-        Generate a Postman Collection with requests and test scripts based on OpenApi file
-
-        Params:
-          - openapi: OpenApi JSON
-          - cmd_args: Arguments passed in command line
-
-        Returns: The name of the postman body collection of the file to be created and the data to be saved
-        """
-
-        track = Tracer('postman.pm.Postman.generate')
-        pm = {}
-        collection_name = create_collection_name(openapi)
-        filename = f'{collection_name}.postman_collection.json'
-        track.trace('Information about the Postman Collection generated')
-        track.trace(f'Name: {collection_name}')
-        track.trace(f'File: "{filename}"')
-        host_url = cmd_args.host_url if cmd_args.host_url is not None else OpenApi.get_server_host_url(openapi,
-                                                                                                       cmd_args.environment)
-        if not host_url and cmd_args.environment is not None:
-            raise InvalidEnvironmentValueError(
-                f'Valor de ambiente definido "{cmd_args.environment}" não está definido no Swagger\n')
-        track.trace(f'Host url definida pra todos as requisições: "{host_url}"')
-        track.trace(f'Tipo de Autorização/Autenticação definido para o padrão: "{cmd_args.authorization_type}"')
-
-        number_of_endpoints = len(openapi['paths'].keys())
-        number_of_operations = 0
-        number_of_test_requests = 0
-
-        all_resources = set()
-
-        pm['info'] = {
-            "name": collection_name,
-            "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
-        }
-        pm['item'] = []
-
-        success_body = None
-        if cmd_args.file_success_body is not None:
-            dirname = os.path.dirname(__file__)
-            json_body_filename = os.path.join(dirname, cmd_args.file_success_body)
-            try:
-                with open(json_body_filename) as json_success_body_file:
-                    success_body = json.load(json_success_body_file)
-                    track.trace(
-                        f'Request de sucesso definido corretamente para o corpo do arquivo: {json_body_filename}\n')
-            except FileNotFoundError:
-                print(f'=== Erro: Arquivo "{json_body_filename}" não foi encontrado\n')
-            except json.decoder.JSONDecodeError:
-                print(f'=== Erro: Arquivo "{json_body_filename}" não se encontra no formato JSON ou é inválido\n')
-            finally:
-                track.trace(f'Error - Unexpected error {sys.exc_info()[0]}')
-
-        paths = openapi['paths']
-        for endpoint in paths.keys():
-            operations = paths[endpoint]
-            for operation in operations.keys():
-                number_of_operations += 1
-                resource_name = operations[operation]['tags'][0]
-                all_resources.add(resource_name)
-                operation_name = operations[operation]['summary']
-                method = operation.upper()
-                r_index = Postman.get_index_pm_resouce_folder(pm, resource_name)
-                o_index = Postman.get_index_pm_operation_folder(
-                    pm,
-                    resource_name, operations[operation]['summary']
-                )
-
-                pm_operation_folder = pm['item'][r_index]['item'][o_index]
-                need_body_on_request = method in ('POST', 'PATCH', 'PUT')
-
-                if need_body_on_request and cmd_args.generate_body_on_requests and 'requestBody' in operations[operation]:
-                    request_component_name = \
-                        operations[operation]['requestBody']['content']['application/json']['schema']['$ref']
-                    body = OpenApi.get_json_body_from_component(openapi, request_component_name)
-                else:
-                    body = {}
-
-                responses = operations[operation]['responses']
-                for status_code in responses.keys():
-                    number_of_test_requests += 1
-                    response_description = responses[status_code]['description']
-                    response_json_schema = None
-                    if 'content' in responses[status_code]:
-                        response_schema = responses[status_code]['content']['application/json']['schema']
-                        response_json_schema = OpenApi.get_inside_object_properties(openapi, response_schema)
-
-                    test_script = generate_test_script(response_json_schema, status_code)
-
-                    request = None
-
-                    if status_code in ('200', '201') and need_body_on_request and cmd_args.generate_body_on_requests:
-                        # Use real data on success test
-                        if success_body is not None:
-                            request = create_request(status_code, response_description, method, host_url,
-                                                             endpoint, success_body, test_script,
-                                                             cmd_args.authorization_type)
-                        else:
-                            request = create_request(status_code, response_description, method, host_url,
-                                                             endpoint, body, test_script, cmd_args.authorization_type)
-                    elif status_code in ('400', '422'):
-                        # Need generate bad requests
-                        if need_body_on_request and cmd_args.generate_bad_requests:
-                            bad_requests = Postman.generate_bad_requests(
-                                openapi,
-                                request_component_name,
-                                status_code,
-                                method,
-                                host_url,
-                                endpoint,
-                                body,
-                                test_script,
-                                cmd_args.authorization_type
-                            )
-                            number_of_test_requests += len(bad_requests)
-                            pm_operation_folder['item'].extend(bad_requests)
-                            continue
-                        else:
-                            request = create_request(status_code, response_description, method, host_url,
-                                                             endpoint, body, test_script, cmd_args.authorization_type)
-                    elif status_code == '501':
-                        endpoint_not_found = '/endpoint-nao-existe'
-                        request = create_request(status_code, response_description, method, host_url,
-                                                         endpoint_not_found, body, test_script,
-                                                         cmd_args.authorization_type)
-                    elif status_code == '401':
-                        request = create_request(status_code, 'sem authorization headers', method, host_url,
-                                                         endpoint, body, test_script, cmd_args.authorization_type)
-                        headers = list(request['request']['header'])
-
-                        # Without OAuth2.0 Client ID
-                        request_name = create_request_name('401', 'sem client_id')
-                        request['name'] = request_name
-                        request['request']['header'] = Postman.find_header_by_key_and_delete(headers, 'client_id')
-                        pm_operation_folder['item'].append(request)
-
-                        # Without OAuth2.0 Access Token
-                        request = copy.deepcopy(request)
-                        request_name = create_request_name('401', 'sem access_token')
-                        request['name'] = request_name
-                        request['request']['header'] = Postman.find_header_by_key_and_delete(headers, 'access_token')
-                        pm_operation_folder['item'].append(request)
-                        continue
-                    else:
-                        request = create_request(status_code, response_description, method, host_url, endpoint,
-                                                         body, test_script, cmd_args.authorization_type)
-
-                    if request:
-                        pm_operation_folder['item'].append(request)
-
-        track.trace(f'Quantidade de endpoints tratados: {number_of_endpoints}')
-        track.trace(f'Quantidade de recursos criados: {len(all_resources)}')
-        track.trace(f'Quantidade de operações criadas: {number_of_operations}')
-        track.trace(f'Quantidade de requisições criadas: {number_of_test_requests}')
-
-        result = {
-            'filename': filename,
-            'collection': pm
-        }
-
-        track.log()
-
-        return result
+import argparse
+import itertools
+import json
+import os
+
+from .templates import compile_request, create_request_name, generate_test_script, create_collection_name
+from .mutations import BodyTemplate, MutationStrategy
+from .collection import CollectionBuilder, CompiledCollection
+from .request import CompiledRequest, RequestPool
+from .writer import StreamedList, materialize
+from .parallel import iter_operation_requests, resolve_jobs
+from .incremental import Manifest, create_operation_fingerprint, create_operation_key
+from .schemas import SchemaRegistry
+from .sharding import ShardPlanner
+from openapi.openapi import OpenApi
+from cli import serialization
+from cli.exceptions import InvalidEnvironmentValueError
+from cli.tracer import Tracer
+
+
+class Postman:
+
+    @staticmethod
+    def compile_bad_requests(swagger, component_name, status_code, method, endpoint, body, test_script,
+                             compact=False, strategy=None, limit=None, pool=None):
+        """
+        Generate all bad requests (400) for all required fields, based on it's JSON Schema.
+        For each field, the function will generated a request:
+          - Without the required field
+          - With field empty
+          - With field in wrong type
+        Required fields that are $ref also get the bad requests of their component, inside the body.
+        Each body is encoded once, when its request is created.
+
+        Params:
+          - swagger: Swagger JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+          - status_code: HTTP status code of the request
+          - method: Request HTTP method (GET, POST, PUT, PATCH, DELETE)
+          - endpoint: Endpoint of the operation request
+          - body: JSON body the request
+          - test_script: String with JavaScript to execute test on Postman
+          - compact: Whether to minify the bodies
+          - strategy: MutationStrategy choosing the variants, None for all of them
+          - limit: Number of bad requests at most, None for no limit
+          - pool: RequestPool encoding each body once, None to encode all of them. Bodies are told apart
+            by the component, its path and its mutation, so body must be the fake body of the component.
+
+        Returns: Generator of CompiledRequest for all required fields, created as they are consumed
+        """
+
+        if strategy is None:
+            strategy = MutationStrategy()
+
+        template = BodyTemplate.for_component(swagger, component_name)
+        variants = template.iter_variants(swagger, max_depth=strategy.max_depth)
+        variants = strategy.select(variants, f'{method} {endpoint} {status_code}')
+
+        for variant in itertools.islice(variants, limit):
+            with Tracer.span('bad_requests'):
+                # Bodies of nested fields are always minified
+                compact_body = compact or bool(variant.path)
+                if pool is not None:
+                    raw_body = pool.encode_body((component_name, variant.path, variant.mutation, compact_body),
+                                                lambda: variant.build(swagger, body), compact_body)
+                    request = CompiledRequest(create_request_name(status_code, variant.description), method,
+                                              endpoint, raw_body, test_script)
+                else:
+                    request = compile_request(status_code, variant.description, method, endpoint,
+                                              variant.build(swagger, body), test_script, compact_body)
+            yield request
+
+    @staticmethod
+    def generate_bad_requests(swagger, component_name, status_code, method, host_url, endpoint, body, test_script,
+                              auth_type, compact=False):
+        """
+        Generate all bad requests (400) for all required fields, as compile_bad_requests
+
+        Params:
+          - swagger: Swagger JSON
+          - component_name: Name of the component in the format: "#/components/schemas/Object"
+          - status_code: HTTP status code of the request
+          - method: Request HTTP method (GET, POST, PUT, PATCH, DELETE)
+          - host_url: The base url for all requests
+          - endpoint: Endpoint of the operation request
+          - body: JSON body the request
+          - test_script: String with JavaScript to execute test on Postman
+          - auth_type: Authorization type to use on headers
+          - compact: Whether to minify the bodies
+
+        Returns: Generator of all bad requests for all required fields, created as they are consumed
+        """
+
+        requests = Postman.compile_bad_requests(swagger, component_name, status_code, method, endpoint, body,
+                                                test_script, compact)
+        for request in requests:
+            yield request.bind(host_url, auth_type)
+
+    @staticmethod
+    def find_header_by_key_and_delete(headers, key):
+        """
+        Find and delete a Postman request header by it's key
+
+        Params:
+          - headers: List of all headers
+          - key: Key of the headers (name)
+
+        Returns: Copy of headers without the key if found
+        """
+
+        copy_headers = list(headers)
+        index = -1
+        for i, head in enumerate(copy_headers):
+            if head['key'] == key:
+                index = i
+        if index != -1:
+            del copy_headers[index]
+        return copy_headers
+
+    @staticmethod
+    def get_host_url(openapi, cmd_args):
+        """
+        Get the base url for all requests, informed directly or by the environment description
+
+        Params:
+          - openapi: OpenApi JSON
+          - cmd_args: Arguments passed in command line
+
+        Returns: String with the host URL, None when neither was informed
+        """
+
+        if cmd_args.host_url is not None:
+            return cmd_args.host_url
+
+        host_url = OpenApi.get_server_host_url(openapi, cmd_args.environment)
+        if not host_url and cmd_args.environment is not None:
+            raise InvalidEnvironmentValueError(
+                f'Valor de ambiente definido "{cmd_args.environment}" não está definido no Swagger\n')
+        return host_url
+
+    @staticmethod
+    def load_success_body(cmd_args, track):
+        """
+        Load the JSON body used on success requests instead of the fake data
+
+        Params:
+          - cmd_args: Arguments passed in command line
+          - track: Tracer of the generation
+
+        Returns: JSON body if informed and valid, otherwise None
+        """
+
+        success_body = None
+        if cmd_args.file_success_body is not None:
+            dirname = os.path.dirname(__file__)
+            json_body_filename = os.path.join(dirname, cmd_args.file_success_body)
+            try:
+                with open(json_body_filename) as json_success_body_file:
+                    success_body = serialization.load(json_success_body_file)
+                    track.trace('Request de sucesso definido corretamente para o corpo do arquivo: %s\n',
+                                json_body_filename)
+            except FileNotFoundError:
+                print(f'=== Erro: Arquivo "{json_body_filename}" não foi encontrado\n')
+            except json.decoder.JSONDecodeError:
+                print(f'=== Erro: Arquivo "{json_body_filename}" não se encontra no formato JSON ou é inválido\n')
+
+        return success_body
+
+    @staticmethod
+    def plan_collection(openapi, collection_name):
+        """
+        Create the resource and operation folders of the collection, keeping the order of the paths.
+        Each operation folder holds the (endpoint, operation) tuples of its requests, to be generated later.
+
+        Params:
+          - openapi: OpenApi JSON
+          - collection_name: Name of the collection
+
+        Returns: CollectionBuilder with all folders
+        """
+
+        builder = CollectionBuilder(collection_name)
+        paths = openapi['paths']
+        for endpoint in paths.keys():
+            operations = paths[endpoint]
+            for operation in operations.keys():
+                resource_name = operations[operation]['tags'][0]
+                operation_name = operations[operation]['summary']
+                builder.get_operation_folder(resource_name, operation_name)['item'].append((endpoint, operation))
+
+        return builder
+
+    @staticmethod
+    def compile_operation_requests(openapi, endpoint, operation, success_body, cmd_args, schemas=None, pool=None):
+        """
+        Generate the requests with test scripts of an operation, one or more for each response status code.
+        Requests don't depend on the host URL or the authorization type, they are bound later.
+
+        Params:
+          - openapi: OpenApi JSON
+          - endpoint: Endpoint of the operation
+          - operation: Operation of the endpoint (get, post, put, patch, delete)
+          - success_body: JSON body used on success requests instead of the fake data
+          - cmd_args: Arguments passed in command line
+          - schemas: SchemaRegistry where the response JSON Schemas are kept, None to embed them in the scripts
+          - pool: RequestPool encoding the bodies of bad requests once, None to encode all of them
+
+        Returns: Generator of CompiledRequest, created as they are consumed
+        """
+
+        specs = openapi['paths'][endpoint][operation]
+        method = operation.upper()
+        compact = cmd_args.compact
+        need_body_on_request = method in ('POST', 'PATCH', 'PUT')
+        strategy = MutationStrategy.from_cmd_args(cmd_args)
+        # The budget is shared by the bad requests of all responses of the operation
+        remaining_bad_requests = strategy.budget
+
+        request_component_name = None
+        if need_body_on_request and cmd_args.generate_body_on_requests and 'requestBody' in specs:
+            request_component_name = specs['requestBody']['content']['application/json']['schema']['$ref']
+            with Tracer.span('body_generation'):
+                body = OpenApi.get_json_body_from_component(openapi, request_component_name)
+        else:
+            body = {}
+
+        responses = specs['responses']
+        for status_code in responses.keys():
+            response_description = responses[status_code]['description']
+            response_json_schema = None
+            if 'content' in responses[status_code]:
+                response_schema = responses[status_code]['content']['application/json']['schema']
+                with Tracer.span('ref_resolution'):
+                    response_json_schema = OpenApi.get_inside_object_properties(openapi, response_schema)
+
+            with Tracer.span('test_script'):
+                if schemas is not None:
+                    test_script = schemas.get_test_script(response_json_schema, status_code)
+                else:
+                    test_script = generate_test_script(response_json_schema, status_code, compact=compact)
+
+            if status_code in ('200', '201') and need_body_on_request and cmd_args.generate_body_on_requests:
+                # Use real data on success test
+                if success_body is not None:
+                    yield compile_request(status_code, response_description, method, endpoint, success_body,
+                                          test_script, compact)
+                else:
+                    yield compile_request(status_code, response_description, method, endpoint, body, test_script,
+                                          compact)
+            elif status_code in ('400', '422'):
+                # Need generate bad requests
+                if request_component_name is not None and cmd_args.generate_bad_requests:
+                    bad_requests = Postman.compile_bad_requests(
+                        openapi,
+                        request_component_name,
+                        status_code,
+                        method,
+                        endpoint,
+                        body,
+                        test_script,
+                        compact,
+                        strategy,
+                        remaining_bad_requests,
+                        pool
+                    )
+                    for request in bad_requests:
+                        if remaining_bad_requests is not None:
+                            remaining_bad_requests -= 1
+                        yield request
+                else:
+                    yield compile_request(status_code, response_description, method, endpoint, body, test_script,
+                                          compact)
+            elif status_code == '501':
+                endpoint_not_found = '/endpoint-nao-existe'
+                yield compile_request(status_code, response_description, method, endpoint_not_found, body,
+                                      test_script, compact)
+            elif status_code == '401':
+                request = compile_request(status_code, 'sem authorization headers', method, endpoint, body,
+                                          test_script, compact)
+
+                # Without OAuth2.0 Client ID
+                request_name = create_request_name('401', 'sem client_id')
+                yield request.replace(request_name, 'client_id')
+
+                # Without OAuth2.0 Access Token
+                request_name = create_request_name('401', 'sem access_token')
+                yield request.replace(request_name, 'access_token')
+            else:
+                yield compile_request(status_code, response_description, method, endpoint, body, test_script,
+                                      compact)
+
+    @staticmethod
+    def generate_operation_requests(openapi, endpoint, operation, host_url, success_body, cmd_args, schemas=None):
+        """
+        Generate the requests with test scripts of an operation, one or more for each response status code
+
+        Params:
+          - openapi: OpenApi JSON
+          - endpoint: Endpoint of the operation
+          - operation: Operation of the endpoint (get, post, put, patch, delete)
+          - host_url: The base url for all requests
+          - success_body: JSON body used on success requests instead of the fake data
+          - cmd_args: Arguments passed in command line
+          - schemas: SchemaRegistry where the response JSON Schemas are kept, None to embed them in the scripts
+
+        Returns: Generator of requests, created as they are consumed
+        """
+
+        requests = Postman.compile_operation_requests(openapi, endpoint, operation, success_body, cmd_args, schemas)
+        for request in requests:
+            yield request.bind(host_url, cmd_args.authorization_type)
+
+    @staticmethod
+    def compile_operations(openapi, tasks, success_body, cmd_args, schemas, track, pool=None):
+        """
+        Compile the requests of many operations, across worker processes when more than one job is asked
+
+        Params:
+          - openapi: OpenApi JSON
+          - tasks: List of (endpoint, operation) tuples
+          - success_body: JSON body used on success requests instead of the fake data
+          - cmd_args: Arguments passed in command line
+          - schemas: SchemaRegistry where the response JSON Schemas are kept, None to embed them in the scripts
+          - track: Tracer of the generation
+          - pool: RequestPool sharing the payloads of identical requests, None to keep them apart
+
+        Returns: Generator of the CompiledRequest iterables of each task, in the order of the tasks.
+        Each one must be consumed before taking the next.
+        """
+
+        jobs = min(resolve_jobs(cmd_args.jobs), len(tasks))
+        if jobs <= 1:
+            for endpoint, operation in tasks:
+                requests = Postman.compile_operation_requests(openapi, endpoint, operation, success_body, cmd_args,
+                                                              schemas, pool)
+                yield requests if pool is None else map(pool.add, requests)
+            return
+
+        track.trace('Gerando requisições em %d processos', jobs)
+        for _, _, requests, variables, spans in iter_operation_requests(openapi, tasks, success_body, cmd_args,
+                                                                        jobs):
+            Tracer.spans.merge(spans)
+            if schemas is not None:
+                schemas.add_variables(variables)
+            yield requests if pool is None else map(pool.add, requests)
+
+    @staticmethod
+    def trace_pool(pool, track):
+        if pool is not None:
+            track.trace('Quantidade de requisições com conteúdo repetido: %d', pool.duplicates)
+            track.trace('Bytes compartilhados entre requisições: %d', pool.shared_bytes)
+
+    @staticmethod
+    def stream(openapi, cmd_args, previous_manifest=None, create_manifest=False, progress=None):
+        """
+        Prepare a Postman Collection whose requests are only generated while it is written by postman.writer
+
+        Params:
+          - openapi: OpenApi JSON
+          - cmd_args: Arguments passed in command line
+          - previous_manifest: Manifest of a previous run, whose requests are reused for unchanged operations
+          - create_manifest: Whether to create the manifest of this run, also created with a previous manifest
+          - progress: Function called after each operation with the number of operations done and the total
+
+        Returns: The name of the file to be created, the collection, which can be consumed only once,
+        the manifest and the counters of operations and requests, both completed once the collection is consumed
+        """
+
+        track = Tracer('postman.pm.Postman.stream')
+        collection_name = create_collection_name(openapi)
+        filename = f'{collection_name}.postman_collection.json'
+        if cmd_args.gzip:
+            filename += '.gz'
+        track.trace('Information about the Postman Collection generated')
+        track.trace('Name: %s', collection_name)
+        track.trace('File: "%s"', filename)
+        host_url = Postman.get_host_url(openapi, cmd_args)
+        track.trace('Host url definida pra todos as requisições: "%s"', host_url)
+        track.trace('Tipo de Autorização/Autenticação definido para o padrão: "%s"', cmd_args.authorization_type)
+
+        success_body = Postman.load_success_body(cmd_args, track)
+        builder = Postman.plan_collection(openapi, collection_name)
+        resource_folders = builder.collection['item']
+        counters = {'operations': 0, 'requests': 0, 'reused': 0}
+
+        schemas = SchemaRegistry(cmd_args.compact) if cmd_args.hoist_schemas else None
+        pool = RequestPool() if cmd_args.dedup_requests else None
+
+        manifest = None
+        if create_manifest or previous_manifest is not None:
+            options_fingerprint = Manifest.create_options_fingerprint(host_url, success_body, cmd_args)
+            manifest = Manifest(filename, options_fingerprint)
+
+        fingerprints = {}
+        previous_requests = {}
+        tasks = []
+        for resource_folder in resource_folders:
+            for operation_folder in resource_folder['item']:
+                for endpoint, operation in operation_folder['item']:
+                    if manifest is not None:
+                        key = create_operation_key(endpoint, operation)
+                        fingerprints[key] = create_operation_fingerprint(openapi, endpoint, operation)
+                        if previous_manifest is not None:
+                            requests = previous_manifest.get_requests(key, fingerprints[key],
+                                                                      manifest.options_fingerprint)
+                            if requests is not None:
+                                previous_requests[key] = requests
+                                continue
+
+                    tasks.append((endpoint, operation))
+
+        number_of_operations = len(tasks) + len(previous_requests)
+
+        # Folders are consumed in the same order of the tasks, so results are taken in sequence
+        compiled_operations = Postman.compile_operations(openapi, tasks, success_body, cmd_args, schemas, track, pool)
+
+        def operation_requests(resource_name, operation_name, operations):
+            offset = 0
+            for endpoint, operation in operations:
+                counters['operations'] += 1
+                key = create_operation_key(endpoint, operation)
+                if key in previous_requests:
+                    counters['reused'] += 1
+                    requests = previous_requests.pop(key)
+                    if schemas is not None:
+                        schemas.add_variables(previous_manifest.get_variables(key))
+                else:
+                    requests = (
+                        request.bind(host_url, cmd_args.authorization_type) for request in next(compiled_operations)
+                    )
+
+                number_of_requests = 0
+                for request in requests:
+                    number_of_requests += 1
+                    yield request
+
+                counters['requests'] += number_of_requests
+                if progress is not None:
+                    progress(counters['operations'], number_of_operations)
+                variables = schemas.take_used() if schemas is not None else {}
+                if manifest is not None:
+                    manifest.add_operation(key, fingerprints[key], resource_name, operation_name, offset,
+                                           number_of_requests, list(variables))
+                offset += number_of_requests
+
+        def streamed_resource_folders():
+            yield from resource_folders
+
+            track.trace('Quantidade de endpoints tratados: %d', len(openapi['paths'].keys()))
+            track.trace('Quantidade de recursos criados: %d', len(resource_folders))
+            track.trace('Quantidade de operações criadas: %d', counters['operations'])
+            if previous_manifest is not None:
+                track.trace('Quantidade de operações reaproveitadas: %d', counters['reused'])
+            track.trace('Quantidade de requisições criadas: %d', counters['requests'])
+            Postman.trace_pool(pool, track)
+            track.log()
+
+        for resource_folder in resource_folders:
+            for operation_folder in resource_folder['item']:
+                operation_folder['item'] = StreamedList(
+                    operation_requests(resource_folder['name'], operation_folder['name'], operation_folder['item'])
+                )
+            resource_folder['item'] = StreamedList(resource_folder['item'])
+        builder.collection['item'] = StreamedList(streamed_resource_folders())
+        if schemas is not None:
+            # Only evaluated after all requests were written, when every JSON Schema is known
+            builder.collection['variable'] = StreamedList(schemas.iter_collection_variables())
+
+        return {
+            'filename': filename,
+            'collection': builder.collection,
+            'manifest': manifest,
+            'counters': counters
+        }
+
+    @staticmethod
+    def compile(openapi, cmd_args):
+        """
+        Generate the requests of a Postman Collection once, before choosing the host URL and the authorization type
+
+        Params:
+          - openapi: OpenApi JSON
+          - cmd_args: Arguments passed in command line
+
+        Returns: CompiledCollection
+        """
+
+        track = Tracer('postman.pm.Postman.compile')
+        collection_name = create_collection_name(openapi)
+        success_body = Postman.load_success_body(cmd_args, track)
+        builder = Postman.plan_collection(openapi, collection_name)
+        schemas = SchemaRegistry(cmd_args.compact) if cmd_args.hoist_schemas else None
+        pool = RequestPool() if cmd_args.dedup_requests else None
+
+        operation_folders = [
+            operation_folder
+            for resource_folder in builder.collection['item']
+            for operation_folder in resource_folder['item']
+        ]
+        tasks = [task for operation_folder in operation_folders for task in operation_folder['item']]
+        compiled_operations = Postman.compile_operations(openapi, tasks, success_body, cmd_args, schemas, track,
+                                                         pool)
+        number_of_requests = 0
+        for operation_folder in operation_folders:
+            requests = []
+            for _ in operation_folder['item']:
+                requests.extend(next(compiled_operations))
+            operation_folder['item'] = requests
+            number_of_requests += len(requests)
+
+        track.trace('Quantidade de operações compiladas: %d', len(tasks))
+        track.trace('Quantidade de requisições compiladas: %d', number_of_requests)
+        Postman.trace_pool(pool, track)
+        track.log()
+
+        variables = list(schemas.iter_collection_variables()) if schemas is not None else None
+        return CompiledCollection(builder.collection, variables)
+
+    @staticmethod
+    def fan_out(openapi, cmd_args, environments, authorization_types):
+        """
+        Generate the Postman Collections of many environments and authorization types, compiling the requests once.
+        Each collection gets its environment and authorization type in the name.
+
+        Params:
+          - openapi: OpenApi JSON
+          - cmd_args: Arguments passed in command line
+          - environments: Descriptions of the environments defined on OpenApi file, "all" for every one of them
+          - authorization_types: Authorization types to use on headers
+
+        Returns: Generator with the name of the file to be created and the collection,
+        which can be consumed only once, for each environment and authorization type
+        """
+
+        if 'all' in environments:
+            environments = [server['description'] for server in openapi.get('servers', [])]
+
+        # Unknown environments are reported before compiling
+        host_urls = [
+            Postman.get_host_url(openapi, argparse.Namespace(**{**vars(cmd_args), 'environment': environment}))
+            for environment in environments
+        ]
+
+        compiled = Postman.compile(openapi, cmd_args)
+        collection_name = compiled.collection['info']['name']
+        for environment, host_url in zip(environments, host_urls):
+            for auth_type in authorization_types:
+                if environment is not None:
+                    name = f'{collection_name} ({environment}, {auth_type})'
+                else:
+                    name = f'{collection_name} ({auth_type})'
+                filename = f'{name}.postman_collection.json'
+                if cmd_args.gzip:
+                    filename += '.gz'
+                yield {
+                    'filename': filename,
+                    'collection': compiled.emit(host_url, auth_type, name)
+                }
+
+    @staticmethod
+    def shard(openapi, cmd_args, shards, weights=None):
+        """
+        Generate the Postman Collection split into shards of similar estimated cost, to be run at the same time.
+        Each shard keeps the resource and operation folders of its operations, in the order of the paths,
+        and only the hoisted JSON Schemas its requests use.
+
+        Params:
+          - openapi: OpenApi JSON
+          - cmd_args: Arguments passed in command line
+          - shards: Number of shards
+          - weights: Dict of operation key, as "GET /orders", to the weight of its cost
+
+        Returns: Generator with the name of the file to be created, the collection, which can be consumed only once,
+        the estimated cost and the number of requests of each shard
+        """
+
+        track = Tracer('postman.pm.Postman.shard')
+        host_url = Postman.get_host_url(openapi, cmd_args)
+        collection_name = create_collection_name(openapi)
+        success_body = Postman.load_success_body(cmd_args, track)
+        builder = Postman.plan_collection(openapi, collection_name)
+        schemas = SchemaRegistry(cmd_args.compact) if cmd_args.hoist_schemas else None
+        planner = ShardPlanner(shards, weights)
+        pool = RequestPool() if cmd_args.dedup_requests else None
+
+        tasks = []
+        for resource_folder in builder.collection['item']:
+            for operation_folder in resource_folder['item']:
+                for endpoint, operation in operation_folder['item']:
+                    tasks.append((resource_folder['name'], operation_folder['name'], endpoint, operation))
+
+        compiled_operations = Postman.compile_operations(
+            openapi, [(endpoint, operation) for _, _, endpoint, operation in tasks], success_body, cmd_args, schemas,
+            track, pool
+        )
+        operations = []
+        for resource_name, operation_name, endpoint, operation in tasks:
+            requests = list(next(compiled_operations))
+            variables = schemas.take_used() if schemas is not None else {}
+            cost = planner.estimate_cost(create_operation_key(endpoint, operation), requests)
+            operations.append((resource_name, operation_name, requests, variables, cost))
+
+        assignments, shard_costs = planner.assign([operation[-1] for operation in operations])
+        track.trace('Quantidade de operações compiladas: %d', len(tasks))
+        Postman.trace_pool(pool, track)
+        for shard, cost in enumerate(shard_costs):
+            track.trace('Custo estimado do shard %d: %.1f', shard + 1, cost)
+        track.log()
+
+        for shard in range(shards):
+            name = f'{collection_name} ({shard + 1} of {shards})'
+            shard_builder = CollectionBuilder(name)
+            variables = {}
+            number_of_requests = 0
+            for (resource_name, operation_name, requests, used, _), assignment in zip(operations, assignments):
+                if assignment != shard:
+                    continue
+                shard_builder.get_operation_folder(resource_name, operation_name)['item'].extend(requests)
+                variables.update(used)
+                number_of_requests += len(requests)
+
+            if schemas is not None:
+                # Keep the order of the whole collection
+                variables = [
+                    variable for variable in schemas.iter_collection_variables() if variable['key'] in variables
+                ]
+            else:
+                variables = None
+
+            filename = f'{name}.postman_collection.json'
+            if cmd_args.gzip:
+                filename += '.gz'
+            yield {
+                'filename': filename,
+                'collection': CompiledCollection(shard_builder.collection, variables).emit(
+                    host_url, cmd_args.authorization_type),
+                'cost': shard_costs[shard],
+                'requests': number_of_requests
+            }
+
+    @staticmethod
+    def generate(openapi, cmd_args):
+        """
+        Generate a Postman Collection with requests and test scripts based on OpenApi file
+
+        Params:
+          - openapi: OpenApi JSON
+          - cmd_args: Arguments passed in command line
+
+        Returns: The name of the postman body collection of the file to be created and the data to be saved
+        """
+
+        result = Postman.stream(openapi, cmd_args)
+        result['collection'] = materialize(result['collection'])
+        return result
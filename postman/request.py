@@ -0,0 +1,243 @@
+import functools
+import sys
+
+from types import MappingProxyType
+
+from cli import serialization
+
+
+@functools.lru_cache(maxsize=None)
+def get_headers(method, auth_type, removed_header=None):
+    """
+    Get the headers shared by all requests of a method and authorization type
+
+    Params:
+      - method: Request HTTP method (GET, POST, PUT, PATCH, DELETE)
+      - auth_type: Authorization type to use on headers
+      - removed_header: Key of a header left out, as on the requests without authorization
+
+    Returns: Tuple with the headers, as read-only mappings
+    """
+
+    headers = []
+
+    if method in ('POST', 'PATCH', 'PUT'):
+        headers.append({
+            "key": "Content-Type",
+            "name": "Content-Type",
+            "type": "text",
+            "value": "application/json"
+        })
+
+    if auth_type == 'oauth':
+        headers.append({
+            "key": "client_id",
+            "type": "text",
+            "value": "{{client_id}}"
+        })
+        headers.append({
+            "key": "access_token",
+            "type": "text",
+            "value": "{{access_token}}"
+        })
+
+    return tuple(MappingProxyType(header) for header in headers if header['key'] != removed_header)
+
+
+@functools.lru_cache(maxsize=1024)
+def get_url(host_url, endpoint):
+    """
+    Get the URL shared by all requests of an endpoint
+
+    Params:
+      - host_url: The base url for all requests
+      - endpoint: Endpoint of the operation request
+
+    Returns: Postman URL object as a read-only mapping, with tuples as host and path
+    """
+
+    return MappingProxyType({
+        "raw": f'{host_url}/{endpoint}',
+        "host": (
+            host_url,
+        ),
+        # Segments repeat across the endpoints of a resource
+        "path": tuple(sys.intern(segment) for segment in endpoint.split('/'))
+    })
+
+
+class PostmanRequest:
+    """
+    A request of the collection, keeping only what differs between the requests of an operation.
+    Headers and URL are shared with the other requests of the same method, authorization type and endpoint.
+
+    The Postman JSON object is only created by to_dict, when the request is written, with its own copies of them.
+    """
+
+    __slots__ = ('name', 'method', 'headers', 'url', 'raw_body', 'test_script')
+
+    def __init__(self, name, method, headers, url, raw_body, test_script):
+        self.name = name
+        self.method = method
+        self.headers = headers
+        self.url = url
+        self.raw_body = raw_body
+        self.test_script = test_script
+
+    def to_dict(self):
+        """
+        Create the Postman JSON object of the request
+
+        Returns: Object representing a request on Postman with body and test, which can be changed
+        without changing other requests
+        """
+
+        return {
+            "name": self.name,
+            "event": [
+                {
+                    "listen": "test",
+                    "script": {
+                        "exec": [self.test_script]
+                    }
+                }
+            ],
+            "request": {
+                "method": self.method,
+                "header": [header.copy() for header in self.headers],
+                "body": {
+                    "mode": "raw",
+                    "raw": self.raw_body
+                },
+                "url": {
+                    "raw": self.url['raw'],
+                    "host": list(self.url['host']),
+                    "path": list(self.url['path'])
+                }
+            },
+            "response": []
+        }
+
+
+class CompiledRequest:
+    """
+    A request that doesn't depend on the host URL or the authorization type yet,
+    so the same requests can be bound to many environments and authorization types.
+    """
+
+    __slots__ = ('name', 'method', 'endpoint', 'raw_body', 'test_script', 'removed_header')
+
+    def __init__(self, name, method, endpoint, raw_body, test_script, removed_header=None):
+        self.name = name
+        self.method = method
+        self.endpoint = endpoint
+        self.raw_body = raw_body
+        self.test_script = test_script
+        self.removed_header = removed_header
+
+    def replace(self, name, removed_header):
+        return CompiledRequest(name, self.method, self.endpoint, self.raw_body, self.test_script, removed_header)
+
+    def bind(self, host_url, auth_type):
+        """
+        Create the request of an environment and authorization type
+
+        Params:
+          - host_url: The base url for all requests
+          - auth_type: Authorization type to use on headers
+
+        Returns: PostmanRequest
+        """
+
+        return PostmanRequest(
+            self.name,
+            self.method,
+            get_headers(self.method, auth_type, self.removed_header),
+            get_url(host_url, self.endpoint),
+            self.raw_body,
+            self.test_script
+        )
+
+
+class RequestPool:
+    """
+    Share the payloads of identical requests across a generation, as many responses of an operation, and the same
+    components on many operations, produce the same bodies and test scripts.
+
+    Names, bodies and test scripts equal to ones already seen are replaced by the first instance, so each distinct
+    string is kept once. Bodies of bad requests are also encoded once for each component and mutation.
+    Requests with the same method, endpoint, headers and body are counted as duplicates.
+    """
+
+    __slots__ = ('_strings', '_bodies', '_contents', 'requests', 'duplicates', 'shared_bytes')
+
+    def __init__(self):
+        self._strings = {}
+        self._bodies = {}
+        self._contents = set()
+        self.requests = 0
+        self.duplicates = 0
+        self.shared_bytes = 0
+
+    def intern(self, value):
+        shared = self._strings.setdefault(value, value)
+        if shared is not value:
+            self.shared_bytes += len(value)
+        return shared
+
+    def encode_body(self, key, build, compact):
+        """
+        Get the encoded body of a key, building and encoding it only the first time
+
+        Params:
+          - key: Hashable that identifies the body among the ones of the generation
+          - build: Function creating the JSON body
+          - compact: Whether to minify the body
+
+        Returns: String with the encoded body
+        """
+
+        raw_body = self._bodies.get(key)
+        if raw_body is None:
+            raw_body = self._bodies[key] = self.intern(encode_body(build(), compact))
+        else:
+            self.shared_bytes += len(raw_body)
+        return raw_body
+
+    def add(self, request):
+        """
+        Share the payloads of a request with the identical ones already seen
+
+        Params:
+          - request: CompiledRequest, changed in place
+
+        Returns: The same request
+        """
+
+        request.name = self.intern(request.name)
+        request.raw_body = self.intern(request.raw_body)
+        request.test_script = self.intern(request.test_script)
+
+        content = (request.method, request.endpoint, request.removed_header, request.raw_body)
+        if content in self._contents:
+            self.duplicates += 1
+        else:
+            self._contents.add(content)
+        self.requests += 1
+        return request
+
+
+def encode_body(body, compact=False):
+    """
+    Encode the JSON body of a request
+
+    Params:
+      - body: JSON body the request
+      - compact: Whether to minify the body
+
+    Returns: String with the body, non ASCII characters escaped
+    """
+
+    if compact:
+        return serialization.dumps(body, ensure_ascii=True)
+    return serialization.dumps(body, indent=4, ensure_ascii=True)
@@ -0,0 +1,77 @@
+import hashlib
+
+from .templates import generate_test_script
+from cli import serialization
+
+
+class SchemaRegistry:
+    """
+    Keep each distinct response JSON Schema once, as a collection variable referenced by the test scripts.
+
+    Test scripts are rendered once for each (schema, status code) and shared by all requests using them.
+    Variables keep the order in which they were first used.
+
+    Params:
+      - compact: Whether to trim the indentation and the blank lines of the test scripts
+    """
+
+    def __init__(self, compact=False):
+        self.compact = compact
+        self.variables = {}
+        self.used = []
+        self._scripts = {}
+
+    @staticmethod
+    def create_variable_key(value):
+        return 'jsonSchema.' + hashlib.sha256(value.encode('utf-8')).hexdigest()[:16]
+
+    def get_test_script(self, json_schema, status_code):
+        """
+        Get the test script of a response, registering its JSON Schema
+
+        Params:
+          - json_schema: Response JSON Schema expected
+          - status_code: Status code expected on request
+
+        Returns: String with the JavaScript Postman test script
+        """
+
+        key = None
+        if json_schema:
+            value = serialization.dumps(json_schema)
+            key = SchemaRegistry.create_variable_key(value)
+            self.add_variable(key, value)
+
+        script = self._scripts.get((key, status_code))
+        if script is None:
+            script = generate_test_script(json_schema, status_code, key, self.compact)
+            self._scripts[(key, status_code)] = script
+        return script
+
+    def add_variable(self, key, value):
+        if key not in self.variables:
+            self.variables[key] = value
+        self.used.append(key)
+
+    def add_variables(self, variables):
+        for key, value in variables.items():
+            self.add_variable(key, value)
+
+    def take_used(self):
+        """
+        Get the keys used since the last call, without repetitions
+
+        Returns: Dict of key to value of the variables used
+        """
+
+        used = {key: self.variables[key] for key in self.used}
+        self.used = []
+        return used
+
+    def iter_collection_variables(self):
+        for key, value in self.variables.items():
+            yield {
+                'key': key,
+                'value': value,
+                'type': 'string'
+            }
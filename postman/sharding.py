@@ -0,0 +1,83 @@
+import heapq
+import json
+
+from cli import serialization
+from cli.exceptions import InvalidShardWeightsError
+
+
+class ShardPlanner:
+    """
+    Split the operations of a collection into shards of similar estimated cost, to be run at the same time.
+
+    The cost of an operation is the sum of the costs of its requests, a fixed cost for each request plus
+    the size of its body, multiplied by the weight of the operation. Operations are never split between shards.
+
+    Params:
+      - shards: Number of shards
+      - weights: Dict of operation key, as "GET /orders", to its weight, operations without one weigh 1
+    """
+
+    request_cost = 1.0
+    byte_cost = 1.0 / 1024
+
+    def __init__(self, shards, weights=None):
+        self.shards = shards
+        self.weights = weights or {}
+
+    @staticmethod
+    def load_weights(filename):
+        """
+        Load the weights of the operations from a JSON file
+
+        Params:
+          - filename: Path of a JSON object of operation key to weight
+
+        Returns: Dict of operation key to weight
+        """
+
+        try:
+            with open(filename) as file:
+                weights = serialization.load(file)
+        except json.decoder.JSONDecodeError:
+            raise InvalidShardWeightsError(f'The file {filename} is not a JSON file.')
+
+        if not isinstance(weights, dict) or not all(
+                isinstance(weight, (int, float)) and not isinstance(weight, bool) and weight >= 0
+                for weight in weights.values()):
+            raise InvalidShardWeightsError()
+        return weights
+
+    def estimate_cost(self, key, requests):
+        """
+        Estimate the cost of running the requests of an operation
+
+        Params:
+          - key: Key of the operation, as "GET /orders"
+          - requests: CompiledRequest list of the operation
+
+        Returns: Float with the cost
+        """
+
+        cost = sum(ShardPlanner.request_cost + len(request.raw_body) * ShardPlanner.byte_cost for request in requests)
+        return cost * self.weights.get(key, 1)
+
+    def assign(self, costs):
+        """
+        Assign each operation to a shard, the most expensive first, each one to the cheapest shard so far
+
+        Params:
+          - costs: List with the cost of each operation
+
+        Returns: Tuple with the list of the shard of each operation and the list of the cost of each shard
+        """
+
+        shard_costs = [0.0] * self.shards
+        assignments = [0] * len(costs)
+        heap = [(0.0, shard) for shard in range(self.shards)]
+        for index in sorted(range(len(costs)), key=lambda i: -costs[i]):
+            cost, shard = heapq.heappop(heap)
+            assignments[index] = shard
+            shard_costs[shard] = cost + costs[index]
+            heapq.heappush(heap, (shard_costs[shard], shard))
+
+        return assignments, shard_costs
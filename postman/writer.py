@@ -0,0 +1,162 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from .request import PostmanRequest
+from cli import serialization
+from cli.tracer import Tracer
+
+
+class StreamedList:
+    """
+    JSON array whose items are produced by an iterable and encoded as they arrive.
+    """
+
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+
+def is_streamed(obj):
+    return isinstance(obj, StreamedList) or (
+        isinstance(obj, dict) and any(isinstance(value, StreamedList) for value in obj.values())
+    )
+
+
+def encode(obj, indent=4, level=0):
+    """
+    Encode an object that doesn't contain streamed lists, as json.dumps would inside the given nesting level
+
+    Params:
+      - obj: Object to encode
+      - indent: Number of spaces of each nesting level, None to minify
+      - level: Nesting level where the object is placed
+
+    Returns: String with the JSON
+    """
+
+    if isinstance(obj, PostmanRequest):
+        obj = obj.to_dict()
+    if indent is None:
+        return serialization.dumps(obj)
+
+    text = serialization.dumps(obj, indent)
+    if level:
+        # Strings are always encoded without line breaks, so only the structure is reindented
+        text = text.replace('\n', '\n' + ' ' * (indent * level))
+    return text
+
+
+def iter_encode(obj, indent=4, level=0):
+    """
+    Encode an object into JSON chunks, generating the items of streamed lists only when they are reached.
+    The concatenated chunks are equal to json.dumps with ensure_ascii=False and the given indent.
+
+    Params:
+      - obj: Object to encode, where dict values may be StreamedList, whose items may contain StreamedList again
+      - indent: Number of spaces of each nesting level, None to minify
+      - level: Nesting level where the object is placed
+
+    Returns: Generator of strings
+    """
+
+    if not is_streamed(obj):
+        with Tracer.span('serialization'):
+            text = encode(obj, indent, level)
+        yield text
+        return
+
+    if indent is None:
+        newline, item_newline, key_separator = '', '', ':'
+    else:
+        newline = '\n' + ' ' * (indent * level)
+        item_newline = '\n' + ' ' * (indent * (level + 1))
+        key_separator = ': '
+
+    if isinstance(obj, StreamedList):
+        is_empty = True
+        for item in obj.items:
+            yield ('[' if is_empty else ',') + item_newline
+            is_empty = False
+            yield from iter_encode(item, indent, level + 1)
+        yield '[]' if is_empty else newline + ']'
+        return
+
+    is_empty = True
+    for key, value in obj.items():
+        yield ('{' if is_empty else ',') + item_newline + serialization.dumps(key) + key_separator
+        is_empty = False
+        yield from iter_encode(value, indent, level + 1)
+    yield '{}' if is_empty else newline + '}'
+
+
+def materialize(obj):
+    """
+    Generate all items of the streamed lists of an object, replacing them by lists
+
+    Params:
+      - obj: Object where dict values may be StreamedList, whose items may contain StreamedList again
+
+    Returns: The same object without streamed lists, with requests as Postman JSON objects
+    """
+
+    if isinstance(obj, PostmanRequest):
+        return obj.to_dict()
+    if isinstance(obj, StreamedList):
+        return [materialize(item) for item in obj.items]
+    if is_streamed(obj):
+        for key, value in obj.items():
+            obj[key] = materialize(value)
+    return obj
+
+
+def open_collection_file(filename, mode='r'):
+    """
+    Open a collection file as text, compressed with gzip when its name ends with .gz
+
+    Params:
+      - filename: Path of the file
+      - mode: 'r' to read or 'w' to write
+
+    Returns: Text file object
+    """
+
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode + 't', encoding='utf-8')
+    return open(filename, mode, encoding='utf-8')
+
+
+def write_collection_file(filename, collection, indent=4):
+    """
+    Write the collection to a file while its requests are generated.
+    The file is only replaced when the whole collection was written.
+    A file name ending with .gz is compressed with gzip as it is written.
+
+    Params:
+      - filename: Path of the file to be created
+      - collection: Postman collection, possibly with streamed lists
+      - indent: Number of spaces of each nesting level, None to minify
+    """
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw_file:
+            binary_file = raw_file
+            if filename.endswith('.gz'):
+                # Without the modification time, the same collection is always compressed to the same bytes
+                binary_file = gzip.GzipFile(os.path.basename(filename[:-3]), 'wb', 6, raw_file, mtime=0)
+            with io.TextIOWrapper(binary_file, encoding='utf-8') as file:
+                for chunk in iter_encode(collection, indent):
+                    file.write(chunk)
+        # Temporary files are only readable by their owner, give the collection the usual permissions
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_filename, 0o666 & ~umask)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.remove(tmp_filename)
+        raise
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import sys
+
+from .suite import SCALES, compare, run
+
+
+BASELINES_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+
+def format_measure(metric, value):
+    if value is None:
+        return '-'
+    if metric == 'seconds':
+        return f'{value:.3f}s'
+    if metric == 'relative_seconds':
+        return f'{value:.3f}x'
+    return f'{value / (1024 * 1024):.1f}MB'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the resolution of refs, Postman.generate and the CLI on generated OpenAPI specs.',
+        usage='python3 -m tests.benchmarks --scales small medium --save'
+    )
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs of each benchmark (default: 3).')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Ratio over the baseline reported as a regression (default: 1.5).')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baselines.')
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINES_FILENAME):
+        with open(BASELINES_FILENAME) as baselines_file:
+            baselines = json.load(baselines_file)
+
+    results = run(args.scales, args.repeat)
+
+    has_regression = False
+    print(f'{"benchmark":<22} {"metric":<16} {"baseline":>10} {"current":>10} {"ratio":>7}')
+    for benchmark, metric, baseline, current, ratio, is_regression in compare(results, baselines, args.tolerance):
+        has_regression = has_regression or is_regression
+        ratio_text = f'{ratio:.2f}' if ratio is not None else '-'
+        flag = '  REGRESSION' if is_regression else ''
+        print(f'{benchmark:<22} {metric:<16} {format_measure(metric, baseline):>10} '
+              f'{format_measure(metric, current):>10} {ratio_text:>7}{flag}')
+
+    if args.save:
+        baselines.update(results)
+        with open(BASELINES_FILENAME, 'w') as baselines_file:
+            json.dump(baselines, baselines_file, indent=4, sort_keys=True)
+        print(f'\n=== Baselines saved to {BASELINES_FILENAME}')
+    elif has_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
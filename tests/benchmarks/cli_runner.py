@@ -0,0 +1,28 @@
+"""
+Run the CLI and report its own peak resident memory on the last line of stderr.
+
+The rusage of a child process also counts the memory of the process that forked it,
+while VmHWM is reset when the CLI interpreter starts.
+"""
+import resource
+import runpy
+import sys
+
+
+def get_peak_bytes():
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+if __name__ == '__main__':
+    sys.argv = ['cli/main.py'] + sys.argv[1:]
+    try:
+        runpy.run_module('cli.main', run_name='__main__')
+    finally:
+        print(f'peak_bytes={get_peak_bytes()}', file=sys.stderr)
@@ -0,0 +1,197 @@
+import contextlib
+import copy
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from ..helpers.body_generator import BodyGenerator
+from ..helpers.spec_generator import SpecGenerator
+
+from openapi.openapi import OpenApi
+from postman.pm import Postman
+
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCALES = {
+    'small': {'paths': 20, 'tags': 4, 'schemas': 20, 'width': 8, 'depth': 3, 'ref_fanout': 2},
+    'medium': {'paths': 100, 'tags': 10, 'schemas': 60, 'width': 10, 'depth': 3, 'ref_fanout': 2},
+    'large': {'paths': 300, 'tags': 30, 'schemas': 150, 'width': 12, 'depth': 4, 'ref_fanout': 2},
+}
+
+# Fast benchmarks are run as many times as needed to take this long, far above the noise of the timer
+MIN_SECONDS = 0.1
+# Only measures that don't depend on the speed of the machine are compared with the baselines
+COMPARED_METRICS = ('relative_seconds', 'peak_bytes')
+
+
+def run_reference():
+    """
+    Run a fixed workload of the interpreter alone, whose time is the unit of the relative times,
+    so baselines recorded on a machine still hold on a faster or slower one
+    """
+
+    data = {f'key{i}': {'values': list(range(20)), 'name': f'name {i}', 'nested': {'flag': i % 2 == 0}}
+            for i in range(200)}
+    for _ in range(20):
+        json.loads(json.dumps(copy.deepcopy(data), sort_keys=True))
+
+
+def count_calls(fn):
+    """
+    Get the number of calls of a function that take MIN_SECONDS
+    """
+
+    start = time.perf_counter()
+    fn()
+    return max(1, math.ceil(MIN_SECONDS / max(time.perf_counter() - start, 1e-9)))
+
+
+def time_calls(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def time_runs(fn, repeat):
+    """
+    Measure the best wall time of a function and of the reference workload, alternating their timed runs so both
+    are measured under the same load of the machine. Each timed run calls them enough times to take MIN_SECONDS.
+
+    Params:
+      - fn: Function without arguments
+      - repeat: Number of timed runs
+
+    Returns: Tuple with the seconds of a single call of the function and of the reference workload
+    """
+
+    calls = count_calls(fn)
+    reference_calls = count_calls(run_reference)
+
+    seconds = reference_seconds = math.inf
+    for _ in range(repeat):
+        reference_seconds = min(reference_seconds, time_calls(run_reference, reference_calls))
+        seconds = min(seconds, time_calls(fn, calls))
+    return seconds, reference_seconds
+
+
+def measure(fn, repeat):
+    """
+    Measure the best wall time of some runs of a function and its peak of Python memory on an extra run
+
+    Params:
+      - fn: Function without arguments
+      - repeat: Number of timed runs
+
+    Returns: Dict with the seconds, the seconds relative to the reference workload and the peak bytes
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds, reference_seconds = time_runs(fn, repeat)
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': seconds, 'relative_seconds': seconds / reference_seconds, 'peak_bytes': peak}
+
+
+def resolve_all_components(data):
+    OpenApi.clear_cache(data)
+    for schema_name in data['components']['schemas']:
+        component_name = f'#/components/schemas/{schema_name}'
+        OpenApi.get_json_schema_from_component(data, component_name)
+        OpenApi.get_json_body_from_component(data, component_name)
+
+
+def generate_collection(data):
+    OpenApi.clear_cache(data)
+    Postman.generate(data, BodyGenerator.cmd_args())
+
+
+def run_cli(data, repeat):
+    """
+    Run the CLI in new processes, measuring the best wall time and the maximum resident memory.
+    The reference workload is timed before each run.
+
+    Params:
+      - data: OpenApi JSON
+      - repeat: Number of runs
+
+    Returns: Dict with the seconds, the seconds relative to the reference workload and the peak bytes
+    """
+
+    seconds = reference_seconds = math.inf
+    reference_calls = count_calls(run_reference)
+    peak = 0
+    with tempfile.TemporaryDirectory() as directory:
+        spec_filename = os.path.join(directory, 'openapi.json')
+        with open(spec_filename, 'w', encoding='utf-8') as spec_file:
+            json.dump(data, spec_file)
+
+        command = [sys.executable, '-m', 'tests.benchmarks.cli_runner', spec_filename, '-e', 'Production',
+                   '-auth', 'oauth', '-gen-badreq']
+        env = dict(os.environ, PYTHONPATH=ROOT_DIRECTORY)
+        for _ in range(repeat):
+            reference_seconds = min(reference_seconds, time_calls(run_reference, reference_calls))
+            start = time.perf_counter()
+            process = subprocess.run(command, cwd=directory, env=env, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.PIPE, text=True, check=True)
+            seconds = min(seconds, time.perf_counter() - start)
+            peak = max(peak, int(process.stderr.strip().splitlines()[-1].split('=')[1]))
+
+    return {'seconds': seconds, 'relative_seconds': seconds / reference_seconds, 'peak_bytes': peak}
+
+
+def run(scales, repeat=3):
+    """
+    Run all benchmarks for the given scales
+
+    Params:
+      - scales: Names of the scales to run
+      - repeat: Number of timed runs of each benchmark
+
+    Returns: Dict of "benchmark[scale]" to its measures
+    """
+
+    results = {}
+    for scale in scales:
+        data = SpecGenerator(seed=42, **SCALES[scale]).generate()
+        results[f'resolution[{scale}]'] = measure(lambda: resolve_all_components(data), repeat)
+        results[f'generate[{scale}]'] = measure(lambda: generate_collection(data), repeat)
+        results[f'cli[{scale}]'] = run_cli(data, repeat)
+
+    return results
+
+
+def compare(results, baselines, tolerance):
+    """
+    Compare the results with the baselines, only the measures of COMPARED_METRICS can be regressions
+
+    Params:
+      - results: Measures of this run
+      - baselines: Measures saved from a previous run
+      - tolerance: Ratio over the baseline from which a measure is a regression
+
+    Returns: List of (benchmark, metric, baseline, current, ratio, is_regression) tuples
+    """
+
+    comparison = []
+    for benchmark, measures in results.items():
+        for metric, current in measures.items():
+            baseline = baselines.get(benchmark, {}).get(metric)
+            ratio = current / baseline if baseline else None
+            is_regression = metric in COMPARED_METRICS and ratio is not None and ratio > tolerance
+            comparison.append((benchmark, metric, baseline, current, ratio, is_regression))
+
+    return comparison
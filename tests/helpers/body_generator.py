@@ -1,22 +1,140 @@
-class BodyGenerator:
-
-    @staticmethod
-    def openapi_spec():
-        return {
-            "openapi": "3.0.0",
-            "info": {
-                "title": "API Orders",
-                "description": "API to handle Orders operations.",
-                "version": "1.0.0"
-            },
-            "servers": [
-                {
-                    "url": "http://localhost:8000",
-                    "description": "Production"
-                }
-            ],
-            "paths": {},
-            "components": {
-                "schemas": {}
-            }
-        }
\ No newline at end of file
+import argparse
+
+
+class BodyGenerator:
+
+    @staticmethod
+    def openapi_spec():
+        return {
+            "openapi": "3.0.0",
+            "info": {
+                "title": "API Orders",
+                "description": "API to handle Orders operations.",
+                "version": "1.0.0"
+            },
+            "servers": [
+                {
+                    "url": "http://localhost:8000",
+                    "description": "Production"
+                }
+            ],
+            "paths": {},
+            "components": {
+                "schemas": {}
+            }
+        }
+
+    @staticmethod
+    def openapi_spec_with_paths():
+        data = BodyGenerator.openapi_spec()
+        order_ref = {"$ref": "#/components/schemas/Order"}
+        error_ref = {"$ref": "#/components/schemas/Error"}
+        data['paths'] = {
+            "/orders": {
+                "post": {
+                    "tags": ["Orders"],
+                    "summary": "Create order",
+                    "requestBody": {"content": {"application/json": {"schema": order_ref}}},
+                    "responses": {
+                        "201": {"description": "Created", "content": {"application/json": {"schema": order_ref}}},
+                        "400": {"description": "Bad request", "content": {"application/json": {"schema": error_ref}}},
+                        "401": {"description": "Unauthorized"}
+                    }
+                },
+                "get": {
+                    "tags": ["Orders"],
+                    "summary": "List orders",
+                    "responses": {
+                        "200": {
+                            "description": "OK",
+                            "content": {"application/json": {"schema": {"type": "array", "items": order_ref}}}
+                        }
+                    }
+                }
+            },
+            "/customers": {
+                "get": {
+                    "tags": ["Customers"],
+                    "summary": "List customers",
+                    "responses": {
+                        "200": {"description": "OK"},
+                        "501": {"description": "Not implemented"}
+                    }
+                }
+            },
+            "/orders/{id}": {
+                "put": {
+                    "tags": ["Orders"],
+                    "summary": "Update order",
+                    "requestBody": {"content": {"application/json": {"schema": order_ref}}},
+                    "responses": {
+                        "200": {"description": "OK", "content": {"application/json": {"schema": order_ref}}},
+                        "422": {"description": "Invalid", "content": {"application/json": {"schema": error_ref}}},
+                        "404": {"description": "Not found"}
+                    }
+                }
+            }
+        }
+        data['components']['schemas'] = {
+            "Error": {
+                "type": "object",
+                "properties": {
+                    "code": {"type": "string"},
+                    "message": {"type": "string"}
+                }
+            },
+            "Money": {
+                "type": "object",
+                "required": ["amount", "currency"],
+                "properties": {
+                    "amount": {"type": "number"},
+                    "currency": {"type": "string"}
+                }
+            },
+            "Item": {
+                "type": "object",
+                "required": ["sku", "price"],
+                "properties": {
+                    "sku": {"type": "string"},
+                    "price": {"$ref": "#/components/schemas/Money"}
+                }
+            },
+            "Order": {
+                "type": "object",
+                "required": ["id", "paid", "items", "total"],
+                "properties": {
+                    "id": {"type": "string"},
+                    "paid": {"type": "boolean"},
+                    "items": {"type": "array", "items": {"$ref": "#/components/schemas/Item"}},
+                    "total": {"$ref": "#/components/schemas/Money"},
+                    "note": {"type": "string"}
+                }
+            }
+        }
+        return data
+
+    @staticmethod
+    def cmd_args(**kwargs):
+        args = {
+            'environment': 'Production',
+            'host_url': None,
+            'authorization_type': 'oauth',
+            'file_success_body': None,
+            'generate_body_on_requests': True,
+            'generate_bad_requests': True,
+            'hoist_schemas': False,
+            'compact': False,
+            'dedup_requests': False,
+            'mutation_strategy': 'exhaustive',
+            'mutation_depth_caps': None,
+            'mutation_seed': 0,
+            'bad_request_budget': None,
+            'gzip': False,
+            'jobs': 1,
+            'environments': None,
+            'authorization_types': None,
+            'shards': None,
+            'shard_weights': None
+        }
+        args.update(kwargs)
+        return argparse.Namespace(**args)
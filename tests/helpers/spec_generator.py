@@ -0,0 +1,131 @@
+import random
+
+from .body_generator import BodyGenerator
+
+
+class SpecGenerator:
+    """
+    Generate realistic OpenAPI 3.0 specs of any size, always the same for the same seed and parameters.
+
+    Params:
+      - seed: Seed of the random generator
+      - paths: Number of paths, each one with POST and GET operations and a PUT on its item path
+      - tags: Number of tags (resource folders)
+      - schemas: Number of component schemas
+      - width: Number of properties of each schema
+      - depth: Number of levels of nested schemas, level 0 only has primitive properties
+      - ref_fanout: Maximum number of $ref properties of each schema above level 0
+      - required_ratio: Ratio of required properties of each schema
+    """
+
+    primitive_types = ('string', 'number', 'boolean')
+
+    def __init__(self, seed=0, paths=50, tags=5, schemas=30, width=8, depth=3, ref_fanout=2, required_ratio=0.5):
+        self.seed = seed
+        self.paths = paths
+        self.tags = tags
+        self.schemas = schemas
+        self.width = width
+        self.depth = depth
+        self.ref_fanout = ref_fanout
+        self.required_ratio = required_ratio
+
+    @staticmethod
+    def create_ref(schema_name):
+        return {'$ref': f'#/components/schemas/{schema_name}'}
+
+    def generate_schemas(self, rng):
+        levels = [[] for _ in range(self.depth)]
+        schemas = {}
+        for index in range(self.schemas):
+            level = index % self.depth
+            schema_name = f'Schema{index}'
+            properties = {}
+            refs = rng.randint(1, self.ref_fanout) if level > 0 else 0
+            for prop_index in range(self.width):
+                prop_name = f'field{prop_index}'
+                if prop_index < refs:
+                    referenced = rng.choice(levels[rng.randrange(level)])
+                    if rng.random() < 0.5:
+                        properties[prop_name] = SpecGenerator.create_ref(referenced)
+                    else:
+                        properties[prop_name] = {'type': 'array', 'items': SpecGenerator.create_ref(referenced)}
+                elif rng.random() < 0.1:
+                    properties[prop_name] = {'type': 'array', 'items': {'type': 'string'}}
+                else:
+                    properties[prop_name] = {'type': rng.choice(SpecGenerator.primitive_types)}
+
+            required = [prop_name for prop_name in properties if rng.random() < self.required_ratio]
+            schema = {'type': 'object', 'properties': properties}
+            if required:
+                schema['required'] = required
+
+            schemas[schema_name] = schema
+            levels[level].append(schema_name)
+
+        schemas['Error'] = {
+            'type': 'object',
+            'properties': {
+                'code': {'type': 'string'},
+                'message': {'type': 'string'}
+            }
+        }
+        return schemas, levels
+
+    @staticmethod
+    def create_content(schema):
+        return {'application/json': {'schema': schema}}
+
+    def generate_paths(self, rng, levels):
+        error = SpecGenerator.create_content(SpecGenerator.create_ref('Error'))
+        top_level = levels[-1] or [name for level in levels for name in level]
+        paths = {}
+        for index in range(self.paths):
+            resource = f'resource{index}'
+            tag = f'Tag{index % self.tags}'
+            schema = SpecGenerator.create_ref(rng.choice(top_level))
+            paths[f'/{resource}'] = {
+                'post': {
+                    'tags': [tag],
+                    'summary': f'Create {resource}',
+                    'requestBody': {'content': SpecGenerator.create_content(schema)},
+                    'responses': {
+                        '201': {'description': 'Created', 'content': SpecGenerator.create_content(schema)},
+                        '400': {'description': 'Bad request', 'content': error},
+                        '401': {'description': 'Unauthorized'},
+                        '500': {'description': 'Internal error', 'content': error}
+                    }
+                },
+                'get': {
+                    'tags': [tag],
+                    'summary': f'List {resource}',
+                    'responses': {
+                        '200': {
+                            'description': 'OK',
+                            'content': SpecGenerator.create_content({'type': 'array', 'items': schema})
+                        },
+                        '401': {'description': 'Unauthorized'}
+                    }
+                }
+            }
+            paths[f'/{resource}/{{id}}'] = {
+                'put': {
+                    'tags': [tag],
+                    'summary': f'Update {resource}',
+                    'requestBody': {'content': SpecGenerator.create_content(schema)},
+                    'responses': {
+                        '200': {'description': 'OK', 'content': SpecGenerator.create_content(schema)},
+                        '404': {'description': 'Not found', 'content': error},
+                        '422': {'description': 'Invalid', 'content': error}
+                    }
+                }
+            }
+        return paths
+
+    def generate(self):
+        rng = random.Random(self.seed)
+        data = BodyGenerator.openapi_spec()
+        schemas, levels = self.generate_schemas(rng)
+        data['paths'] = self.generate_paths(rng, levels)
+        data['components']['schemas'] = schemas
+        return data
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from .helpers.body_generator import BodyGenerator
+
+from cli.batch import expand_spec_filenames, run_batch
+
+
+def write_specs(directory):
+    spec = BodyGenerator.openapi_spec_with_paths()
+    (directory / 'orders.json').write_text(json.dumps(spec))
+    spec['info']['title'] = 'API Customers'
+    (directory / 'customers.json').write_text(json.dumps(spec))
+    spec['openapi'] = '2.0.0'
+    (directory / 'legacy.json').write_text(json.dumps(spec))
+    (directory / 'broken.json').write_text('{')
+
+
+def test_glob_patterns_are_expanded_in_order(tmp_path):
+    write_specs(tmp_path)
+    filenames = expand_spec_filenames(['o*.json', '*.json', 'missing.json'], str(tmp_path))
+    assert [filename.rsplit('/', 1)[-1] for filename in filenames] == [
+        'orders.json', 'broken.json', 'customers.json', 'legacy.json', 'missing.json'
+    ]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_batch_reports_each_spec_without_stopping(tmp_path, monkeypatch, jobs):
+    write_specs(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    filenames = expand_spec_filenames(['*.json'], str(tmp_path))
+    args = BodyGenerator.cmd_args(jobs=jobs, previous_manifest=None, manifest=False)
+
+    results = list(run_batch(filenames, args))
+    assert [result['openapi'] for result in results] == filenames
+    assert [result['collections'] for result in results] == [
+        [], ['API Customers.postman_collection.json'], [], ['API Orders.postman_collection.json']
+    ]
+    assert 'is not a JSON file' in results[0]['error']
+    assert 'OpenAPI version is not supported' in results[2]['error']
+    assert all(result['seconds'] >= 0 for result in results)
+
+    with open(tmp_path / 'API Orders.postman_collection.json') as file:
+        assert json.load(file)['info']['name'] == 'API Orders'
+
+
+def test_fan_out_saves_a_collection_for_each_authorization_type(tmp_path, monkeypatch):
+    write_specs(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    filenames = expand_spec_filenames(['orders.json'], str(tmp_path))
+    args = BodyGenerator.cmd_args(previous_manifest=None, manifest=False, authorization_types=['none', 'oauth'])
+
+    results = list(run_batch(filenames, args))
+    assert results[0]['collections'] == [
+        'API Orders (Production, none).postman_collection.json',
+        'API Orders (Production, oauth).postman_collection.json'
+    ]
+    with open(tmp_path / 'API Orders (Production, oauth).postman_collection.json') as file:
+        assert json.load(file)['info']['name'] == 'API Orders (Production, oauth)'
+
+
+def test_shards_save_a_collection_for_each_shard(tmp_path, monkeypatch):
+    write_specs(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'weights.json').write_text(json.dumps({'GET /customers': 1000}))
+    filenames = expand_spec_filenames(['orders.json'], str(tmp_path))
+    args = BodyGenerator.cmd_args(previous_manifest=None, manifest=False, shards=3, shard_weights='weights.json')
+
+    results = list(run_batch(filenames, args))
+    assert results[0]['collections'] == [f'API Orders ({shard} of 3).postman_collection.json' for shard in (1, 2, 3)]
+    with open(tmp_path / 'API Orders (1 of 3).postman_collection.json') as file:
+        assert [resource['name'] for resource in json.load(file)['item']] == ['Customers']
+
+    (tmp_path / 'weights.json').write_text(json.dumps({'GET /customers': 'high'}))
+    results = list(run_batch(filenames, args))
+    assert results[0]['error'].startswith('Error - Shard weights must be')
@@ -0,0 +1,11 @@
+from app.cache import CollectionCache
+
+
+def test_collection_cache_eviction():
+    cache = CollectionCache(max_entries=2, max_bytes=10, ttl=60)
+    cache.set('a', b'1234')
+    cache.set('b', b'1234')
+    assert cache.get('a') == b'1234'
+    cache.set('c', b'1234')
+    assert cache.get('b') is None
+    assert cache.stats()['size'] == 8
@@ -0,0 +1,12 @@
+from postman.collection import CollectionBuilder
+
+
+def test_folders_are_reused_in_creation_order():
+    builder = CollectionBuilder('API Orders')
+    create_order = builder.get_operation_folder('Orders', 'Create order')
+    builder.get_operation_folder('Customers', 'Create customer')
+    list_orders = builder.get_operation_folder('Orders', 'List orders')
+
+    assert builder.get_operation_folder('Orders', 'Create order') is create_order
+    assert [resource['name'] for resource in builder.collection['item']] == ['Orders', 'Customers']
+    assert builder.get_resource_folder('Orders')['item'] == [create_order, list_orders]
@@ -1,24 +1,366 @@
-from fastapi.testclient import TestClient
-
-from .helpers.body_generator import BodyGenerator
-
-from app.main import app
-
-
-client = TestClient(app)
-
-
-def test_generate_postman_collection():
-    data = BodyGenerator.openapi_spec()
-    response = client.post('/api/v1/postman/collection', json=data)
-    assert response.status_code == 201
-    assert response.json() == {'title': data.get('info').get('title')}
-
-
-def test_wrong_openapi_version():
-    data = BodyGenerator.openapi_spec()
-    data['openapi'] = '2.0.0'
-    response = client.post('/api/v1/postman/collection', json=data)
-    assert response.status_code == 422
-    detailed_error = response.json()
-    assert detailed_error['detail'][0]['msg'] == 'openapi version must be 3.0.0'
+import asyncio
+import gzip
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from .helpers.body_generator import BodyGenerator
+
+from app.cache import CollectionCache
+from app import main
+from app.main import app, collection_cache
+from app.settings import settings
+from app.workers import GenerationPool
+from cli.exceptions import GenerationBusyError, GenerationError, GenerationTimeoutError
+from postman.pm import Postman
+
+
+client = TestClient(app)
+
+
+def test_generate_postman_collection():
+    data = BodyGenerator.openapi_spec()
+    response = client.post('/api/v1/postman/collection', json=data)
+    assert response.status_code == 201
+    assert response.json()['info']['name'] == data.get('info').get('title')
+    assert response.json()['item'] == []
+
+
+def test_generate_postman_collection_with_paths():
+    data = BodyGenerator.openapi_spec_with_paths()
+    response = client.post('/api/v1/postman/collection', json=data,
+                           params={'environment': 'Production', 'generate_bad_requests': True})
+    assert response.status_code == 201
+    collection = response.json()
+    assert [resource['name'] for resource in collection['item']] == ['Orders', 'Customers']
+    request = collection['item'][1]['item'][0]['item'][0]['request']
+    assert request['url']['host'] == ['http://localhost:8000']
+
+
+def test_unknown_environment():
+    data = BodyGenerator.openapi_spec()
+    response = client.post('/api/v1/postman/collection', json=data, params={'environment': 'Staging'})
+    assert response.status_code == 422
+
+
+def test_negative_mutation_limits():
+    data = BodyGenerator.openapi_spec()
+    for params in ({'bad_request_budget': -1}, {'mutation_depth_caps': [2, -1]}):
+        response = client.post('/api/v1/postman/collection', json=data, params=params)
+        assert response.status_code == 422
+
+
+def test_unsupported_spec():
+    data = BodyGenerator.openapi_spec_with_paths()
+    del data['paths']['/orders']['get']['tags']
+    response = client.post('/api/v1/postman/collection', json=data)
+    assert response.status_code == 422
+    assert "KeyError('tags')" in response.json()['detail']
+
+
+def test_wrong_openapi_version():
+    data = BodyGenerator.openapi_spec()
+    data['openapi'] = '2.0.0'
+    response = client.post('/api/v1/postman/collection', json=data)
+    assert response.status_code == 422
+    detailed_error = response.json()
+    assert detailed_error['detail'][0]['msg'] == 'openapi version must be 3.0.0'
+
+
+def test_generation_pool_limits():
+    pool = GenerationPool(max_workers=1, timeout=0.2)
+
+    async def run_concurrently():
+        slow = asyncio.ensure_future(pool.run(time.sleep, 1))
+        await asyncio.sleep(0.05)
+        with pytest.raises(GenerationBusyError):
+            await pool.run(time.sleep, 0)
+        with pytest.raises(GenerationTimeoutError):
+            await slow
+        # The worker of the slow function was killed, so its slot is free at once
+        await asyncio.wait_for(pool.run(time.sleep, 0), 0.5)
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(divmod, 1, 0)
+        assert await pool.run(divmod, 7, 2) == (3, 1)
+
+    try:
+        asyncio.run(run_concurrently())
+    finally:
+        pool.shutdown()
+
+
+def count_slowly(count):
+    for number in range(count):
+        yield number
+        time.sleep(0.05)
+    return 'done'
+
+
+def test_generation_pool_streams():
+    pool = GenerationPool(max_workers=1, timeout=5)
+
+    async def stream_numbers():
+        stream = pool.stream(count_slowly, 3)
+        assert [number async for number in stream] == [0, 1, 2]
+        assert stream.result == 'done'
+
+        # Closing a stream before it ends kills its worker, freeing its slot
+        stream = pool.stream(count_slowly, 100)
+        assert await stream.__anext__() == 0
+        stream.close()
+        assert await asyncio.wait_for(pool.run(divmod, 7, 2), 1) == (3, 1)
+
+    try:
+        asyncio.run(stream_numbers())
+    finally:
+        pool.shutdown()
+
+
+def stream_slowly(openapi, cmd_args, refs_directory=None):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    text = json.dumps({'info': openapi['info'], 'item': []}).encode('utf-8')
+    for start in range(0, len(text), 10):
+        yield compressor.compress(text[start:start + 10]) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+    return (len(text), zlib.crc32(text), zlib.adler32(text)), {}, {'operations': 0, 'requests': 0}
+
+
+def stream_then_fail(openapi, cmd_args, refs_directory=None):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    yield compressor.compress(b'{"item": [') + compressor.flush(zlib.Z_SYNC_FLUSH)
+    raise GenerationError('The generation failed after the first part.')
+
+
+def test_slow_clients_do_not_time_out_generations(monkeypatch):
+    pool = GenerationPool(max_workers=1, timeout=0.5)
+    monkeypatch.setattr(main, 'generation_pool', pool)
+    monkeypatch.setattr(main, 'stream_collection', stream_slowly)
+    collection_cache.clear()
+    data = BodyGenerator.openapi_spec()
+    try:
+        with client.stream('POST', '/api/v1/postman/collection', json=data) as response:
+            chunks = response.iter_raw()
+            body = next(chunks)
+            # The worker is drained while the client doesn't read, its timeout only counts the generation
+            time.sleep(0.8)
+            body += b''.join(chunks)
+        assert json.loads(gzip.decompress(body))['info']['title'] == data['info']['title']
+        assert collection_cache.stats()['entries'] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_failures_after_the_first_part_abort_the_response(monkeypatch):
+    uvicorn = pytest.importorskip('uvicorn')
+    monkeypatch.setattr(main, 'stream_collection', stream_then_fail)
+    collection_cache.clear()
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level='critical'))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [listener]}, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            time.sleep(0.01)
+        connection = http.client.HTTPConnection(*listener.getsockname())
+        connection.request('POST', '/api/v1/postman/collection', body=json.dumps(BodyGenerator.openapi_spec()),
+                           headers={'Content-Type': 'application/json', 'Accept-Encoding': 'identity'})
+        response = connection.getresponse()
+        # The status was already sent, so the connection is aborted instead of ending the chunked body
+        assert response.status == 201
+        assert response.getheader('Transfer-Encoding') == 'chunked'
+        with pytest.raises(http.client.IncompleteRead) as error:
+            response.read()
+        assert error.value.partial == b'{"item": ['
+        connection.close()
+    finally:
+        server.should_exit = True
+        thread.join()
+        listener.close()
+
+    assert collection_cache.stats()['entries'] == 0
+
+
+def test_repeated_generation_is_cached():
+    collection_cache.clear()
+    data = BodyGenerator.openapi_spec_with_paths()
+    first = client.post('/api/v1/postman/collection', json=data, params={'authorization_type': 'oauth'})
+    second = client.post('/api/v1/postman/collection', json=data, params={'authorization_type': 'oauth'})
+    other_options = client.post('/api/v1/postman/collection', json=data)
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert other_options.headers['X-Cache'] == 'MISS'
+    assert second.content == first.content
+
+    stats = client.get('/api/v1/postman/collection/cache').json()
+    assert stats['entries'] == 2
+    assert stats['hits'] == 1
+    # Collections are kept compressed
+    assert 0 < stats['size'] < len(first.content) + len(other_options.content)
+
+
+def test_cache_key_is_computed_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def create_key(openapi, options, documents=None):
+        try:
+            asyncio.get_running_loop()
+            threads.append('event loop')
+        except RuntimeError:
+            threads.append('thread')
+        return 'key'
+
+    monkeypatch.setattr(CollectionCache, 'create_key', staticmethod(create_key))
+    collection_cache.clear()
+    data = BodyGenerator.openapi_spec()
+    assert client.post('/api/v1/postman/collection', json=data).status_code == 201
+    assert threads == ['thread']
+
+
+def test_cached_collection_changes_with_referenced_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'refs_directory', str(tmp_path))
+    money = tmp_path / 'money.json'
+    money.write_text(json.dumps({'Money': {'type': 'object', 'properties': {'amount': {'type': 'number'}}}}))
+    data = BodyGenerator.openapi_spec_with_paths()
+    data['components']['schemas']['Money'] = {'$ref': 'money.json#/Money'}
+
+    first = client.post('/api/v1/postman/collection', json=data)
+    second = client.post('/api/v1/postman/collection', json=data)
+    assert first.status_code == 201
+    assert second.headers['X-Cache'] == 'HIT'
+
+    money.write_text(json.dumps({'Money': {'type': 'object', 'properties': {'cents': {'type': 'integer'}}}}))
+    os.utime(money, ns=(time.time_ns() + 10 ** 9,) * 2)
+    edited = client.post('/api/v1/postman/collection', json=data)
+    assert edited.headers['X-Cache'] == 'MISS'
+    assert b'cents' in edited.content and b'cents' not in first.content
+
+    money.unlink()
+    assert client.post('/api/v1/postman/collection', json=data).status_code == 422
+
+
+@pytest.mark.parametrize('accept_encoding, content_encoding', [
+    ('gzip, deflate', 'gzip'),
+    ('deflate', 'deflate'),
+    ('gzip;q=0, identity', None),
+    ('', None)
+])
+def test_collection_encoding_is_negotiated(accept_encoding, content_encoding):
+    data = BodyGenerator.openapi_spec_with_paths()
+    args = BodyGenerator.cmd_args(environment=None, authorization_type='none', generate_bad_requests=False)
+    expected = json.dumps(Postman.generate(data, args)['collection'], ensure_ascii=False,
+                          separators=(',', ':')).encode('utf-8')
+    collection_cache.clear()
+    # Generated while it is streamed, without a length, and then sent from the cache
+    for cache in ('MISS', 'HIT'):
+        with client.stream('POST', '/api/v1/postman/collection', json=data,
+                           headers={'Accept-Encoding': accept_encoding}) as response:
+            raw = b''.join(response.iter_raw())
+        assert response.headers['X-Cache'] == cache
+        assert response.headers.get('Content-Encoding') == content_encoding
+        if cache == 'MISS':
+            assert 'Content-Length' not in response.headers
+        else:
+            assert response.headers['Content-Length'] == str(len(raw))
+        if content_encoding == 'gzip':
+            raw = gzip.decompress(raw)
+        elif content_encoding == 'deflate':
+            raw = zlib.decompress(raw)
+        assert raw == expected
+
+
+def test_tracing_summary():
+    collection_cache.clear()
+    data = BodyGenerator.openapi_spec_with_paths()
+    response = client.post('/api/v1/postman/collection', json=data, params={'generate_bad_requests': True})
+    assert response.status_code == 201
+
+    response = client.get('/api/v1/tracing/summary')
+    assert response.status_code == 200
+    phases = {row['phase']: row for row in response.json()}
+    assert phases['generate']['calls'] >= 1
+    assert phases['generate/bad_requests']['depth'] == 1
+
+
+def wait_for_job(job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f'/api/v1/postman/collection/jobs/{job_id}').json()
+        if status['status'] in ('done', 'failed') or time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
+
+
+def test_collection_job():
+    collection_cache.clear()
+    data = BodyGenerator.openapi_spec_with_paths()
+    params = {'generate_bad_requests': True, 'authorization_type': 'oauth'}
+    response = client.post('/api/v1/postman/collection/jobs', json=data, params=params)
+    assert response.status_code == 202
+    job_id = response.json()['id']
+    assert response.headers['Location'] == f'/api/v1/postman/collection/jobs/{job_id}'
+
+    status = wait_for_job(job_id)
+    assert status['status'] == 'done'
+    assert status['progress'] == {'operations': 4, 'total_operations': 4}
+
+    result = client.get(f'/api/v1/postman/collection/jobs/{job_id}/result')
+    assert result.status_code == 200
+    response = client.post('/api/v1/postman/collection', json=data, params=params)
+    assert response.headers['X-Cache'] == 'HIT'
+    assert result.content == response.content
+
+
+def test_failed_collection_job():
+    data = BodyGenerator.openapi_spec()
+    response = client.post('/api/v1/postman/collection/jobs', json=data, params={'environment': 'Staging'})
+    job_id = response.json()['id']
+    assert wait_for_job(job_id)['status'] == 'failed'
+
+    result = client.get(f'/api/v1/postman/collection/jobs/{job_id}/result')
+    assert result.status_code == 422
+    assert 'Staging' in result.json()['detail']
+    assert client.get('/api/v1/postman/collection/jobs/unknown').status_code == 404
+
+
+def test_jobs_are_unavailable_with_many_processes_and_a_local_queue(monkeypatch):
+    monkeypatch.setattr(main, 'jobs_available', False)
+    response = client.post('/api/v1/postman/collection/jobs', json=BodyGenerator.openapi_spec())
+    assert response.status_code == 501
+    assert 'single API process' in response.json()['detail']
+    assert client.get('/api/v1/postman/collection/jobs/unknown').status_code == 501
+    assert client.post('/api/v1/postman/collection', json=BodyGenerator.openapi_spec()).status_code == 201
+
+
+def test_prometheus_metrics():
+    collection_cache.clear()
+    data = BodyGenerator.openapi_spec_with_paths()
+    data['info']['title'] = 'API Metrics'
+    client.post('/api/v1/postman/collection', json=data, params={'generate_bad_requests': True})
+    client.post('/api/v1/postman/collection', json=data, params={'generate_bad_requests': True})
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    samples = {}
+    for line in response.text.splitlines():
+        if not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+
+    assert samples['openapi2pm_generation_seconds_bucket{kind="sync",le="+Inf"}'] >= 1
+    assert samples['openapi2pm_generation_seconds_count{kind="sync"}'] >= 1
+    assert samples['openapi2pm_generated_requests_total{kind="sync"}'] >= 62
+    assert samples['openapi2pm_spec_bytes_count'] >= 2
+    assert samples['openapi2pm_cache_requests_total{result="hit"}'] >= 1
+    assert samples['openapi2pm_in_flight_generations'] == 0
+    assert 'openapi2pm_jobs{status="running"}' in samples
+    assert samples['openapi2pm_phase_seconds_total{phase="generate"}'] > 0
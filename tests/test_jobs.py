@@ -0,0 +1,43 @@
+import pytest
+
+from app.jobs import Job, JobQueue, JobRunner, LocalJobQueue
+from cli.exceptions import JobQueueFullError
+
+
+def test_local_job_queue_limits():
+    job_queue = LocalJobQueue(max_queued=1, ttl=60)
+    first = Job('a', {}, None)
+    job_queue.put(first)
+    with pytest.raises(JobQueueFullError):
+        job_queue.put(Job('b', {}, None))
+
+    assert job_queue.take(timeout=0) is first
+    assert job_queue.take(timeout=0) is None
+    first.finish(content=b'{}')
+    first.finished_at -= 61
+    assert job_queue.get(first.id) is None
+
+
+def test_job_queue_backends_are_abstract():
+    with pytest.raises(TypeError):
+        JobQueue()
+
+
+def test_local_job_queue_needs_a_single_process():
+    assert isinstance(JobQueue.create('local'), LocalJobQueue)
+    assert JobQueue.is_available('local', processes=1)
+    assert not JobQueue.is_available('local', processes=4)
+    with pytest.raises(ValueError):
+        JobQueue.create('unknown')
+
+
+def test_jobs_taken_after_shutdown_fail():
+    finished = []
+    runner = JobRunner(LocalJobQueue(), max_workers=1, on_finish=lambda job, spans: finished.append(job))
+    runner.start()
+    runner.shutdown()
+    job = Job('a', {}, None)
+    runner.run(job)
+    assert job.status == Job.FAILED
+    assert 'shutting down' in job.error
+    assert finished == [job]
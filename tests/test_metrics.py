@@ -0,0 +1,15 @@
+from app.metrics import Histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('seconds', 'Seconds.', (1.0, 2.5))
+    for value in (0.5, 1.0, 2.0, 3.0):
+        histogram.observe(value, kind='sync')
+
+    assert histogram.render().splitlines()[2:] == [
+        'seconds_bucket{kind="sync",le="1"} 2',
+        'seconds_bucket{kind="sync",le="2.5"} 3',
+        'seconds_bucket{kind="sync",le="+Inf"} 4',
+        'seconds_sum{kind="sync"} 6.5',
+        'seconds_count{kind="sync"} 4'
+    ]
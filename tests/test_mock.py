@@ -0,0 +1,85 @@
+import http.client
+import json
+import threading
+
+from .helpers.body_generator import BodyGenerator
+
+from cli.mock import MockServer
+from openapi.mock import MockApi
+from postman.pm import Postman
+
+
+def iter_requests(collection):
+    for resource in collection['item']:
+        for operation in resource['item']:
+            yield from operation['item']
+
+
+def test_mock_answers_each_generated_request_with_its_status_code():
+    data = BodyGenerator.openapi_spec_with_paths()
+    collection = Postman.generate(data, BodyGenerator.cmd_args())['collection']
+    api = MockApi(data, 'oauth')
+
+    mismatches = []
+    for request in iter_requests(collection):
+        headers = {header['key']: header['value'] for header in request['request']['header']}
+        path = '/' + '/'.join(request['request']['url']['path'])
+        response = api.handle(request['request']['method'], path, headers, request['request']['body']['raw'].encode())
+        if response.status_code != int(request['name'].split(' ')[0]):
+            mismatches.append((request['request']['method'], request['name']))
+
+    # Not found can't be told apart from the success request
+    assert mismatches == [('PUT', '404 (Not found)')]
+
+
+def test_mock_checks_nested_required_fields():
+    data = BodyGenerator.openapi_spec_with_paths()
+    api = MockApi(data)
+    body = {'id': 'string', 'paid': False, 'items': [{'sku': 'string', 'price': {'amount': 0, 'currency': 'string'}}],
+            'total': {'amount': 0, 'currency': 'string'}}
+
+    assert api.handle('POST', '/orders', {}, json.dumps(body).encode()).status_code == 201
+    body['items'][0]['price']['amount'] = '0'
+    assert api.handle('POST', '/orders', {}, json.dumps(body).encode()).status_code == 400
+    assert api.handle('PUT', '/orders/10', {}, b'{').status_code == 422
+    assert api.handle('PUT', '/orders', {}, b'{}').status_code == 501
+
+
+def test_mock_prefers_literal_routes_with_the_method():
+    data = BodyGenerator.openapi_spec_with_paths()
+    data['paths']['/orders/latest'] = {
+        'get': {'responses': {'202': {'description': 'Accepted'}}}
+    }
+    data['paths']['/orders/{id}']['get'] = {'responses': {'203': {'description': 'Partial'}}}
+    api = MockApi(data)
+
+    assert api.find_operation('GET', '/orders/latest').success_status_code == '202'
+    assert api.find_operation('GET', '/orders/10').success_status_code == '203'
+    # Only the templated route has PUT
+    assert api.find_operation('PUT', '/orders/latest') is api.find_operation('PUT', '/orders/10') is not None
+    assert api.find_operation('DELETE', '/orders/latest') is None
+
+
+def test_mock_server_answers_over_http():
+    data = BodyGenerator.openapi_spec_with_paths()
+    server = MockServer(('127.0.0.1', 0), MockApi(data))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection(*server.server_address[:2])
+        connection.request('GET', '//orders?page=1')
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader('Content-Type') == 'application/json'
+        assert json.loads(response.read())[0]['total'] == {'amount': 0, 'currency': 'string'}
+
+        connection.request('POST', '/orders', body=b'{}', headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        assert response.status == 400
+        assert json.loads(response.read()) == {'code': 'string', 'message': 'string'}
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert server.status_codes == {200: 1, 400: 1}
@@ -0,0 +1,176 @@
+import pytest
+
+from .helpers.body_generator import BodyGenerator
+
+from cli.config import CommandLineConfig
+from postman.mutations import BodyTemplate, Mutation, MutationStrategy
+from postman.pm import Postman
+
+
+def openapi_spec_with_required_fields():
+    data = BodyGenerator.openapi_spec()
+    data['components']['schemas'] = {
+        'Money': {
+            'type': 'object',
+            'required': ['amount'],
+            'properties': {
+                'amount': {'type': 'number'}
+            }
+        },
+        'Order': {
+            'type': 'object',
+            'required': ['id', 'total'],
+            'properties': {
+                'id': {'type': 'string'},
+                'total': {'$ref': '#/components/schemas/Money'},
+                'note': {'type': 'string'}
+            }
+        },
+        'Cart': {
+            'type': 'object',
+            'required': ['orders'],
+            'properties': {
+                'orders': {'type': 'array', 'items': {'$ref': '#/components/schemas/Order'}}
+            }
+        },
+        'Category': {
+            'type': 'object',
+            'required': ['parent'],
+            'properties': {
+                'parent': {'$ref': '#/components/schemas/Category'}
+            }
+        }
+    }
+    return data
+
+
+def test_mutation_keeps_base_body():
+    body = {'id': 'string', 'note': 'string'}
+    assert Mutation('id', 'sem id').apply(body) == {'note': 'string'}
+    assert Mutation('id', 'id vazio', '').apply(body) == {'id': '', 'note': 'string'}
+    assert body == {'id': 'string', 'note': 'string'}
+
+
+def test_template_is_built_once_per_component():
+    data = openapi_spec_with_required_fields()
+    template = BodyTemplate.for_component(data, '#/components/schemas/Order')
+    assert BodyTemplate.for_component(data, '#/components/schemas/Order') is template
+
+    assert [field.name for field in template.fields] == ['id', 'total']
+    assert [mutation.description for mutation in template.fields[0].mutations] == [
+        'sem id', 'id tipagem inválida', 'id vazio'
+    ]
+    assert template.fields[1].component_name == '#/components/schemas/Money'
+    assert not template.fields[1].is_array
+
+
+def test_nested_variants_are_built_inside_the_body():
+    data = openapi_spec_with_required_fields()
+    template = BodyTemplate.for_component(data, '#/components/schemas/Cart')
+    variants = list(template.iter_variants(data))
+    assert [variant.description for variant in variants] == [
+        'sem orders', 'orders tipagem inválida', 'orders vazio',
+        'sem id', 'id tipagem inválida', 'id vazio',
+        'sem total', 'total tipagem inválida', 'total vazio',
+        'sem amount', 'amount tipagem inválida'
+    ]
+    assert [field.name for field in variants[-1].path] == ['orders', 'total']
+
+    body = {'orders': [{'id': 'string', 'total': {'amount': 0}}]}
+    assert variants[-1].build(data, body) == {
+        'orders': [{'id': 'string', 'total': {'amount': 'tipo inválido'}, 'note': 'string'}]
+    }
+    assert variants[3].build(data, body) == {'orders': [{'total': {'amount': 0}, 'note': 'string'}]}
+    assert body == {'orders': [{'id': 'string', 'total': {'amount': 0}}]}
+
+
+def test_nested_bad_request_bodies_are_minified():
+    data = openapi_spec_with_required_fields()
+    body = {'id': 'string', 'total': {'amount': 0}, 'note': 'string'}
+    requests = Postman.generate_bad_requests(data, '#/components/schemas/Order', '400', 'POST', 'http://localhost',
+                                             'orders', body, '', 'none')
+    requests = [request.to_dict() for request in requests]
+    assert requests[0]['request']['body']['raw'] == '{\n    "total": {\n        "amount": 0\n    },\n    "note": "string"\n}'
+    assert requests[-1]['name'] == '400 (amount tipagem inválida)'
+    assert requests[-1]['request']['body']['raw'] == '{"id":"string","total":{"amount":"tipo inv\\u00e1lido"},"note":"string"}'
+
+
+def test_circular_variants_end():
+    data = openapi_spec_with_required_fields()
+    variants = list(BodyTemplate.for_component(data, '#/components/schemas/Category').iter_variants(data))
+    assert [variant.description for variant in variants] == [
+        'sem parent', 'parent tipagem inválida', 'parent vazio'
+    ]
+
+
+def select_descriptions(strategy, key='POST /carts 400'):
+    data = openapi_spec_with_required_fields()
+    template = BodyTemplate.for_component(data, '#/components/schemas/Cart')
+    variants = template.iter_variants(data, max_depth=strategy.max_depth)
+    return [variant.description for variant in strategy.select(variants, key)]
+
+
+def test_depth_strategy_caps_each_depth():
+    assert select_descriptions(MutationStrategy('depth', depth_caps=[2, 1])) == [
+        'sem orders', 'orders tipagem inválida', 'sem id'
+    ]
+    assert select_descriptions(MutationStrategy('depth', depth_caps=[3, 3, 3])) == [
+        'sem orders', 'orders tipagem inválida', 'orders vazio',
+        'sem id', 'id tipagem inválida', 'id vazio',
+        'sem amount', 'amount tipagem inválida'
+    ]
+
+
+def test_sample_strategy_is_seeded():
+    sample = select_descriptions(MutationStrategy('sample', seed=1, budget=4))
+    assert len(sample) == 4
+    assert select_descriptions(MutationStrategy('sample', seed=1, budget=4)) == sample
+    assert select_descriptions(MutationStrategy('sample', seed=1, budget=4), key='POST /carts 422') != sample
+
+    exhaustive = select_descriptions(MutationStrategy())
+    assert sample == [description for description in exhaustive if description in sample]
+
+
+def test_sample_strategy_reads_variants_once():
+    variants = iter(range(1000))
+    sample = list(MutationStrategy('sample', seed=1, budget=10)._select_sample(variants, 'POST /orders 400'))
+    assert len(sample) == 10
+    assert sample == sorted(sample)
+    assert next(variants, None) is None
+
+
+def test_negative_limits_are_rejected():
+    with pytest.raises(ValueError):
+        MutationStrategy('sample', budget=-1)
+    with pytest.raises(ValueError):
+        MutationStrategy('depth', depth_caps=[3, -1])
+
+    parser = CommandLineConfig('openapi2pm.py').parser
+    assert parser.parse_args(['openapi.json', '-badreq-budget', '0']).bad_request_budget == 0
+    for arguments in (['-badreq-budget', '-1'], ['--mutation-depth-caps', '2', '-1'], ['-badreq-budget', 'x']):
+        with pytest.raises(SystemExit):
+            parser.parse_args(['openapi.json', *arguments])
+
+
+def test_equivalence_strategy_keeps_one_variant_per_class():
+    data = openapi_spec_with_required_fields()
+    data['components']['schemas']['Order']['required'] = ['id', 'note', 'total']
+    template = BodyTemplate.for_component(data, '#/components/schemas/Order')
+    variants = MutationStrategy('equivalence').select(template.iter_variants(data), 'POST /orders 400')
+    assert [variant.description for variant in variants] == [
+        'sem id', 'id tipagem inválida', 'id vazio',
+        'sem total', 'total tipagem inválida', 'total vazio',
+        'sem amount', 'amount tipagem inválida'
+    ]
+
+
+def test_pairwise_is_an_alias_of_the_equivalence_strategy():
+    assert MutationStrategy('pairwise').name == 'equivalence'
+
+
+def test_budget_is_shared_by_the_responses_of_an_operation():
+    data = BodyGenerator.openapi_spec_with_paths()
+    data['paths']['/orders']['post']['responses']['422'] = {'description': 'Unprocessable'}
+    args = BodyGenerator.cmd_args(bad_request_budget=4)
+    requests = list(Postman.generate_operation_requests(data, '/orders', 'post', 'http://localhost', None, args))
+    assert len([request for request in requests if request.name.startswith(('400', '422'))]) == 4
@@ -0,0 +1,189 @@
+import json
+
+import pytest
+
+from .helpers.body_generator import BodyGenerator
+
+from cli.exceptions import InvalidRefError
+from openapi.cache import ResolutionCache, SpecCacheRegistry, count_values
+from openapi.documents import DocumentCache
+from openapi.openapi import OpenApi
+
+
+def openapi_spec_with_components():
+    data = BodyGenerator.openapi_spec()
+    data['components']['schemas'] = {
+        'Money': {
+            'type': 'object',
+            'properties': {
+                'amount': {'type': 'number'},
+                'currency': {'type': 'string'}
+            }
+        },
+        'Order': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'string'},
+                'total': {'$ref': '#/components/schemas/Money'}
+            }
+        },
+        'Node': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string'},
+                'parent': {'$ref': '#/components/schemas/Node'},
+                'children': {'type': 'array', 'items': {'$ref': '#/components/schemas/Node'}}
+            }
+        }
+    }
+    return data
+
+
+def test_resolved_components_are_cached():
+    data = openapi_spec_with_components()
+    order = OpenApi.get_json_schema_from_component(data, '#/components/schemas/Order')
+    money = OpenApi.get_json_schema_from_component(data, '#/components/schemas/Money')
+    assert order['properties']['total'] is money
+    assert OpenApi.get_json_schema_from_component(data, '#/components/schemas/Order') is order
+    assert OpenApi.get_json_body_from_component(data, '#/components/schemas/Order') == {
+        'id': 'string',
+        'total': {'amount': 0, 'currency': 'string'}
+    }
+
+
+def test_circular_reference_is_bounded():
+    data = openapi_spec_with_components()
+    schema = OpenApi.get_json_schema_from_component(data, '#/components/schemas/Node')
+    assert schema['properties']['parent'] == {
+        'description': 'Circular reference to #/components/schemas/Node'
+    }
+    body = OpenApi.get_json_body_from_component(data, '#/components/schemas/Node')
+    assert body == {'name': 'string', 'parent': {}, 'children': [{}]}
+
+
+def openapi_spec_with_connected_components(count):
+    data = BodyGenerator.openapi_spec()
+    data['components']['schemas'] = {
+        f'Object{i}': {
+            'type': 'object',
+            'properties': {
+                f'object{j}': {'$ref': f'#/components/schemas/Object{j}'} for j in range(count) if j != i
+            }
+        }
+        for i in range(count)
+    }
+    return data
+
+
+def test_densely_circular_components_are_bounded_and_cached():
+    data = openapi_spec_with_connected_components(8)
+    schema = OpenApi.get_json_schema_from_component(data, '#/components/schemas/Object0')
+    assert count_values(schema) < 7 ** ResolutionCache.max_circular_depth * 4
+    assert OpenApi.get_json_schema_from_component(data, '#/components/schemas/Object0') is schema
+    assert schema['properties']['object1']['properties']['object0'] == {
+        'description': 'Circular reference to #/components/schemas/Object0'
+    }
+
+    # The value of a component is the same whatever was resolved before it
+    other = openapi_spec_with_connected_components(8)
+    OpenApi.get_json_body_from_component(other, '#/components/schemas/Object3')
+    assert OpenApi.get_json_schema_from_component(other, '#/components/schemas/Object0') == schema
+    assert OpenApi.get_json_body_from_component(other, '#/components/schemas/Object0') == (
+        OpenApi.get_json_body_from_component(data, '#/components/schemas/Object0')
+    )
+    assert not OpenApi.is_circular_component(openapi_spec_with_components(), '#/components/schemas/Order')
+
+
+def test_least_recently_used_spec_is_evicted():
+    OpenApi.clear_cache()
+    specs = [openapi_spec_with_components() for _ in range(SpecCacheRegistry.max_specs + 1)]
+    caches = [SpecCacheRegistry.for_spec(spec) for spec in specs]
+    assert SpecCacheRegistry.for_spec(specs[-1]) is caches[-1]
+    assert SpecCacheRegistry.for_spec(specs[0]) is not caches[0]
+
+
+def test_specs_are_evicted_by_size(monkeypatch):
+    OpenApi.clear_cache()
+    specs = [openapi_spec_with_components() for _ in range(3)]
+    monkeypatch.setattr(SpecCacheRegistry, 'max_size', count_values(specs[0]) * 2)
+    caches = [SpecCacheRegistry.for_spec(spec) for spec in specs]
+    assert SpecCacheRegistry.for_spec(specs[2]) is caches[2]
+    assert SpecCacheRegistry.for_spec(specs[1]) is caches[1]
+    assert SpecCacheRegistry.for_spec(specs[0]) is not caches[0]
+
+    # The spec in use is kept even when it is bigger than the limit
+    monkeypatch.setattr(SpecCacheRegistry, 'max_size', 1)
+    spec = openapi_spec_with_components()
+    assert SpecCacheRegistry.for_spec(spec) is SpecCacheRegistry.for_spec(spec)
+
+
+def write_split_spec(directory):
+    (directory / 'shared').mkdir()
+    (directory / 'shared' / 'money.json').write_text(json.dumps({
+        'Money': {
+            'type': 'object',
+            'properties': {
+                'amount': {'type': 'number'},
+                'currency': {'$ref': '#/Currency'}
+            }
+        },
+        'Currency': {
+            'type': 'object',
+            'properties': {'code': {'type': 'string'}}
+        }
+    }))
+    (directory / 'specs').mkdir()
+    data = BodyGenerator.openapi_spec()
+    data['components']['schemas'] = {
+        'Order': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'string'},
+                'total': {'$ref': '../shared/money.json#/Money'}
+            }
+        }
+    }
+    return data
+
+
+def test_external_refs_are_resolved_from_files(tmp_path):
+    data = write_split_spec(tmp_path)
+    OpenApi.set_location(data, str(tmp_path / 'specs' / 'openapi.json'))
+    assert OpenApi.load_external_documents(data) == [str(tmp_path / 'shared' / 'money.json')]
+
+    assert OpenApi.get_json_body_from_component(data, '#/components/schemas/Order') == {
+        'id': 'string',
+        'total': {'amount': 0, 'currency': {'code': 'string'}}
+    }
+    schema = OpenApi.get_json_schema_from_component(data, '#/components/schemas/Order')
+    assert schema['properties']['total']['properties']['currency'] == {
+        'type': 'object',
+        'properties': {'code': {'type': 'string'}}
+    }
+
+
+def test_shared_documents_are_parsed_once(tmp_path, monkeypatch):
+    data = write_split_spec(tmp_path)
+    OpenApi.set_location(data, str(tmp_path / 'specs' / 'openapi.json'))
+    OpenApi.load_external_documents(data)
+    document, _ = DocumentCache.load(str(tmp_path / 'shared' / 'money.json'))
+
+    def fail(file):
+        raise AssertionError(f'{file.name} was parsed again')
+
+    monkeypatch.setattr('cli.serialization.load', fail)
+    other = BodyGenerator.openapi_spec()
+    other['components']['schemas'] = {'Price': {'$ref': '../shared/money.json#/Money'}}
+    OpenApi.set_location(other, str(tmp_path / 'specs' / 'other.json'))
+    OpenApi.load_external_documents(other)
+    assert OpenApi.resolve_ref(other, '#/components/schemas/Price') is document['Money']
+
+
+def test_external_refs_need_an_allowed_location(tmp_path):
+    data = write_split_spec(tmp_path)
+    with pytest.raises(InvalidRefError):
+        OpenApi.get_json_schema_from_component(data, '#/components/schemas/Order')
+
+    OpenApi.set_location(data, str(tmp_path / 'specs' / 'openapi.json'), str(tmp_path / 'specs'))
+    with pytest.raises(InvalidRefError):
+        OpenApi.get_json_schema_from_component(data, '#/components/schemas/Order')
@@ -0,0 +1,148 @@
+import json
+import re
+
+from .helpers.body_generator import BodyGenerator
+
+from postman.pm import Postman
+from postman.incremental import Manifest
+from postman.writer import iter_encode, materialize
+
+
+def test_generate_groups_requests_by_resource_and_operation():
+    pm = Postman.generate(BodyGenerator.openapi_spec_with_paths(), BodyGenerator.cmd_args())
+    collection = pm['collection']
+    assert pm['filename'] == 'API Orders.postman_collection.json'
+    assert [resource['name'] for resource in collection['item']] == ['Orders', 'Customers']
+    assert [operation['name'] for operation in collection['item'][0]['item']] == [
+        'Create order', 'List orders', 'Update order'
+    ]
+    list_customers = collection['item'][1]['item'][0]['item']
+    assert [request['name'] for request in list_customers] == ['200 (OK)', '501 (Not implemented)']
+
+
+def test_streamed_collection_is_equal_to_generated():
+    data = BodyGenerator.openapi_spec_with_paths()
+    expected = json.dumps(Postman.generate(data, BodyGenerator.cmd_args())['collection'], ensure_ascii=False, indent=4)
+    pm = Postman.stream(data, BodyGenerator.cmd_args())
+    assert ''.join(iter_encode(pm['collection'])) == expected
+
+
+def test_parallel_generation_is_equal_to_serial():
+    data = BodyGenerator.openapi_spec_with_paths()
+    serial = Postman.generate(data, BodyGenerator.cmd_args())
+    parallel = Postman.generate(data, BodyGenerator.cmd_args(jobs=2))
+    assert json.dumps(parallel['collection']) == json.dumps(serial['collection'])
+
+
+def test_incremental_generation_reuses_unchanged_operations():
+    data = BodyGenerator.openapi_spec_with_paths()
+    previous = Postman.stream(data, BodyGenerator.cmd_args(), create_manifest=True)
+    previous_collection = materialize(previous['collection'])
+    previous_manifest = Manifest(
+        previous['filename'],
+        previous['manifest'].options_fingerprint,
+        previous['manifest'].operations,
+        previous_collection
+    )
+
+    changed = BodyGenerator.openapi_spec_with_paths()
+    changed['paths']['/customers']['get']['responses']['404'] = {'description': 'Not found'}
+    pm = Postman.stream(changed, BodyGenerator.cmd_args(), previous_manifest)
+    collection = materialize(pm['collection'])
+
+    assert collection == Postman.generate(changed, BodyGenerator.cmd_args())['collection']
+    assert collection['item'][0]['item'][0]['item'][0] is previous_collection['item'][0]['item'][0]['item'][0]
+    assert collection['item'][1]['item'][0]['item'][0] is not previous_collection['item'][1]['item'][0]['item'][0]
+
+
+def test_hoisted_schemas_are_kept_once_in_collection_variables():
+    data = BodyGenerator.openapi_spec_with_paths()
+    collection = Postman.generate(data, BodyGenerator.cmd_args(hoist_schemas=True))['collection']
+    variables = {variable['key']: json.loads(variable['value']) for variable in collection['variable']}
+    assert len(variables) == 3
+
+    create_order = collection['item'][0]['item'][0]['item']
+    bad_request_scripts = {request['event'][0]['script']['exec'][0] for request in create_order[1:-2]}
+    assert len(bad_request_scripts) == 1
+    assert "pm.collectionVariables.get('jsonSchema." in bad_request_scripts.pop()
+
+    parallel = Postman.generate(data, BodyGenerator.cmd_args(hoist_schemas=True, jobs=2))['collection']
+    assert json.dumps(parallel) == json.dumps(collection)
+
+
+def test_compact_generation_minifies_bodies_and_scripts():
+    data = BodyGenerator.openapi_spec_with_paths()
+    pretty = Postman.generate(data, BodyGenerator.cmd_args())['collection']
+    pm = Postman.generate(data, BodyGenerator.cmd_args(compact=True, gzip=True))
+    assert pm['filename'] == 'API Orders.postman_collection.json.gz'
+
+    pretty_request = pretty['item'][0]['item'][0]['item'][0]
+    request = pm['collection']['item'][0]['item'][0]['item'][0]
+    assert json.loads(request['request']['body']['raw']) == json.loads(pretty_request['request']['body']['raw'])
+    assert '\n' not in request['request']['body']['raw']
+
+    script = request['event'][0]['script']['exec'][0]
+    assert all(line and line == line.strip() for line in script.split('\n'))
+    assert script.split('\n') == [line.strip() for line in pretty_request['event'][0]['script']['exec'][0].split('\n')
+                                  if line.strip()]
+
+
+def test_fan_out_is_equal_to_generating_each_environment_and_authorization_type():
+    data = BodyGenerator.openapi_spec_with_paths()
+    data['servers'].append({'url': 'http://staging:8000', 'description': 'Staging'})
+    results = list(Postman.fan_out(data, BodyGenerator.cmd_args(hoist_schemas=True), ['all'], ['none', 'oauth']))
+
+    assert [pm['filename'] for pm in results] == [
+        'API Orders (Production, none).postman_collection.json',
+        'API Orders (Production, oauth).postman_collection.json',
+        'API Orders (Staging, none).postman_collection.json',
+        'API Orders (Staging, oauth).postman_collection.json'
+    ]
+    for pm, (environment, auth_type) in zip(results, [('Production', 'none'), ('Production', 'oauth'),
+                                                      ('Staging', 'none'), ('Staging', 'oauth')]):
+        args = BodyGenerator.cmd_args(hoist_schemas=True, environment=environment, authorization_type=auth_type)
+        expected = Postman.generate(data, args)['collection']
+        expected['info']['name'] = f'API Orders ({environment}, {auth_type})'
+        assert materialize(pm['collection']) == expected
+
+
+def test_shards_split_the_requests_keeping_their_folders():
+    data = BodyGenerator.openapi_spec_with_paths()
+    args = BodyGenerator.cmd_args(hoist_schemas=True)
+    expected = Postman.generate(data, args)['collection']
+    results = list(Postman.shard(data, args, 2))
+    shards = [materialize(pm['collection']) for pm in results]
+
+    assert [pm['filename'] for pm in results] == [
+        'API Orders (1 of 2).postman_collection.json',
+        'API Orders (2 of 2).postman_collection.json'
+    ]
+    assert sum(pm['requests'] for pm in results) == sum(
+        len(operation['item']) for resource in expected['item'] for operation in resource['item'])
+
+    requests = {}
+    for shard in shards:
+        used = set()
+        for resource in shard['item']:
+            for operation in resource['item']:
+                requests[(resource['name'], operation['name'])] = operation['item']
+                for request in operation['item']:
+                    used |= set(re.findall(r'jsonSchema\.[0-9a-f]{16}', request['event'][0]['script']['exec'][0]))
+        assert [variable['key'] for variable in shard['variable']] == [
+            variable['key'] for variable in expected['variable'] if variable['key'] in used
+        ]
+    assert requests == {
+        (resource['name'], operation['name']): operation['item']
+        for resource in expected['item'] for operation in resource['item']
+    }
+
+
+def test_shard_weights_move_operations_between_shards():
+    data = BodyGenerator.openapi_spec_with_paths()
+    args = BodyGenerator.cmd_args(generate_bad_requests=False)
+    results = list(Postman.shard(data, args, 2, {'GET /customers': 1000}))
+
+    customers = [[resource['name'] for resource in materialize(pm['collection'])['item']] for pm in results]
+    assert customers[0] == ['Customers']
+    assert 'Customers' not in customers[1]
+    assert results[0]['cost'] > results[1]['cost']
@@ -0,0 +1,93 @@
+from .helpers.body_generator import BodyGenerator
+
+from postman.pm import Postman
+from postman.request import RequestPool
+from postman.templates import compile_request, create_request
+from postman.writer import materialize
+
+
+def test_requests_share_headers_and_url():
+    first = create_request('201', 'Created', 'POST', 'http://localhost:8000', 'orders', {'id': 'string'}, '', 'oauth')
+    second = create_request('400', 'sem id', 'POST', 'http://localhost:8000', 'orders', {}, '', 'oauth')
+    assert first.headers is second.headers
+    assert first.url is second.url
+    assert create_request('200', 'OK', 'GET', 'http://localhost:8000', 'orders', {}, '', 'oauth').headers == (
+        first.headers[1:]
+    )
+
+    assert first.to_dict() == {
+        'name': '201 (Created)',
+        'event': [{'listen': 'test', 'script': {'exec': ['']}}],
+        'request': {
+            'method': 'POST',
+            'header': [
+                {'key': 'Content-Type', 'name': 'Content-Type', 'type': 'text', 'value': 'application/json'},
+                {'key': 'client_id', 'type': 'text', 'value': '{{client_id}}'},
+                {'key': 'access_token', 'type': 'text', 'value': '{{access_token}}'}
+            ],
+            'body': {'mode': 'raw', 'raw': '{\n    "id": "string"\n}'},
+            'url': {'raw': 'http://localhost:8000/orders', 'host': ['http://localhost:8000'], 'path': ['orders']}
+        },
+        'response': []
+    }
+
+
+def test_generated_collections_do_not_share_objects():
+    data = BodyGenerator.openapi_spec_with_paths()
+    first = Postman.generate(data, BodyGenerator.cmd_args())['collection']
+    request = first['item'][0]['item'][0]['item'][0]['request']
+    request['url']['path'].append('changed')
+    request['url']['host'][0] = 'http://changed'
+    request['header'][0]['value'] = 'changed'
+
+    second = Postman.generate(data, BodyGenerator.cmd_args())['collection']
+    request = second['item'][0]['item'][0]['item'][0]['request']
+    assert 'changed' not in request['url']['path']
+    assert request['url']['host'] == ['http://localhost:8000']
+    assert request['header'][0]['value'] != 'changed'
+
+
+def test_unauthorized_requests_keep_shared_headers():
+    data = BodyGenerator.openapi_spec_with_paths()
+    requests = list(Postman.generate_operation_requests(data, '/orders', 'post', 'http://localhost:8000', None,
+                                                        BodyGenerator.cmd_args()))
+    unauthorized = [request for request in requests if request.name.startswith('401')]
+    assert [request.name for request in unauthorized] == ['401 (sem client_id)', '401 (sem access_token)']
+    assert [[header['key'] for header in request.headers] for request in unauthorized] == [
+        ['Content-Type', 'access_token'], ['Content-Type', 'client_id']
+    ]
+    assert len(requests[0].headers) == 3
+
+
+def test_compiled_request_is_bound_to_each_host_and_authorization_type():
+    request = compile_request('201', 'Created', 'POST', 'orders', {'id': 'string'}, '')
+    local = request.bind('http://localhost:8000', 'oauth')
+    staging = request.bind('http://staging:8000', 'none')
+    assert local.raw_body is staging.raw_body
+    assert local.url['raw'] == 'http://localhost:8000/orders'
+    assert staging.url['raw'] == 'http://staging:8000/orders'
+    assert [header['key'] for header in local.headers] == ['Content-Type', 'client_id', 'access_token']
+    assert [header['key'] for header in staging.headers] == ['Content-Type']
+
+
+def test_request_pool_shares_identical_payloads():
+    data = BodyGenerator.openapi_spec_with_paths()
+    args = BodyGenerator.cmd_args(dedup_requests=True)
+    compiled = Postman.compile(data, args)
+    assert materialize(compiled.emit('http://localhost:8000', 'oauth', 'API Orders')) == Postman.generate(
+        data, BodyGenerator.cmd_args())['collection']
+
+    requests = [request for resource in compiled.collection['item'] for operation in resource['item']
+                for request in operation['item']]
+    assert len({id(request.raw_body) for request in requests}) == len({request.raw_body for request in requests})
+    assert len({id(request.test_script) for request in requests}) == len({request.test_script for request in requests})
+
+    pool = RequestPool()
+    for request in Postman.compile_operation_requests(data, '/orders', 'post', None, args):
+        pool.add(request)
+    # Without client_id, without access_token and the success request only differ on their names and headers
+    assert pool.duplicates == 0
+    pool.add(compile_request('409', 'Conflict', 'POST', '/orders', {}, ''))
+    pool.add(compile_request('500', 'Error', 'POST', '/orders', {}, ''))
+    assert pool.duplicates == 1
+    assert pool.shared_bytes > 0
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from cli import serialization
+
+
+values = [
+    {'nome': 'ação', 'emoji': '😀', 'control': '\x00\x1f\x7f', 'raw': '{\n    "paid": "tipo inv\\u00e1lido"\n}'},
+    {'b': [1, {}, [], [[{'c': None}]]], 'a': {'ä': -0.0, 'é': True}},
+    [0.1, 1e16, -1.5e-07, 1e22, 123456789012345678.0, float('nan'), float('inf')],
+    [2 ** 64, -2 ** 63, 2 ** 70],
+    {1: 'key is not a string'},
+    'a string with 1e5 and \\u00e1',
+    (1, 2)
+]
+
+
+@pytest.fixture(params=serialization.get_available_backends())
+def backend(request):
+    previous = serialization.backend
+    serialization.set_backend(request.param)
+    yield request.param
+    serialization.set_backend(previous)
+
+
+@pytest.mark.parametrize('indent', [None, 2, 4])
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+@pytest.mark.parametrize('sort_keys', [False, True])
+def test_dumps_is_equal_to_the_stdlib(backend, indent, ensure_ascii, sort_keys):
+    separators = (',', ': ') if indent is not None else (',', ':')
+    for value in values:
+        expected = json.dumps(value, indent=indent, ensure_ascii=ensure_ascii, separators=separators,
+                              sort_keys=sort_keys)
+        assert serialization.dumps(value, indent, ensure_ascii, sort_keys) == expected
+
+
+def test_loads_is_equal_to_the_stdlib(backend):
+    for text in ['{"a": 1, "a": [2.5, 1e400, null]}', '[18446744073709551616, 1.0]', 'NaN', '"\\ud800 ação"']:
+        assert repr(serialization.loads(text)) == repr(json.loads(text))
+        assert repr(serialization.loads(text.encode('utf-8'))) == repr(json.loads(text))
+
+    with pytest.raises(json.JSONDecodeError):
+        serialization.loads('{"a": ')
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        serialization.set_backend('simplejson')
@@ -0,0 +1,25 @@
+import json
+
+from .helpers.body_generator import BodyGenerator
+from .helpers.spec_generator import SpecGenerator
+
+from openapi.openapi import OpenApi
+from postman.pm import Postman
+
+
+def test_generated_spec_is_deterministic():
+    first = SpecGenerator(seed=7, paths=5, schemas=9).generate()
+    second = SpecGenerator(seed=7, paths=5, schemas=9).generate()
+    assert json.dumps(first) == json.dumps(second)
+    assert json.dumps(first) != json.dumps(SpecGenerator(seed=8, paths=5, schemas=9).generate())
+
+
+def test_generated_spec_can_be_converted():
+    data = SpecGenerator(seed=1, paths=4, tags=2, schemas=6, width=5, depth=3).generate()
+    assert len(data['paths']) == 8
+    assert len(data['components']['schemas']) == 7
+    for schema_name in data['components']['schemas']:
+        OpenApi.get_json_body_from_component(data, f'#/components/schemas/{schema_name}')
+
+    collection = Postman.generate(data, BodyGenerator.cmd_args())['collection']
+    assert [resource['name'] for resource in collection['item']] == ['Tag0', 'Tag1']
@@ -0,0 +1,86 @@
+import pstats
+
+from .helpers.body_generator import BodyGenerator
+
+from cli.profiler import Profiler
+from cli.tracer import SpanRecorder, Tracer
+from postman.pm import Postman
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError('Message formatted before being logged')
+
+
+def test_messages_below_level_are_discarded_without_formatting(capsys):
+    level = Tracer.level
+    try:
+        Tracer.configure(level='warning')
+        tracer = Tracer('test')
+        tracer.trace('Skipped %s', Unformattable())
+        tracer.debug('Skipped %s', Unformattable())
+        tracer.error('Error - %s', 'failed')
+        tracer.log()
+    finally:
+        Tracer.level = level
+
+    assert capsys.readouterr().out == '>>> test:: Error - failed\n'
+
+
+def test_nested_spans_are_aggregated_by_path():
+    spans = SpanRecorder()
+    spans.enabled = True
+    with spans.span('write'):
+        for _ in range(3):
+            with spans.span('bad_requests'):
+                with spans.span('bad_requests'):
+                    pass
+                with spans.span('ref_resolution'):
+                    pass
+
+    stats = spans.snapshot()
+    assert sorted(stats) == ['write', 'write/bad_requests', 'write/bad_requests/ref_resolution']
+    assert stats['write'][0] == 1
+    assert stats['write/bad_requests'][0] == 3
+    calls, seconds, self_seconds = stats['write/bad_requests']
+    assert self_seconds <= seconds
+    assert stats['write'][2] <= stats['write'][1] - seconds + 1e-9
+
+
+def test_merged_spans_are_placed_inside_the_current_phase():
+    spans = SpanRecorder()
+    spans.enabled = True
+    with spans.span('write'):
+        spans.merge({'bad_requests': [2, 0.5, 0.5]})
+    spans.merge({'bad_requests': [1, 0.25, 0.25]})
+
+    summary = spans.get_summary()
+    assert [(row['phase'], row['depth'], row['calls']) for row in summary] == [
+        ('bad_requests', 0, 1),
+        ('write', 0, 1),
+        ('write/bad_requests', 1, 2)
+    ]
+    assert spans.snapshot(reset=True)['write/bad_requests'][1] == 0.5
+    assert spans.snapshot() == {}
+
+
+def test_disabled_spans_record_nothing():
+    spans = SpanRecorder()
+    with spans.span('write'):
+        pass
+    assert spans.snapshot() == {}
+
+
+def test_profiler_saves_stats_and_report(tmp_path):
+    filename = str(tmp_path / 'run.prof')
+    with Profiler(filename, top=5) as profiler:
+        Postman.generate(BodyGenerator.openapi_spec_with_paths(), BodyGenerator.cmd_args())
+
+    assert profiler.peak > 0
+    stats = pstats.Stats(filename)
+    assert any(function[2] == 'generate' for function in stats.stats)
+    with open(profiler.report_filename) as file:
+        report = file.read()
+    assert report.startswith('Peak memory: ')
+    assert 'Top 5 functions by cumulative time:' in report
+    assert 'Top 5 lines by memory still allocated at the end:' in report
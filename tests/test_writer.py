@@ -0,0 +1,55 @@
+import gzip
+import json
+
+from postman.writer import StreamedList, iter_encode, materialize, open_collection_file, write_collection_file
+
+
+def streamed_collection():
+    requests = [{'name': '200 (OK)', 'request': {'header': [], 'body': {'raw': '{\n    "nome": "ação"\n}'}}}]
+    return {
+        'info': {'name': 'API Orders'},
+        'item': StreamedList(iter([
+            {'name': 'Orders', 'item': StreamedList(iter(requests)), 'protocolProfileBehavior': {}},
+            {'name': 'Customers', 'item': StreamedList(iter([])), 'protocolProfileBehavior': {}}
+        ]))
+    }
+
+
+def test_streamed_encoding_is_equal_to_json_dumps():
+    expected = materialize(streamed_collection())
+    assert ''.join(iter_encode(streamed_collection())) == json.dumps(expected, ensure_ascii=False, indent=4)
+    assert ''.join(iter_encode(streamed_collection(), indent=None)) == json.dumps(
+        expected, ensure_ascii=False, separators=(',', ':')
+    )
+
+
+def test_streamed_items_are_generated_on_demand():
+    generated = []
+
+    def requests():
+        for name in ('a', 'b'):
+            generated.append(name)
+            yield {'name': name}
+
+    chunks = iter_encode({'item': StreamedList(requests())})
+    next(chunks)
+    assert generated == []
+    ''.join(chunks)
+    assert generated == ['a', 'b']
+
+
+def test_gzip_collection_file_is_written_while_streamed(tmp_path):
+    filename = str(tmp_path / 'API Orders.postman_collection.json.gz')
+    write_collection_file(filename, streamed_collection(), indent=None)
+
+    with gzip.open(filename, 'rb') as file:
+        content = file.read().decode('utf-8')
+    assert content == json.dumps(materialize(streamed_collection()), ensure_ascii=False, separators=(',', ':'))
+    with open_collection_file(filename) as file:
+        assert json.load(file)['info']['name'] == 'API Orders'
+
+    with open(filename, 'rb') as file:
+        compressed = file.read()
+    write_collection_file(filename, streamed_collection(), indent=None)
+    with open(filename, 'rb') as file:
+        assert file.read() == compressed